@@ -17,7 +17,9 @@ import {
     RefreshCcw,
     AlertCircle,
     Menu,
-    ChevronDown
+    ChevronDown,
+    ChevronLeft,
+    ChevronRight
 } from 'lucide-react';
 import { motion, AnimatePresence } from 'framer-motion';
 import Sidebar from '../components/Sidebar';
@@ -27,12 +29,32 @@ import { useTheme } from '../context/ThemeContext';
 import { logout } from '../api/axios';
 import { toast } from 'react-hot-toast';
 
+const PAGE_SIZE = 20;
+
+const SORT_OPTIONS = [
+    { value: '-joined', label: 'Newest First' },
+    { value: 'joined', label: 'Oldest First' },
+    { value: '-risk', label: 'Highest Risk' },
+    { value: '-orders', label: 'Most Orders' },
+    { value: 'email', label: 'Email A-Z' },
+];
+
+const RISK_OPTIONS = [
+    { value: '', label: 'Any Risk' },
+    { value: '40', label: 'Risk 40%+' },
+    { value: '70', label: 'Risk 70%+' },
+];
+
 const UserManagement = () => {
-    const { users, isLoading, error, stats, updateUserStatus, reloadUsers } = useUsers();
+    const { users, isLoading, error, stats, pagination, updateUserStatus, reloadUsers } = useUsers();
     const { isDarkMode } = useTheme();
     const [isSidebarOpen, setIsSidebarOpen] = useState(() => window.innerWidth >= 1024);
     const [searchTerm, setSearchTerm] = useState('');
+    const [debouncedSearch, setDebouncedSearch] = useState('');
     const [activeTab, setActiveTab] = useState('ALL');
+    const [ordering, setOrdering] = useState('-joined');
+    const [minRisk, setMinRisk] = useState('');
+    const [currentPage, setCurrentPage] = useState(1);
     const [isActionModalOpen, setIsActionModalOpen] = useState(false);
     const [pendingAction, setPendingAction] = useState(null);
     const [isActioning, setIsActioning] = useState(false);
@@ -53,14 +75,34 @@ const UserManagement = () => {
         BLOCKED: stats.blocked
     }), [stats]);
 
-    const filteredUsers = useMemo(() => {
-        return users.filter(user => {
-            const matchesSearch = (user.name || '').toLowerCase().includes(searchTerm.toLowerCase()) ||
-                (user.email || '').toLowerCase().includes(searchTerm.toLowerCase());
-            const matchesTab = activeTab === 'ALL' || user.status === activeTab;
-            return matchesSearch && matchesTab;
+    // Search, status, risk and sorting are applied server-side, one page at a time
+    useEffect(() => {
+        const timer = setTimeout(() => {
+            setDebouncedSearch(searchTerm.trim());
+            setCurrentPage(1);
+        }, 300);
+        return () => clearTimeout(timer);
+    }, [searchTerm]);
+
+    // Any filter change starts again from the first page
+    const changeFilter = (setter) => (value) => {
+        setter(value);
+        setCurrentPage(1);
+    };
+
+    useEffect(() => {
+        const token = localStorage.getItem("accessToken") || localStorage.getItem("authToken");
+        if (!token) return;
+        reloadUsers({
+            page: currentPage,
+            search: debouncedSearch,
+            status: activeTab === 'ALL' ? '' : activeTab,
+            ordering,
+            minRisk,
         });
-    }, [users, searchTerm, activeTab]);
+    }, [reloadUsers, currentPage, debouncedSearch, activeTab, ordering, minRisk]);
+
+    const totalPages = Math.max(1, Math.ceil(pagination.count / PAGE_SIZE));
 
     const handleActionClick = (user, action) => {
         setPendingAction({ user, action });
@@ -223,7 +265,7 @@ const UserManagement = () => {
                             {['ALL', 'ACTIVE', 'BLOCKED'].map(tab => (
                                 <button
                                     key={tab}
-                                    onClick={() => setActiveTab(tab)}
+                                    onClick={() => changeFilter(setActiveTab)(tab)}
                                     className={`flex-1 lg:flex-none px-4 sm:px-6 py-2.5 rounded-lg sm:rounded-xl text-[10px] font-semibold uppercase tracking-normal transition-all whitespace-nowrap ${activeTab === tab
                                         ? isDarkMode ? 'bg-blue-600 text-white shadow-lg shadow-blue-500/20' : 'bg-slate-900 text-white shadow-lg'
                                         : isDarkMode ? 'text-slate-400 hover:bg-slate-800' : 'text-slate-500 hover:bg-slate-50'
@@ -237,8 +279,26 @@ const UserManagement = () => {
                             ))}
                         </div>
 
-                        {/* Search */}
-                        <div className="flex items-center gap-4 w-full lg:w-auto">
+                        {/* Sort, risk filter and search */}
+                        <div className="flex flex-col sm:flex-row items-stretch sm:items-center gap-3 sm:gap-4 w-full lg:w-auto">
+                            {[
+                                { value: ordering, onChange: changeFilter(setOrdering), options: SORT_OPTIONS, label: 'Sort users' },
+                                { value: minRisk, onChange: changeFilter(setMinRisk), options: RISK_OPTIONS, label: 'Minimum risk' },
+                            ].map(select => (
+                                <div key={select.label} className="relative">
+                                    <select
+                                        aria-label={select.label}
+                                        value={select.value}
+                                        onChange={(e) => select.onChange(e.target.value)}
+                                        className={`w-full appearance-none pl-4 pr-10 py-3 border rounded-xl sm:rounded-2xl text-xs font-semibold focus:outline-none focus:ring-4 transition-all ${isDarkMode ? 'bg-slate-900 border-slate-800 text-white focus:ring-blue-500/10 focus:border-blue-500' : 'bg-white border-slate-200 text-slate-900 focus:ring-blue-500/5 focus:border-blue-500'}`}
+                                    >
+                                        {select.options.map(option => (
+                                            <option key={option.value} value={option.value}>{option.label}</option>
+                                        ))}
+                                    </select>
+                                    <ChevronDown className="absolute right-4 top-1/2 -translate-y-1/2 w-4 h-4 text-slate-400 pointer-events-none" />
+                                </div>
+                            ))}
                             <div className="relative flex-1 lg:w-80">
                                 <Search className={`absolute left-4 top-1/2 -translate-y-1/2 w-4 h-4 transition-colors ${isDarkMode ? 'text-slate-500' : 'text-slate-400'}`} />
                                 <input
@@ -261,8 +321,8 @@ const UserManagement = () => {
                                     <div className={`h-16 rounded-xl w-full ${isDarkMode ? 'bg-slate-800' : 'bg-slate-100'}`} />
                                 </div>
                             ))
-                        ) : filteredUsers.length > 0 ? (
-                            filteredUsers.map(user => <UserCard key={user.id} user={user} />)
+                        ) : users.length > 0 ? (
+                            users.map(user => <UserCard key={user.id} user={user} />)
                         ) : (
                             <div className="flex flex-col items-center text-center py-12">
                                 <div className={`w-16 h-16 rounded-2xl flex items-center justify-center mb-4 border ${isDarkMode ? 'bg-slate-800 border-slate-700' : 'bg-slate-50 border-slate-100'}`}>
@@ -292,8 +352,8 @@ const UserManagement = () => {
                                                 <td colSpan="6" className="px-8 py-8"><div className={`h-10 rounded-2xl w-full ${isDarkMode ? 'bg-slate-800' : 'bg-slate-100'}`} /></td>
                                             </tr>
                                         ))
-                                    ) : filteredUsers.length > 0 ? (
-                                        filteredUsers.map(user => (
+                                    ) : users.length > 0 ? (
+                                        users.map(user => (
                                             <tr key={user.id} className={`group transition-colors ${isDarkMode ? 'hover:bg-slate-800/50' : 'hover:bg-slate-50/50'}`}>
                                                 <td className="px-8 py-6">
                                                     <div className="flex items-center gap-4">
@@ -394,13 +454,52 @@ const UserManagement = () => {
                         </div>
                         <div className={`px-8 py-4 flex items-center justify-between border-t transition-colors duration-300 ${isDarkMode ? 'bg-slate-900/50 border-slate-800' : 'bg-slate-50/50 border-slate-100'}`}>
                             <div className="text-[10px] font-semibold text-slate-500 uppercase tracking-normal">
-                                Live Directory • {filteredUsers.length} of {users.length} Users
+                                Live Directory • {users.length} of {pagination.count} Users
                             </div>
-                            <div className="flex items-center gap-4 text-[10px] font-semibold text-slate-500 tracking-normal uppercase transition-colors">
-                                ISO Compliance Secured <ShieldCheck className="w-3.5 h-3.5 text-blue-500" />
+                            <div className="flex items-center gap-3">
+                                <span className={`px-3 py-1.5 rounded-lg text-[10px] font-semibold ${isDarkMode ? 'bg-slate-900 text-blue-400' : 'bg-white text-blue-600 shadow-sm'}`}>
+                                    {currentPage} / {totalPages}
+                                </span>
+                                <button
+                                    disabled={!pagination.previous || isLoading}
+                                    onClick={() => setCurrentPage(prev => prev - 1)}
+                                    className={`p-2 rounded-xl transition-all border disabled:opacity-20 ${isDarkMode ? 'bg-slate-900 border-slate-800 text-slate-400 hover:text-white hover:bg-slate-800' : 'bg-white border-slate-100 text-slate-400 hover:text-blue-600 shadow-sm hover:shadow-md'}`}
+                                >
+                                    <ChevronLeft className="w-4 h-4" />
+                                </button>
+                                <button
+                                    disabled={!pagination.next || isLoading}
+                                    onClick={() => setCurrentPage(prev => prev + 1)}
+                                    className={`p-2 rounded-xl transition-all border disabled:opacity-20 ${isDarkMode ? 'bg-slate-900 border-slate-800 text-slate-400 hover:text-white hover:bg-slate-800' : 'bg-white border-slate-100 text-slate-400 hover:text-blue-600 shadow-sm hover:shadow-md'}`}
+                                >
+                                    <ChevronRight className="w-4 h-4" />
+                                </button>
                             </div>
                         </div>
                     </div>
+
+                    {/* Mobile Pagination */}
+                    <div className="flex lg:hidden items-center justify-between py-2">
+                        <div className={`px-3 py-1.5 rounded-lg text-[10px] font-semibold ${isDarkMode ? 'bg-slate-800 text-blue-400' : 'bg-white text-blue-600 shadow-sm'}`}>
+                            {currentPage} / {totalPages} • {pagination.count} Users
+                        </div>
+                        <div className="flex items-center gap-2">
+                            <button
+                                disabled={!pagination.previous || isLoading}
+                                onClick={() => setCurrentPage(prev => prev - 1)}
+                                className={`p-2.5 rounded-xl transition-all border disabled:opacity-20 ${isDarkMode ? 'bg-slate-800 border-slate-700 text-slate-400' : 'bg-white border-slate-200 text-slate-400 shadow-sm'}`}
+                            >
+                                <ChevronLeft className="w-5 h-5" />
+                            </button>
+                            <button
+                                disabled={!pagination.next || isLoading}
+                                onClick={() => setCurrentPage(prev => prev + 1)}
+                                className={`p-2.5 rounded-xl transition-all border disabled:opacity-20 ${isDarkMode ? 'bg-slate-800 border-slate-700 text-slate-400' : 'bg-white border-slate-200 text-slate-400 shadow-sm'}`}
+                            >
+                                <ChevronRight className="w-5 h-5" />
+                            </button>
+                        </div>
+                    </div>
                 </main>
             </div>
 
@@ -231,11 +231,14 @@ export const fetchReports = async () => {
 
 // ── Users ─────────────────────────────────────────────────────────────────────
 
-export const fetchUsers = async ({ search = '', role = '', status = '' } = {}) => {
-    const params = {};
+export const fetchUsers = async ({ page = 1, search = '', role = '', status = '', ordering = '', minRisk = '', maxRisk = '' } = {}) => {
+    const params = { page };
     if (search) params.search = search;
     if (role) params.role = role;
     if (status) params.status = status;
+    if (ordering) params.ordering = ordering;
+    if (minRisk !== '' && minRisk !== null) params.min_risk = minRisk;
+    if (maxRisk !== '' && maxRisk !== null) params.max_risk = maxRisk;
     const response = await axiosInstance.get('/superAdmin/api/users/', { params });
     return response.data;
 };
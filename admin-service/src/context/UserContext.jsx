@@ -1,5 +1,5 @@
 /* eslint-disable react-refresh/only-export-components */
-import React, { createContext, useContext, useState, useCallback, useMemo, useEffect } from 'react';
+import React, { createContext, useContext, useState, useCallback, useMemo, useRef } from 'react';
 import { fetchUsers, toggleUserBlock } from '../api/axios';
 
 const UserContext = createContext();
@@ -17,36 +17,41 @@ export const UserProvider = ({ children }) => {
     const [isLoading, setIsLoading] = useState(true);
     const [error, setError] = useState(null);
     const [stats, setStats] = useState({ total: 0, active: 0, blocked: 0 });
+    // The directory is paginated server-side: `count` is the number of matches for the current filters
+    const [pagination, setPagination] = useState({ count: 0, next: null, previous: null });
+    const lastFilters = useRef({});
+    const latestRequest = useRef(0);
 
-    const loadUsers = useCallback(async (filters = {}) => {
+    const loadUsers = useCallback(async (filters) => {
+        // Refresh / Retry call this without arguments and reload the page being viewed
+        if (filters) lastFilters.current = filters;
+        const request = ++latestRequest.current;
         setIsLoading(true);
         setError(null);
         try {
-            const data = await fetchUsers(filters);
+            const data = await fetchUsers(lastFilters.current);
+            // Ignore a slow response to filters that have since changed
+            if (request !== latestRequest.current) return;
             setUsers(data.users ?? []);
+            setPagination({
+                count: data.count ?? 0,
+                next: data.next ?? null,
+                previous: data.previous ?? null,
+            });
             setStats({
                 total: data.total ?? 0,
                 active: data.active ?? 0,
                 blocked: data.blocked ?? 0,
             });
         } catch (err) {
+            if (request !== latestRequest.current) return;
             console.error('Failed to fetch users:', err);
-            setError(err?.response?.data?.detail || 'Failed to load users.');
+            setError(err?.response?.data?.error || err?.response?.data?.detail || 'Failed to load users.');
         } finally {
-            setIsLoading(false);
+            if (request === latestRequest.current) setIsLoading(false);
         }
     }, []);
 
-    useEffect(() => {
-        const token = localStorage.getItem("accessToken") || localStorage.getItem("authToken");
-        if (token) {
-            loadUsers();
-        } else {
-            setIsLoading(false);
-        }
-    }, [loadUsers]);
-
-
     const updateUserStatus = useCallback(async (userId, newStatus, reason = '') => {
         const action = newStatus === 'BLOCKED' ? 'BLOCK' : 'UNBLOCK';
         try {
@@ -73,9 +78,10 @@ export const UserProvider = ({ children }) => {
         isLoading,
         error,
         stats,
+        pagination,
         updateUserStatus,
         reloadUsers: loadUsers,
-    }), [users, isLoading, error, stats, updateUserStatus, loadUsers]);
+    }), [users, isLoading, error, stats, pagination, updateUserStatus, loadUsers]);
 
     return (
         <UserContext.Provider value={value}>
@@ -0,0 +1,152 @@
+"""
+ShopSphere/pagination.py
+Keyset (cursor) pagination shared by the storefront, admin and delivery listings.
+
+Offset pagination pays for a COUNT(*) and an OFFSET scan that both grow with
+page depth. Keyset pagination instead seeks past the last row of the previous
+page with an indexed `(field, id) < (last_field, last_id)` predicate, so every
+page costs the same. Totals are served from a short-lived cache keyed by the
+query's SQL, which makes them approximate by at most COUNT_CACHE_TTL seconds.
+
+Listings opt in with `?pagination=cursor` (or by passing `?cursor=<token>`);
+the response carries a `next_cursor` token for the following page.
+"""
+import base64
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+COUNT_CACHE_TTL = 60
+
+
+def cached_count(queryset, timeout=COUNT_CACHE_TTL):
+    """COUNT(*) of `queryset`, cached for `timeout` seconds under a key derived from its SQL."""
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    key = 'count:' + hashlib.md5(f"{sql}|{params}".encode()).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout)
+    return count
+
+
+class CachedCountPaginator(Paginator):
+    """Django Paginator whose total count comes from cached_count()."""
+
+    @cached_property
+    def count(self):
+        return cached_count(self.object_list)
+
+
+def wants_cursor(request):
+    params = getattr(request, 'query_params', request.GET)
+    return params.get('pagination') == 'cursor' or 'cursor' in params
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """The {'id': int, 'v': value} position of a cursor token, or None (first page) for anything malformed."""
+    if not cursor:
+        return None
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(position, dict):
+        return None
+    if not isinstance(position.get('id'), int) or isinstance(position['id'], bool):
+        return None
+    return position
+
+
+def keyset_paginate(queryset, cursor, page_size, field='id'):
+    """
+    Return (items, next_cursor) for the page after `cursor`, newest first.
+
+    Rows are ordered by (-field, -id); `id` breaks ties so rows sharing a
+    timestamp are neither skipped nor repeated. `next_cursor` is None on the
+    last page.
+    """
+    position = decode_cursor(cursor)
+    if position and field != 'id':
+        try:
+            position['v'] = queryset.model._meta.get_field(field).to_python(position.get('v'))
+        except (ValidationError, TypeError, ValueError):
+            position = None
+        if position and position['v'] is None:
+            position = None
+    if position:
+        if field == 'id':
+            queryset = queryset.filter(id__lt=position['id'])
+        else:
+            queryset = queryset.filter(
+                Q(**{f'{field}__lt': position['v']}) |
+                Q(**{field: position['v'], 'id__lt': position['id']})
+            )
+
+    ordering = ['-id'] if field == 'id' else [f'-{field}', '-id']
+    items = list(queryset.order_by(*ordering)[:page_size + 1])
+
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        next_cursor = encode_cursor({'v': getattr(last, field), 'id': last.id})
+    return items, next_cursor
+
+
+class OptionalCursorPagination(PageNumberPagination):
+    """
+    Page-number pagination (with a cached total) by default; switches to keyset
+    pagination on `cursor_ordering` when the client asks for it.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    django_paginator_class = CachedCountPaginator
+    cursor_ordering = '-created_at'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = wants_cursor(request)
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.queryset = queryset
+        self.items, self.next_cursor = keyset_paginate(
+            queryset,
+            request.query_params.get('cursor'),
+            self.get_page_size(request),
+            self.cursor_ordering.lstrip('-'),
+        )
+        return self.items
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+
+        next_url = None
+        if self.next_cursor:
+            url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+            next_url = replace_query_param(url, 'cursor', self.next_cursor)
+        return Response({
+            'count': cached_count(self.queryset),
+            'next': next_url,
+            'next_cursor': self.next_cursor,
+            'results': data,
+        })
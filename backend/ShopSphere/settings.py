@@ -129,6 +129,14 @@ if not DEBUG:
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Product image bytes (vendor/image_store.py): 'database', 'filesystem' or 's3' (S3 / MinIO, needs boto3)
+PRODUCT_IMAGE_STORE = os.environ.get('PRODUCT_IMAGE_STORE', 'database')
+PRODUCT_IMAGE_STORE_ROOT = os.environ.get('PRODUCT_IMAGE_STORE_ROOT', str(MEDIA_ROOT / 'product_images'))
+# Only set for a filesystem store on a persistent volume; otherwise image_data is kept as the durable copy
+PRODUCT_IMAGE_STORE_DURABLE = os.environ.get('PRODUCT_IMAGE_STORE_DURABLE', 'False').lower() == 'true'
+PRODUCT_IMAGE_S3_BUCKET = os.environ.get('PRODUCT_IMAGE_S3_BUCKET')
+PRODUCT_IMAGE_S3_ENDPOINT_URL = os.environ.get('PRODUCT_IMAGE_S3_ENDPOINT_URL')
+
 # Authentication
 AUTH_USER_MODEL = 'user.AuthUser'
 
@@ -223,10 +231,103 @@ LOGOUT_REDIRECT_URL = 'login'
 # Enable automatic trailing slash append for API robustness
 APPEND_SLASH = True
 
+# Caches - the 'catalog' alias holds pre-rendered home_api pages (vendor/catalog_cache.py).
+# CATALOG_CACHE_BACKEND: 'file' (default, shared by the workers of one host), 'redis' (several hosts, needs
+# redis-py), 'locmem' (single process only - other workers serve stale pages until the TTL) or 'fakeredis' (tests)
+CATALOG_CACHE_BACKEND = os.environ.get('CATALOG_CACHE_BACKEND', 'file')
+CATALOG_CACHE_TTL = int(os.environ.get('CATALOG_CACHE_TTL', 60))
+_CATALOG_CACHES = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shopsphere-catalog',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CATALOG_CACHE_LOCATION', str(BASE_DIR / '.cache' / 'catalog')),
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+    },
+}
+if CATALOG_CACHE_BACKEND == 'fakeredis':
+    import fakeredis
+    _CATALOG_CACHES['fakeredis'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://fakeredis/1',
+        'OPTIONS': {'connection_class': fakeredis.FakeConnection},
+    }
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalog': _CATALOG_CACHES[CATALOG_CACHE_BACKEND],
+}
+
+# Seconds between batched flushes of buffered product search counts (vendor/hit_counter.py)
+SEARCH_COUNT_FLUSH_INTERVAL = int(os.environ.get('SEARCH_COUNT_FLUSH_INTERVAL', 30))
+
+# Seconds between full rebuilds of the in-memory delivery agent index (deliveryAgent/agent_index.py)
+AGENT_INDEX_REBUILD_INTERVAL = int(os.environ.get('AGENT_INDEX_REBUILD_INTERVAL', 300))
+
+# Per-agent cap on active assignments for batch auto-assignment (manage.py assign_unassigned_orders)
+DELIVERY_AGENT_MAX_ACTIVE_ASSIGNMENTS = int(os.environ.get('DELIVERY_AGENT_MAX_ACTIVE_ASSIGNMENTS', 10))
+
+# Batched GPS points closer than this to the previous stored point are dropped (deliveryAgent/tracking.py)
+GPS_MIN_MOVE_METERS = float(os.environ.get('GPS_MIN_MOVE_METERS', 20))
+
+# Finished deliveries older than this get their GPS breadcrumbs compacted (manage.py compact_delivery_tracking)
+DELIVERY_TRACKING_RETENTION_DAYS = int(os.environ.get('DELIVERY_TRACKING_RETENTION_DAYS', 30))
+
+# Live order tracking push channel (deliveryAgent/live_tracking.py)
+# LIVE_TRACKING_MODE: 'poll' (default; snapshot per connection, safe on sync workers) or
+# 'push' (long-lived streams - needs async gunicorn workers, and the redis broker with several processes)
+LIVE_TRACKING_MODE = os.environ.get('LIVE_TRACKING_MODE', 'poll')
+LIVE_TRACKING_POLL_INTERVAL = int(os.environ.get('LIVE_TRACKING_POLL_INTERVAL', 10))
+# Lifetime of the ?token= handed to EventSource clients, which cannot send an Authorization header
+LIVE_TRACKING_TOKEN_MAX_AGE = int(os.environ.get('LIVE_TRACKING_TOKEN_MAX_AGE', 3600))
+# LIVE_TRACKING_BROKER: 'memory' (single process), 'redis' (multi-process, needs redis-py) or 'fakeredis'
+LIVE_TRACKING_BROKER = os.environ.get('LIVE_TRACKING_BROKER', 'memory')
+LIVE_TRACKING_REDIS_URL = os.environ.get('LIVE_TRACKING_REDIS_URL', os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/2'))
+LIVE_TRACKING_HEARTBEAT = int(os.environ.get('LIVE_TRACKING_HEARTBEAT', 15))
+# Keep below gunicorn's --timeout (120 in render.yaml)
+LIVE_TRACKING_MAX_STREAM_SECONDS = int(os.environ.get('LIVE_TRACKING_MAX_STREAM_SECONDS', 100))
+
+# Max age (seconds) of the materialised admin dashboard counters (superAdmin/metrics.py)
+PLATFORM_METRICS_MAX_AGE = int(os.environ.get('PLATFORM_METRICS_MAX_AGE', 60))
+
+# Closed days ReportsView rolls up per request (superAdmin/rollups.py); the rest are served live until
+# `manage.py build_revenue_rollups` (run by the build step) or later requests catch up
+REVENUE_ROLLUP_DAYS_PER_REQUEST = int(os.environ.get('REVENUE_ROLLUP_DAYS_PER_REQUEST', 7))
+
+# Rows fetched per database round trip (and per Parquet row group) by the streaming exports (superAdmin/exports.py)
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 2000))
+
+# Ledger ids per short settlement transaction in FinanceService.release_expired_funds
+SETTLEMENT_CHUNK_SIZE = int(os.environ.get('SETTLEMENT_CHUNK_SIZE', 5000))
+
+# Seconds the vendor earnings aggregates / analytics series stay cached (finance/earnings_cache.py)
+VENDOR_EARNINGS_CACHE_TTL = int(os.environ.get('VENDOR_EARNINGS_CACHE_TTL', 60))
+
+# Smallest settled balance paid out by a payout batch run, and vendors per batch transaction (FinanceService.run_payout_batch)
+PAYOUT_MIN_AMOUNT = int(os.environ.get('PAYOUT_MIN_AMOUNT', 100))
+PAYOUT_BATCH_SIZE = int(os.environ.get('PAYOUT_BATCH_SIZE', 500))
+
+# Cache holding the commission rule version token (finance/commission_rules.py). Rule tables are only
+# kept in-process when this alias is shared between workers; they are reloaded at least every MAX_AGE seconds
+COMMISSION_RULES_CACHE_ALIAS = os.environ.get('COMMISSION_RULES_CACHE_ALIAS', 'default')
+COMMISSION_RULES_MAX_AGE = int(os.environ.get('COMMISSION_RULES_MAX_AGE', 60))
+
 # Email Configuration — credentials from environment variables
 import ssl
 EMAIL_SSL_KEYFILE = None
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# SMTP by default. Set EMAIL_BACKEND=user.email_outbox.OutboxEmailBackend only where a
+# `manage.py process_email_outbox --loop` worker runs: send_mail() then only queues into the
+# OutboundEmail table and the worker delivers through EMAIL_OUTBOX_DELIVERY_BACKEND
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_OUTBOX_DELIVERY_BACKEND = os.environ.get('EMAIL_OUTBOX_DELIVERY_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_OUTBOX_BATCH_SIZE = int(os.environ.get('EMAIL_OUTBOX_BATCH_SIZE', 50))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('EMAIL_OUTBOX_MAX_ATTEMPTS', 8))
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
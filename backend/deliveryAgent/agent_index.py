@@ -0,0 +1,350 @@
+"""
+deliveryAgent/agent_index.py
+In-memory index of assignable delivery agents used by auto-assignment.
+
+Approved, active, non-blocked agents are bucketed by service pincode,
+3-digit pincode region and city, and placed on a lat/lon grid, so finding
+the candidates for an address is a few dict lookups instead of a Python
+loop over every agent. Coordinates and status weights live in per-slot
+columns so candidate distances are computed in one vectorised haversine
+(NumPy when installed, a plain math loop otherwise).
+
+Keeping it fresh:
+  * deliveryAgent/signals.py upserts an agent after every committed
+    profile save (profile edits, availability toggles, location updates)
+    and drops it on delete.
+  * get_agent_index() re-reads profiles whose `updated_at` moved since the
+    last sync, which picks up saves made by other worker processes.
+  * the whole index is rebuilt every AGENT_INDEX_REBUILD_INTERVAL seconds
+    (default 300) to forget agents deleted in other processes.
+"""
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional - scoring falls back to pure Python
+    np = None
+
+from .models import DeliveryAgentProfile
+
+
+EARTH_RADIUS_KM = 6371
+GRID_CELL_DEGREES = 0.05  # ~5.5 km of latitude
+REFRESH_OVERLAP = timedelta(seconds=30)
+
+# Status Weight: available(0), on_delivery(1), on_break(2), offline(3)
+STATUS_WEIGHTS = {'available': 0, 'on_delivery': 1, 'on_break': 2, 'offline': 3}
+UNKNOWN_STATUS_WEIGHT = 4
+
+AGENT_FIELDS = (
+    'id', 'city', 'postal_code', 'service_cities', 'service_pincodes',
+    'latitude', 'longitude', 'availability_status', 'preferred_delivery_radius',
+    'approval_status', 'is_blocked', 'is_active',
+)
+
+
+def is_assignable(row):
+    return row['approval_status'] == 'approved' and not row['is_blocked'] and row['is_active']
+
+
+def grid_cell(lat, lon):
+    return (math.floor(lat / GRID_CELL_DEGREES), math.floor(lon / GRID_CELL_DEGREES))
+
+
+def haversine_km(lat, lon, lats, lons):
+    """
+    Great-circle distances (km) from one point to many.
+    Points with a missing (NaN) coordinate get an infinite distance.
+    """
+    if np is not None:
+        lat1, lon1 = np.radians(lat), np.radians(lon)
+        lat2, lon2 = np.radians(np.asarray(lats, dtype=float)), np.radians(np.asarray(lons, dtype=float))
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+        return np.where(np.isnan(distances), np.inf, distances)
+
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    cos_lat1 = math.cos(lat1)
+    distances = []
+    for lat2, lon2 in zip(lats, lons):
+        if math.isnan(lat2) or math.isnan(lon2):
+            distances.append(math.inf)
+            continue
+        lat2, lon2 = math.radians(lat2), math.radians(lon2)
+        a = math.sin((lat2 - lat1) / 2) ** 2 + cos_lat1 * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+        distances.append(2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a)))
+    return distances
+
+
+class AgentEntry:
+    __slots__ = ('id', 'slot', 'city', 'pincodes', 'regions', 'cities', 'service_cities', 'cell', 'radius_km')
+
+
+class AgentIndex:
+    """Buckets and coordinate columns for the currently assignable agents."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.entries = {}
+        self.by_pincode = {}
+        self.by_region = {}
+        self.by_city = {}          # home city + service cities
+        self.by_service_city = {}  # service cities/states only
+        self.by_cell = {}
+        self.free_slots = []
+        self.size = 0
+        self.lat = self._column(64)
+        self.lon = self._column(64)
+        self.weight = self._column(64)
+        self.built_at = time.monotonic()
+        self.synced_at = None
+
+    # ── Construction & sync ──────────────────────────────────────────────────
+
+    @classmethod
+    def build(cls):
+        index = cls()
+        synced_at = timezone.now()
+        rows = DeliveryAgentProfile.objects.filter(
+            approval_status='approved',
+            is_blocked=False,
+            is_active=True,
+        ).values(*AGENT_FIELDS)
+        for row in rows:
+            index.upsert(row)
+        index.synced_at = synced_at
+        return index
+
+    def refresh(self):
+        """Re-read agents saved since the last sync (in any process)."""
+        synced_at = timezone.now()
+        rows = DeliveryAgentProfile.objects.filter(
+            updated_at__gte=self.synced_at - REFRESH_OVERLAP
+        ).values(*AGENT_FIELDS)
+        for row in rows:
+            self.upsert(row)
+        self.synced_at = synced_at
+
+    def is_expired(self):
+        return time.monotonic() - self.built_at > getattr(settings, 'AGENT_INDEX_REBUILD_INTERVAL', 300)
+
+    # ── Mutation ─────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _column(size):
+        if np is not None:
+            return np.full(size, np.nan)
+        return [math.nan] * size
+
+    def _grow(self):
+        extra = len(self.lat)
+        if np is not None:
+            self.lat = np.concatenate([self.lat, self._column(extra)])
+            self.lon = np.concatenate([self.lon, self._column(extra)])
+            self.weight = np.concatenate([self.weight, self._column(extra)])
+        else:
+            self.lat.extend(self._column(extra))
+            self.lon.extend(self._column(extra))
+            self.weight.extend(self._column(extra))
+
+    @staticmethod
+    def _add(buckets, key, agent_id):
+        if key:
+            buckets.setdefault(key, set()).add(agent_id)
+
+    @staticmethod
+    def _discard(buckets, key, agent_id):
+        ids = buckets.get(key)
+        if ids is not None:
+            ids.discard(agent_id)
+            if not ids:
+                del buckets[key]
+
+    def upsert(self, row):
+        """Insert or replace an agent from a values() row (or drop it if no longer assignable)."""
+        with self.lock:
+            self.remove(row['id'])
+            if not is_assignable(row):
+                return
+
+            entry = AgentEntry()
+            entry.id = row['id']
+            entry.city = (row['city'] or '').strip().lower()
+            entry.service_cities = {c.strip().lower() for c in (row['service_cities'] or []) if c}
+            entry.cities = entry.service_cities | {entry.city}
+            entry.pincodes = {str(p).strip() for p in (row['service_pincodes'] or []) if p}
+            entry.pincodes.add((row['postal_code'] or '').strip())
+            entry.regions = {p[:3] for p in entry.pincodes if len(p) >= 3}
+            entry.radius_km = row['preferred_delivery_radius']
+
+            if self.free_slots:
+                entry.slot = self.free_slots.pop()
+            else:
+                if self.size == len(self.lat):
+                    self._grow()
+                entry.slot = self.size
+                self.size += 1
+
+            entry.cell = None
+            if row['latitude'] is not None and row['longitude'] is not None:
+                lat, lon = float(row['latitude']), float(row['longitude'])
+                entry.cell = grid_cell(lat, lon)
+                self.lat[entry.slot] = lat
+                self.lon[entry.slot] = lon
+                self._add(self.by_cell, entry.cell, entry.id)
+            self.weight[entry.slot] = STATUS_WEIGHTS.get(row['availability_status'], UNKNOWN_STATUS_WEIGHT)
+
+            for pincode in entry.pincodes:
+                self._add(self.by_pincode, pincode, entry.id)
+            for region in entry.regions:
+                self._add(self.by_region, region, entry.id)
+            for city in entry.cities:
+                self._add(self.by_city, city, entry.id)
+            for city in entry.service_cities:
+                self._add(self.by_service_city, city, entry.id)
+            self.entries[entry.id] = entry
+
+    def remove(self, agent_id):
+        with self.lock:
+            entry = self.entries.pop(agent_id, None)
+            if entry is None:
+                return
+            for pincode in entry.pincodes:
+                self._discard(self.by_pincode, pincode, agent_id)
+            for region in entry.regions:
+                self._discard(self.by_region, region, agent_id)
+            for city in entry.cities:
+                self._discard(self.by_city, city, agent_id)
+            for city in entry.service_cities:
+                self._discard(self.by_service_city, city, agent_id)
+            if entry.cell is not None:
+                self._discard(self.by_cell, entry.cell, agent_id)
+            self.lat[entry.slot] = math.nan
+            self.lon[entry.slot] = math.nan
+            self.free_slots.append(entry.slot)
+
+    # ── Lookup ───────────────────────────────────────────────────────────────
+
+    def all_ids(self):
+        with self.lock:
+            return list(self.entries)
+
+    def match_delivery(self, pincode, city, state):
+        """
+        Candidate ids for a delivery address, from the best non-empty tier:
+          1. Exact pincode   2. Pincode region (first 3 digits)   3. City/State
+        Returns [] when nothing matches.
+        """
+        with self.lock:
+            ids = self.by_pincode.get(pincode)
+            if pincode and ids:
+                return list(ids)
+            ids = self.by_region.get(pincode[:3]) if len(pincode) >= 3 else None
+            if ids:
+                return list(ids)
+            ids = set(self.by_city.get(city, ())) if city else set()
+            if state:
+                ids |= self.by_service_city.get(state, set())
+            return list(ids)
+
+    def match_return(self, pincode, city):
+        """Candidate ids for a return pickup: pincode or city match."""
+        with self.lock:
+            ids = set(self.by_pincode.get(pincode, ())) if pincode else set()
+            if city:
+                ids |= self.by_city.get(city, set())
+            return list(ids)
+
+    def nearby(self, lat, lon, radius_km):
+        """Ids of agents within `radius_km` of (lat, lon), found through the grid."""
+        lat, lon = float(lat), float(lon)
+        lat_span = math.ceil(radius_km / 111.0 / GRID_CELL_DEGREES)
+        lon_degrees = radius_km / (111.0 * max(math.cos(math.radians(lat)), 0.01))
+        lon_span = math.ceil(lon_degrees / GRID_CELL_DEGREES)
+        row, col = grid_cell(lat, lon)
+
+        with self.lock:
+            cell_ids = []
+            for r in range(row - lat_span, row + lat_span + 1):
+                for c in range(col - lon_span, col + lon_span + 1):
+                    cell_ids.extend(self.by_cell.get((r, c), ()))
+            if not cell_ids:
+                return []
+            distances = self.distances(cell_ids, lat, lon)
+        return [agent_id for agent_id, d in zip(cell_ids, distances) if d <= radius_km]
+
+    def distances(self, agent_ids, lat, lon):
+        """Distances (km) from (lat, lon) to each agent; inf where either side has no coordinates."""
+        if lat is None or lon is None:
+            return [math.inf] * len(agent_ids)
+        with self.lock:
+            slots = [self.entries[agent_id].slot for agent_id in agent_ids]
+            if np is not None:
+                slots = np.asarray(slots, dtype=np.intp)
+                return haversine_km(float(lat), float(lon), self.lat[slots], self.lon[slots])
+            return haversine_km(float(lat), float(lon), [self.lat[s] for s in slots], [self.lon[s] for s in slots])
+
+    def radius_km(self, agent_id):
+        return self.entries[agent_id].radius_km
+
+    def rank(self, agent_ids, lat, lon, workloads, use_distance=True, distances=None):
+        """
+        Order candidate ids best first by:
+          1. Availability Status (Weight)
+          2. Proximity (Distance)
+          3. Number of active orders (Load balance)
+        Precomputed `distances` (aligned with `agent_ids`) skip the haversine step.
+        """
+        if not agent_ids:
+            return []
+        with self.lock:
+            if distances is None:
+                agent_ids = [agent_id for agent_id in agent_ids if agent_id in self.entries]
+                if use_distance:
+                    distances = self.distances(agent_ids, lat, lon)
+                else:
+                    distances = [0.0] * len(agent_ids)
+            loads = [workloads.get(agent_id, 0) for agent_id in agent_ids]
+            slots = [self.entries[agent_id].slot for agent_id in agent_ids]
+
+            if np is not None:
+                weights = self.weight[np.asarray(slots, dtype=np.intp)]
+                # lexsort uses the last key as the primary one
+                order = np.lexsort((np.asarray(loads), np.asarray(distances), weights))
+                return [agent_ids[i] for i in order]
+
+            weights = [self.weight[s] for s in slots]
+            order = sorted(range(len(agent_ids)), key=lambda i: (weights[i], distances[i], loads[i]))
+            return [agent_ids[i] for i in order]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_agent_index():
+    """Return the process-wide index, building it on first use and syncing recent profile changes."""
+    global _index
+    with _index_lock:
+        if _index is None or _index.is_expired():
+            _index = AgentIndex.build()
+        else:
+            _index.refresh()
+        return _index
+
+
+def update_agent(profile):
+    """Apply a saved profile to an already-built index (no-op before first use)."""
+    if _index is not None:
+        _index.upsert({field: getattr(profile, field) for field in AGENT_FIELDS})
+
+
+def remove_agent(agent_id):
+    if _index is not None:
+        _index.remove(agent_id)
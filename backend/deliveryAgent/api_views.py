@@ -25,6 +25,8 @@ from .serializers import (
     DeliveryDailyStatsSerializer, DeliveryFeedbackSerializer
 )
 from user.models import Order
+from ShopSphere.pagination import cached_count, keyset_paginate, wants_cursor
+from .live_tracking import publish_order_event
 
 User = get_user_model()
 
@@ -159,6 +161,18 @@ class DeliveryAssignmentViewSet(viewsets.ViewSet):
             if status_filter:
                 queryset = queryset.filter(status=status_filter)
             
+            # Opt-in keyset pagination (?pagination=cursor / ?cursor=...) for long assignment histories
+            if wants_cursor(request):
+                page_size = StandardResultsSetPagination().get_page_size(request)
+                assignments, next_cursor = keyset_paginate(
+                    queryset, request.query_params.get('cursor'), page_size, 'assigned_at'
+                )
+                return Response({
+                    'count': cached_count(queryset),
+                    'next_cursor': next_cursor,
+                    'results': DeliveryAssignmentListSerializer(assignments, many=True).data,
+                }, status=status.HTTP_200_OK)
+            
             serializer = DeliveryAssignmentListSerializer(queryset, many=True)
             return Response(serializer.data, status=status.HTTP_200_OK)
         except DeliveryAgentProfile.DoesNotExist:
@@ -436,6 +450,11 @@ class DeliveryTrackingViewSet(viewsets.ViewSet):
                 'address': request.data.get('address', '')
             }
             assignment.save()
+
+            publish_order_event(assignment.order_id, 'location', {
+                **assignment.current_location,
+                'tracked_at': tracking.tracked_at,
+            })
             
             serializer = DeliveryTrackingSerializer(tracking)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -444,6 +463,27 @@ class DeliveryTrackingViewSet(viewsets.ViewSet):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+    @action(detail=False, methods=['post'], url_path='batch')
+    def ingest_locations(self, request):
+        """
+        Upload buffered GPS points for several assignments at once.
+        Body: {"assignments": [{"assignment_id": 1, "points": [{"latitude", "longitude", "recorded_at", ...}]}]}
+        """
+        from .tracking import ingest_locations
+
+        try:
+            agent = DeliveryAgentProfile.objects.get(user=request.user)
+        except DeliveryAgentProfile.DoesNotExist:
+            return Response({'error': 'Agent profile not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            result = ingest_locations(agent, request.data.get('assignments'))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response(result, status=status.HTTP_201_CREATED)
+
     @action(detail=True, methods=['get'])
     def get_tracking_history(self, request, pk=None):
         """Get tracking history for a delivery"""
@@ -451,12 +491,9 @@ class DeliveryTrackingViewSet(viewsets.ViewSet):
             agent = DeliveryAgentProfile.objects.get(user=request.user)
             assignment = DeliveryAssignment.objects.get(id=pk, agent=agent)
             
-            tracking = DeliveryTracking.objects.filter(
-                delivery_assignment=assignment
-            ).order_by('-tracked_at')
-            
-            serializer = DeliveryTrackingSerializer(tracking, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            # Old finished deliveries keep part of their history as a polyline
+            from .tracking import tracking_history
+            return Response(tracking_history(assignment), status=status.HTTP_200_OK)
         except (DeliveryAgentProfile.DoesNotExist, DeliveryAssignment.DoesNotExist):
             return Response({'error': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class DeliveryagentConfig(AppConfig):
     name = 'deliveryAgent'
+
+    def ready(self):
+        import deliveryAgent.signals
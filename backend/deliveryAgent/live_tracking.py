@@ -0,0 +1,234 @@
+"""
+deliveryAgent/live_tracking.py
+Live order-tracking push channel (Server-Sent Events).
+
+Delivery status transitions (deliveryAgent/signals.py, for every
+DeliveryAssignment save - DeliveryStatusUpdateView and the mark_* methods)
+and GPS updates (update_location and the batched ingestion endpoint) are
+published after commit to the channel of their order. Customers subscribe
+through GET /order_tracking/<order_number>/stream and receive a
+snapshot followed by pushed events, instead of polling order_tracking.
+
+The broker is pluggable through LIVE_TRACKING_BROKER:
+    'memory' (default)  in-process pub/sub - publishers and subscribers
+                        must share the process (runserver, single worker)
+    'redis'             Redis PUBLISH/SUBSCRIBE on LIVE_TRACKING_REDIS_URL,
+                        for multi-process deployments (needs redis-py)
+    'fakeredis'         the redis broker on fakeredis (tests/local dev)
+
+LIVE_TRACKING_MODE selects how the stream endpoint answers:
+    'poll' (default)    every connection gets the current snapshot and is
+                        closed at once with `retry: LIVE_TRACKING_POLL_INTERVAL`,
+                        so EventSource re-polls on its own and no worker is
+                        held open. Safe on sync gunicorn workers.
+    'push'              connections stay open and receive pushed events. Each
+                        open stream occupies a worker, so only enable this on
+                        async workers (e.g. gunicorn -k gevent) with the redis
+                        broker when running more than one process.
+
+Pushed streams send a keep-alive comment every LIVE_TRACKING_HEARTBEAT
+seconds and end after LIVE_TRACKING_MAX_STREAM_SECONDS (keep it below the
+gunicorn --timeout); EventSource clients reconnect automatically.
+
+Browsers' EventSource cannot send an Authorization header, so order_tracking
+hands out a short-lived signed `stream_token` (stream_token()) that the
+stream endpoint accepts as ?token=.
+"""
+import json
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+
+STREAM_TOKEN_SALT = 'order-tracking-stream'
+
+
+def order_channel(order_id):
+    return f"order-tracking:{order_id}"
+
+
+class InProcessBroker:
+    """Fan-out to subscriber queues living in this process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = {}
+
+    def publish(self, channel, message):
+        with self.lock:
+            targets = list(self.subscribers.get(channel, ()))
+        for q in targets:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                pass  # A stalled client only loses intermediate updates
+
+    def subscribe(self, channel):
+        return InProcessSubscription(self, channel)
+
+
+class InProcessSubscription:
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.queue = queue.Queue(maxsize=100)
+        with broker.lock:
+            broker.subscribers.setdefault(channel, set()).add(self.queue)
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        with self.broker.lock:
+            subscribers = self.broker.subscribers.get(self.channel)
+            if subscribers is not None:
+                subscribers.discard(self.queue)
+                if not subscribers:
+                    del self.broker.subscribers[self.channel]
+
+
+class RedisBroker:
+    """Redis PUBLISH/SUBSCRIBE, shared by every worker process."""
+
+    def __init__(self, url, connection_class=None):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured("LIVE_TRACKING_BROKER='redis' requires the redis package.")
+        kwargs = {'connection_class': connection_class} if connection_class else {}
+        self.client = redis.Redis.from_url(url, **kwargs)
+
+    def publish(self, channel, message):
+        self.client.publish(channel, message)
+
+    def subscribe(self, channel):
+        return RedisSubscription(self.client, channel)
+
+
+class RedisSubscription:
+    def __init__(self, client, channel):
+        self.pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.subscribe(channel)
+
+    def get(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            # Returns None early for the (ignored) subscribe confirmation
+            message = self.pubsub.get_message(timeout=remaining)
+            if message is not None:
+                data = message['data']
+                return data.decode() if isinstance(data, bytes) else data
+
+    def close(self):
+        self.pubsub.close()
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        backend = getattr(settings, 'LIVE_TRACKING_BROKER', 'memory')
+        url = getattr(settings, 'LIVE_TRACKING_REDIS_URL', 'redis://127.0.0.1:6379/2')
+        if backend == 'memory':
+            _broker = InProcessBroker()
+        elif backend == 'redis':
+            _broker = RedisBroker(url)
+        elif backend == 'fakeredis':
+            import fakeredis
+            _broker = RedisBroker(url, connection_class=fakeredis.FakeConnection)
+        else:
+            raise ImproperlyConfigured(f"Unknown LIVE_TRACKING_BROKER '{backend}'.")
+    return _broker
+
+
+def publish_order_event(order_id, event, data):
+    """
+    Publish an event to the order's subscribers once the current transaction
+    commits. `data` may be a callable, evaluated at commit time.
+    """
+    def send():
+        try:
+            payload = data() if callable(data) else data
+            message = json.dumps({'event': event, 'data': payload}, default=str)
+            get_broker().publish(order_channel(order_id), message)
+        except Exception as e:
+            print(f"DEBUG: Live tracking publish failed for order #{order_id}: {e}")
+
+    transaction.on_commit(send)
+
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def stream_token(user_id, order_number):
+    """Signed token letting an EventSource (no Authorization header) open the order's stream."""
+    return signing.dumps({'u': user_id, 'o': order_number}, salt=STREAM_TOKEN_SALT)
+
+
+def stream_token_user_id(token, order_number):
+    """The user id of a valid, unexpired token for this order, else None."""
+    try:
+        data = signing.loads(token, salt=STREAM_TOKEN_SALT, max_age=getattr(settings, 'LIVE_TRACKING_TOKEN_MAX_AGE', 3600))
+    except signing.BadSignature:
+        return None
+    if not isinstance(data, dict) or data.get('o') != order_number:
+        return None
+    return data.get('u')
+
+
+def poll_stream(snapshot):
+    """
+    SSE 'poll' mode: one 'snapshot' event, then the stream ends and the
+    client reconnects after LIVE_TRACKING_POLL_INTERVAL seconds.
+    """
+    yield f"retry: {getattr(settings, 'LIVE_TRACKING_POLL_INTERVAL', 10) * 1000}\n\n"
+    yield format_sse('snapshot', snapshot())
+
+
+def tracking_stream(order_id, snapshot):
+    """The SSE generator for the configured LIVE_TRACKING_MODE."""
+    mode = getattr(settings, 'LIVE_TRACKING_MODE', 'poll')
+    if mode == 'poll':
+        return poll_stream(snapshot)
+    if mode == 'push':
+        return event_stream(order_id, snapshot)
+    raise ImproperlyConfigured(f"Unknown LIVE_TRACKING_MODE '{mode}'.")
+
+
+def event_stream(order_id, snapshot):
+    """
+    SSE generator for one order: a 'snapshot' event built by calling
+    `snapshot()`, then every published event, with keep-alive comments in
+    between. The snapshot is taken after subscribing so no event falls
+    between the two.
+    """
+    heartbeat = getattr(settings, 'LIVE_TRACKING_HEARTBEAT', 15)
+    deadline = time.monotonic() + getattr(settings, 'LIVE_TRACKING_MAX_STREAM_SECONDS', 100)
+
+    subscription = get_broker().subscribe(order_channel(order_id))
+    try:
+        # Tell EventSource to reconnect after 3s once the stream ends
+        yield "retry: 3000\n\n"
+        yield format_sse('snapshot', snapshot())
+        while time.monotonic() < deadline:
+            message = subscription.get(timeout=min(heartbeat, max(deadline - time.monotonic(), 0.1)))
+            if message is None:
+                yield ": keep-alive\n\n"
+                continue
+            payload = json.loads(message)
+            yield format_sse(payload['event'], payload['data'])
+    finally:
+        subscription.close()
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Auto-assign every shipped-but-unassigned order to delivery agents in one batch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-active', type=int, default=None,
+                            help='Per-agent cap on active assignments (default: DELIVERY_AGENT_MAX_ACTIVE_ASSIGNMENTS)')
+        parser.add_argument('--limit', type=int, default=None, help='Only consider the N oldest unassigned orders')
+        parser.add_argument('--dry-run', action='store_true', help='Plan the assignment without writing it')
+
+    def handle(self, *args, **options):
+        from deliveryAgent.services import batch_assign_orders
+
+        result = batch_assign_orders(
+            max_active=options['max_active'],
+            limit=options['limit'],
+            dry_run=options['dry_run'],
+        )
+
+        verb = 'Would assign' if options['dry_run'] else 'Successfully assigned'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(result['assigned'])} orders."))
+        if result['unassigned']:
+            self.stdout.write(self.style.WARNING(
+                f"{len(result['unassigned'])} orders have no agent within radius and capacity: "
+                f"{', '.join(str(order_id) for order_id in result['unassigned'][:50])}"
+            ))
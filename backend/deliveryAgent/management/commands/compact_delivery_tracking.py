@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Fold GPS breadcrumbs of old delivered/failed assignments into polylines and delete the raw rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Only compact assignments finished more than N days ago (default: DELIVERY_TRACKING_RETENTION_DAYS)')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows deleted per DELETE statement')
+        parser.add_argument('--limit', type=int, default=None, help='Compact at most N assignments in this run')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the assignments that would be compacted')
+
+    def handle(self, *args, **options):
+        from deliveryAgent.tracking import compactable_assignments, compact_assignment
+
+        assignments = compactable_assignments(options['days']).order_by('id')
+        if options['limit']:
+            assignments = assignments[:options['limit']]
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'Found {assignments.count()} assignments to compact.'))
+            return
+
+        compacted = deleted = 0
+        for assignment in assignments.iterator(chunk_size=500):
+            deleted += compact_assignment(assignment, chunk_size=options['chunk_size'])
+            compacted += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully compacted {compacted} assignments, deleting {deleted} tracking rows.'
+        ))
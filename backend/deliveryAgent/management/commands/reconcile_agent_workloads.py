@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+
+class Command(BaseCommand):
+    help = 'Recompute DeliveryAgentProfile.active_assignment_count from active delivery assignments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without fixing it')
+
+    def handle(self, *args, **options):
+        from deliveryAgent.models import DeliveryAgentProfile, DeliveryAssignment
+
+        actual = {
+            row['agent']: row['active']
+            for row in DeliveryAssignment.objects.filter(status__in=DeliveryAssignment.ACTIVE_STATUSES)
+            .values('agent').annotate(active=Count('id')).order_by()
+        }
+
+        drifted = []
+        for agent in DeliveryAgentProfile.objects.only('id', 'active_assignment_count').iterator(chunk_size=2000):
+            active = actual.get(agent.id, 0)
+            if agent.active_assignment_count != active:
+                agent.active_assignment_count = active
+                drifted.append(agent)
+
+        if drifted and not options['dry_run']:
+            DeliveryAgentProfile.objects.bulk_update(drifted, ['active_assignment_count'], batch_size=500)
+
+        verb = 'Found' if options['dry_run'] else 'Reconciled'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(drifted)} agents with a drifted active assignment count.'))
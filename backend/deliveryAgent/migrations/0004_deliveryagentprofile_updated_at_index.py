@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deliveryAgent', '0003_alter_deliveryagentperformance_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='deliveryagentprofile',
+            index=models.Index(fields=['updated_at'], name='deliveryAge_updated_1a488f_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+
+ACTIVE_STATUSES = ['assigned', 'accepted', 'picked_up', 'in_transit']
+
+
+def backfill_active_assignment_count(apps, schema_editor):
+    DeliveryAgentProfile = apps.get_model('deliveryAgent', 'DeliveryAgentProfile')
+    DeliveryAssignment = apps.get_model('deliveryAgent', 'DeliveryAssignment')
+
+    rows = DeliveryAssignment.objects.filter(status__in=ACTIVE_STATUSES).values('agent').annotate(active=Count('id')).order_by()
+    for row in rows:
+        DeliveryAgentProfile.objects.filter(pk=row['agent']).update(active_assignment_count=row['active'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deliveryAgent', '0004_deliveryagentprofile_updated_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deliveryagentprofile',
+            name='active_assignment_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_active_assignment_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deliveryAgent', '0005_deliveryagentprofile_active_assignment_count'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='deliverytracking',
+            name='tracked_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
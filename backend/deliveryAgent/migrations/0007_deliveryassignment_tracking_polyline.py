@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deliveryAgent', '0006_deliverytracking_tracked_at_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deliveryassignment',
+            name='tracking_compacted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='deliveryassignment',
+            name='tracking_polyline',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='deliveryassignment',
+            name='tracking_polyline_meta',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
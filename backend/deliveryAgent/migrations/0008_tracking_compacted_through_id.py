@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deliveryAgent', '0007_deliveryassignment_tracking_polyline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deliveryassignment',
+            name='tracking_compacted_through_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -2,7 +2,8 @@ from django.db import models
 from django.conf import settings
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db.models import Sum, Avg
+from django.db.models import Sum, Avg, F
+from django.db.models.functions import Greatest
 from decimal import Decimal
 
 
@@ -126,6 +127,8 @@ class DeliveryAgentProfile(models.Model):
     )
     total_reviews = models.IntegerField(default=0)
     total_earnings = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # Assignments in DeliveryAssignment.ACTIVE_STATUSES, kept current by deliveryAgent/signals.py
+    active_assignment_count = models.IntegerField(default=0)
     
     # Timestamps
     created_at = models.DateTimeField(default=timezone.now)
@@ -142,6 +145,7 @@ class DeliveryAgentProfile(models.Model):
             models.Index(fields=['availability_status']),
             models.Index(fields=['is_blocked']),
             models.Index(fields=['-created_at']),
+            models.Index(fields=['updated_at']),
         ]
 
     def __str__(self):
@@ -157,6 +161,14 @@ class DeliveryAgentProfile(models.Model):
             agent=self,
             status__in=['assigned', 'accepted', 'picked_up', 'in_transit', 'arrived']
         ).count()
+
+    @classmethod
+    def apply_workload_change(cls, agent_id, delta):
+        """Atomically adjust the denormalised active assignment counter of one agent."""
+        # update() rather than save(): no updated_at bump, so the agent index is not re-synced
+        cls.objects.filter(pk=agent_id).update(
+            active_assignment_count=Greatest(F('active_assignment_count') + delta, 0)
+        )
     
     def get_pending_commission(self):
         """Get total commission pending payout"""
@@ -186,6 +198,9 @@ class DeliveryAssignment(models.Model):
         ('cancelled', 'Cancelled'),
     ]
 
+    # Statuses that count towards an agent's workload during auto-assignment
+    ACTIVE_STATUSES = ['assigned', 'accepted', 'picked_up', 'in_transit']
+
     ASSIGNMENT_TYPE_CHOICES = [
         ('delivery', 'Standard Delivery'),
         ('return', 'Return Pickup'),
@@ -243,6 +258,13 @@ class DeliveryAssignment(models.Model):
     otp_code = models.CharField(max_length=6, null=True, blank=True)
     failure_reason = models.TextField(blank=True, null=True)
 
+    # Compacted GPS breadcrumbs of old, finished deliveries (see deliveryAgent/tracking.py)
+    tracking_polyline = models.TextField(blank=True, default='')
+    tracking_polyline_meta = models.JSONField(default=dict, blank=True)  # {"precision", "start", "offsets", "statuses"}
+    tracking_compacted_at = models.DateTimeField(null=True, blank=True)
+    # Highest DeliveryTracking id seen by the last compaction; rows inserted later (late uploads) get merged next run
+    tracking_compacted_through_id = models.BigIntegerField(null=True, blank=True)
+
     class Meta:
         ordering = ['-assigned_at']
         indexes = [
@@ -444,8 +466,8 @@ class DeliveryTracking(models.Model):
     status = models.CharField(max_length=50)  # e.g., "Picked Up", "In Transit", "Arrived"
     speed = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)  # in km/h
     
-    # Timestamp
-    tracked_at = models.DateTimeField(auto_now_add=True)
+    # Timestamp (device time for batched GPS points, see deliveryAgent/tracking.py)
+    tracked_at = models.DateTimeField(default=timezone.now)
     
     # Additional Info
     notes = models.TextField(blank=True, null=True)
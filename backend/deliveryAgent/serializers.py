@@ -70,7 +70,7 @@ class DeliveryAssignmentDetailSerializer(serializers.ModelSerializer):
     """Detailed delivery assignment serializer"""
     agent = serializers.SerializerMethodField()
     order_details = serializers.SerializerMethodField()
-    tracking_history = DeliveryTrackingSerializer(many=True, read_only=True)
+    tracking_history = serializers.SerializerMethodField()
     
     estimated_delivery_date = serializers.SerializerMethodField()
     assigned_at = serializers.DateTimeField(read_only=True)
@@ -105,6 +105,10 @@ class DeliveryAssignmentDetailSerializer(serializers.ModelSerializer):
             'otp_verified', 'tracking_history'
         ]
     
+    def get_tracking_history(self, obj):
+        from .tracking import tracking_history
+        return tracking_history(obj)
+
     def get_agent(self, obj):
         return {
             'id': obj.agent.id,
@@ -8,10 +8,13 @@ from datetime import timedelta
 from decimal import Decimal
 
 from .models import DeliveryAgentProfile, DeliveryAssignment, DeliveryTracking
+from .agent_index import get_agent_index
 
 
 import math
 
+FALLBACK_RADIUS_KM = 50
+
 def haversine_distance(lat1, lon1, lat2, lon2):
     """
     Calculate the great circle distance between two points 
@@ -31,6 +34,44 @@ def haversine_distance(lat1, lon1, lat2, lon2):
     r = 6371 # Radius of earth in kilometers. Use 3956 for miles
     return c * r
 
+def active_assignment_counts(agent_ids):
+    """{agent_id: number of active assignments}, read from the maintained per-agent counters."""
+    return dict(
+        DeliveryAgentProfile.objects.filter(id__in=agent_ids).values_list('id', 'active_assignment_count')
+    )
+
+
+def first_assignable_agent(ranked_ids, limit=5):
+    """
+    Load the best of the ranked agent ids, re-checking eligibility in the
+    database in case the index has not caught up with a recent change yet.
+    """
+    agents = DeliveryAgentProfile.objects.select_related('user').filter(
+        id__in=ranked_ids[:limit],
+        approval_status='approved',
+        is_blocked=False,
+        is_active=True,
+    ).in_bulk()
+    for agent_id in ranked_ids[:limit]:
+        if agent_id in agents:
+            return agents[agent_id]
+    return None
+
+
+def delivery_fee_for(agent_city, delivery_city):
+    # Simple rule: ₹50 base, +₹30 if out-of-city vs agent's primary city
+    is_same_city = (agent_city or '').strip().lower() == delivery_city
+    return Decimal('50.00') if is_same_city else Decimal('80.00')
+
+
+def format_delivery_address(delivery_address):
+    return (
+        f"{delivery_address.address_line1}, "
+        f"{delivery_address.city}, "
+        f"{delivery_address.state} - {delivery_address.pincode}"
+    )
+
+
 def auto_assign_order(order):
     """
     Try to auto-assign `order` to the best available delivery agent.
@@ -60,98 +101,43 @@ def auto_assign_order(order):
     if DeliveryAssignment.objects.filter(order=order).exists():
         return None
 
-    # ── Find all eligible agents ─────────────────────────────────────────
-    # We include all approved, active, and non-blocked agents.
-    # We will prioritize 'available' and 'on_delivery' status later in sorting.
-    candidates = DeliveryAgentProfile.objects.filter(
-        approval_status='approved',
-        is_blocked=False,
-        is_active=True,
-    )
+    # ── Find candidate agents ────────────────────────────────────────────
+    # The agent index only holds approved, active, non-blocked agents and
+    # returns the best non-empty tier: pincode > pincode region > city/state.
+    index = get_agent_index()
+    candidate_ids = index.match_delivery(delivery_pincode, delivery_city, delivery_state)
+    use_distance = True
 
-    matched_pincode = []  # Tier 1: Exact Pincode
-    matched_region = []   # Tier 2: Same Pincode Region (First 3 digits)
-    matched_city = []     # Tier 3: Same City
-
-    for agent in candidates:
-        agent_city = (agent.city or '').strip().lower()
-        service_cities = [c.strip().lower() for c in (agent.service_cities or []) if c]
-        service_pincodes = [str(p).strip() for p in (agent.service_pincodes or []) if p]
-        
-        # 1. Check Exact Pincode Match
-        pincode_match = delivery_pincode in service_pincodes or agent.postal_code == delivery_pincode
-        
-        # 2. Check Regional Match (First 3 digits of Pincode)
-        region_match = False
-        if not pincode_match and len(delivery_pincode) >= 3:
-            delivery_prefix = delivery_pincode[:3]
-            agent_prefixes = [p[:3] for p in service_pincodes if len(p) >= 3]
-            region_match = delivery_prefix in agent_prefixes or (agent.postal_code or '')[:3] == delivery_prefix
-
-        # 3. Check City/State Match
-        city_match = (
-            agent_city == delivery_city
-            or delivery_city in service_cities
-            or delivery_state in service_cities
-        )
-
-        if pincode_match or region_match or city_match:
-            active_count = DeliveryAssignment.objects.filter(
-                agent=agent,
-                status__in=['assigned', 'accepted', 'picked_up', 'in_transit']
-            ).count()
-            
-            # Status Weight: available(0), on_delivery(1), on_break(2), offline(3)
-            status_map = {'available': 0, 'on_delivery': 1, 'on_break': 2, 'offline': 3}
-            status_weight = status_map.get(agent.availability_status, 4)
-
-            # Calculate distance if coordinates available
-            distance = haversine_distance(delivery_lat, delivery_lon, agent.latitude, agent.longitude)
-            
-            # Tiered assignment
-            if pincode_match:
-                matched_pincode.append((agent, status_weight, distance, active_count))
-            elif region_match:
-                matched_region.append((agent, status_weight, distance, active_count))
-            else:
-                matched_city.append((agent, status_weight, distance, active_count))
-
-    # Selection Priority: Tier 1 > Tier 2 > Tier 3
-    if matched_pincode:
-        tier_candidates = matched_pincode
-    elif matched_region:
-        tier_candidates = matched_region
-    elif matched_city:
-        tier_candidates = matched_city
-    else:
+    if not candidate_ids:
         # ── Tier 4: Global Fallback (Any agent if no local match) ───────────
         # This solves the "No agents available" issue when only one agent is 
         # present but city/pincode doesn't match perfectly.
-        tier_candidates = []
-        for agent in candidates:
-             # Just use workload and status for global fallback
-             active_count = DeliveryAssignment.objects.filter(
-                 agent=agent,
-                 status__in=['assigned', 'accepted', 'picked_up', 'in_transit']
-             ).count()
-             status_map = {'available': 0, 'on_delivery': 1, 'on_break': 2, 'offline': 3}
-             status_weight = status_map.get(agent.availability_status, 4)
-             tier_candidates.append((agent, status_weight, 999999, active_count))
-
-    if not tier_candidates:
+        # Agents near the drop point are preferred when it has coordinates.
+        candidate_ids = []
+        if delivery_lat is not None and delivery_lon is not None:
+            candidate_ids = index.nearby(delivery_lat, delivery_lon, FALLBACK_RADIUS_KM)
+        if not candidate_ids:
+            # Just use workload and status for global fallback
+            candidate_ids = index.all_ids()
+            use_distance = False
+
+    if not candidate_ids:
         return None
 
     # Sort logic: 
     # 1. Availability Status (Weight)
     # 2. Proximity (Distance)
     # 3. Number of active orders (Load balance)
-    tier_candidates.sort(key=lambda x: (x[1], x[2], x[3]))
-    best_agent = tier_candidates[0][0]
+    ranked_ids = index.rank(
+        candidate_ids, delivery_lat, delivery_lon,
+        active_assignment_counts(candidate_ids), use_distance=use_distance
+    )
+    best_agent = first_assignable_agent(ranked_ids)
+    if best_agent is None:
+        return None
 
     # ── Compute delivery fee ─────────────────────────────────────────────────
-    # Simple rule: ₹50 base, +₹30 if out-of-city vs agent's primary city
-    is_same_city = (best_agent.city or '').strip().lower() == delivery_city
-    delivery_fee = Decimal('50.00') if is_same_city else Decimal('80.00')
+    delivery_fee = delivery_fee_for(best_agent.city, delivery_city)
 
     # ── Build assignment ─────────────────────────────────────────────────────
     estimated_date = timezone.now().date() + timedelta(days=2)
@@ -167,11 +153,7 @@ def auto_assign_order(order):
     except Exception:
         pass
 
-    delivery_addr_text = (
-        f"{delivery_address.address_line1}, "
-        f"{delivery_address.city}, "
-        f"{delivery_address.state} - {delivery_address.pincode}"
-    )
+    delivery_addr_text = format_delivery_address(delivery_address)
 
     assignment = DeliveryAssignment.objects.create(
         agent=best_agent,
@@ -223,51 +205,28 @@ def auto_assign_return(order, return_requests=None):
         return None
 
     # 2. Get Candidates (Same logic as standard delivery)
-    candidates = DeliveryAgentProfile.objects.filter(
-        approval_status='approved',
-        is_blocked=False,
-        is_active=True,
-    )
-    
     delivery_address = order.delivery_address
     delivery_city = (delivery_address.city or '').strip().lower()
     delivery_pincode = (delivery_address.pincode or '').strip()
-    
-    tier_candidates = []
-    for agent in candidates:
-        agent_city = (agent.city or '').strip().lower()
-        service_cities = [c.strip().lower() for c in (agent.service_cities or []) if c]
-        service_pincodes = [str(p).strip() for p in (agent.service_pincodes or []) if p]
 
-        pincode_match = delivery_pincode in service_pincodes or agent.postal_code == delivery_pincode
-        city_match = (agent_city == delivery_city or delivery_city in service_cities)
-
-        if pincode_match or city_match:
-            active_count = DeliveryAssignment.objects.filter(
-                agent=agent,
-                status__in=['assigned', 'accepted', 'picked_up', 'in_transit']
-            ).count()
-            
-            # Distance if coordinates available
-            distance = haversine_distance(delivery_address.latitude, delivery_address.longitude, agent.latitude, agent.longitude)
-            
-            # Status weight (available=0, on_delivery=1, etc)
-            status_map = {'available': 0, 'on_delivery': 1, 'on_break': 2, 'offline': 3}
-            status_weight = status_map.get(agent.availability_status, 4)
-            
-            tier_candidates.append((agent, status_weight, distance, active_count))
-
-    if not tier_candidates:
+    index = get_agent_index()
+    candidate_ids = index.match_return(delivery_pincode, delivery_city)
+    use_distance = True
+    if not candidate_ids:
         # Global fallback
-        for agent in candidates:
-             active_count = DeliveryAssignment.objects.filter(agent=agent, status__in=['assigned', 'accepted', 'picked_up']).count()
-             tier_candidates.append((agent, 0, 999999, active_count))
+        candidate_ids = index.all_ids()
+        use_distance = False
 
-    if not tier_candidates:
+    if not candidate_ids:
         return None
 
-    tier_candidates.sort(key=lambda x: (x[1], x[2], x[3]))
-    best_agent = tier_candidates[0][0]
+    ranked_ids = index.rank(
+        candidate_ids, delivery_address.latitude, delivery_address.longitude,
+        active_assignment_counts(candidate_ids), use_distance=use_distance
+    )
+    best_agent = first_assignable_agent(ranked_ids)
+    if best_agent is None:
+        return None
 
     # 3. Create Assignment
     # For a return, the 'pickup_address' is the CUSTOMER address
@@ -330,3 +289,171 @@ def get_unassigned_confirmed_orders():
     ).exclude(
         id__in=assigned_order_ids
     ).select_related('delivery_address').order_by('-created_at')
+
+
+# ===============================================
+#        BATCH AUTO-ASSIGNMENT
+# ===============================================
+
+def batch_assign_orders(orders=None, max_active=None, limit=None, dry_run=False):
+    """
+    Assign a whole backlog of orders (default: get_unassigned_confirmed_orders())
+    in one run.
+
+    Agents and workloads are loaded once. Each order may only go to agents of
+    its best matching tier (pincode > region > city/state, as in
+    auto_assign_order) whose preferred_delivery_radius covers the drop point
+    (when both sides have coordinates) and who are below `max_active` active
+    assignments (DELIVERY_AGENT_MAX_ACTIVE_ASSIGNMENTS). Orders with the fewest
+    feasible agents are matched first so flexible orders do not use up scarce
+    agents; within an order agents are ranked as in auto_assign_order, with
+    workloads that include this run's assignments. Assignments and tracking
+    rows are written with bulk_create, and the work of the post_save hooks
+    this skips (agent workloads, rollup flags, live tracking events) is done
+    explicitly; orders with no feasible agent are left for manual assignment.
+
+    Returns {'assigned': [(order_id, agent_id), ...], 'unassigned': [order_id, ...]}.
+    """
+    from django.conf import settings
+    from django.db import transaction
+    from superAdmin.rollups import mark_days_dirty
+    from user.models import Order, OrderItem
+    from .signals import publish_assignment_status
+
+    if max_active is None:
+        max_active = getattr(settings, 'DELIVERY_AGENT_MAX_ACTIVE_ASSIGNMENTS', 10)
+    if orders is None:
+        orders = get_unassigned_confirmed_orders()
+    # Oldest first, so ties go to the orders that have waited longest
+    orders = orders.select_related('delivery_address').order_by('created_at', 'id')
+    if limit:
+        orders = orders[:limit]
+    orders = [order for order in orders if order.delivery_address]
+
+    index = get_agent_index()
+    # Read the counters before taking the index lock so concurrent runs do not queue behind the query
+    workloads = active_assignment_counts(index.all_ids())
+    with index.lock:
+        # ── Feasible agents per order ────────────────────────────────────────
+        plans = []
+        for order in orders:
+            address = order.delivery_address
+            candidate_ids = index.match_delivery(
+                (address.pincode or '').strip(),
+                (address.city or '').strip().lower(),
+                (address.state or '').strip().lower(),
+            )
+            distances = index.distances(candidate_ids, address.latitude, address.longitude)
+            feasible = [
+                (agent_id, float(distance)) for agent_id, distance in zip(candidate_ids, distances)
+                if math.isinf(distance) or distance <= index.radius_km(agent_id)
+            ]
+            plans.append((order, feasible))
+
+        # ── Capacity-aware greedy matching ───────────────────────────────────
+        plans.sort(key=lambda plan: len(plan[1]))
+        matches = []
+        unassigned = []
+        for order, feasible in plans:
+            feasible = [(agent_id, d) for agent_id, d in feasible if workloads.get(agent_id, 0) < max_active]
+            if not feasible:
+                unassigned.append(order.id)
+                continue
+            ranked = index.rank(
+                [agent_id for agent_id, _ in feasible], None, None, workloads,
+                distances=[d for _, d in feasible]
+            )
+            matches.append((order, ranked[0]))
+            workloads[ranked[0]] = workloads.get(ranked[0], 0) + 1
+
+    if dry_run or not matches:
+        return {'assigned': [(order.id, agent_id) for order, agent_id in matches], 'unassigned': unassigned}
+
+    # ── Write everything in bulk ─────────────────────────────────────────────
+    agents = DeliveryAgentProfile.objects.select_related('user').filter(
+        id__in={agent_id for _, agent_id in matches},
+        approval_status='approved',
+        is_blocked=False,
+        is_active=True,
+    ).in_bulk()
+
+    first_items = {}
+    items = OrderItem.objects.filter(
+        order_id__in=[order.id for order, _ in matches]
+    ).select_related('vendor').order_by('order_id', 'id')
+    for item in items:
+        first_items.setdefault(item.order_id, item)
+
+    estimated_date = timezone.now().date() + timedelta(days=2)
+    assigned = []
+    with transaction.atomic():
+        # Skip orders that got an assignment (e.g. a manual trigger) since planning
+        locked_ids = set(
+            Order.objects.select_for_update()
+            .filter(id__in=[order.id for order, _ in matches])
+            .exclude(id__in=DeliveryAssignment.objects.values('order_id'))
+            .values_list('id', flat=True)
+        )
+
+        assignments = []
+        for order, agent_id in matches:
+            if order.id not in locked_ids:
+                continue
+            agent = agents.get(agent_id)
+            if agent is None:
+                unassigned.append(order.id)
+                continue
+            address = order.delivery_address
+            pickup_address = "Vendor Warehouse"
+            first_item = first_items.get(order.id)
+            if first_item and first_item.vendor:
+                v = first_item.vendor
+                pickup_address = f"{v.shop_name}, {v.address or ''}"
+
+            assignments.append(DeliveryAssignment(
+                agent=agent,
+                order=order,
+                status='assigned',
+                pickup_address=pickup_address,
+                delivery_address=format_delivery_address(address),
+                delivery_city=address.city,
+                estimated_delivery_date=estimated_date,
+                delivery_fee=delivery_fee_for(agent.city, (address.city or '').strip().lower()),
+                customer_contact=address.phone or '',
+            ))
+        DeliveryAssignment.objects.bulk_create(assignments)
+
+        DeliveryTracking.objects.bulk_create([
+            DeliveryTracking(
+                delivery_assignment=assignment,
+                latitude=0,
+                longitude=0,
+                address=f"Assigned – {assignment.delivery_city}",
+                status='Order Assigned to Agent',
+                notes=f"Auto-assigned to {assignment.agent.user.username} for delivery to {assignment.delivery_city}",
+            )
+            for assignment in assignments
+        ])
+
+        # bulk_create skips the workload signals - apply the counters per agent
+        per_agent = {}
+        for assignment in assignments:
+            per_agent[assignment.agent_id] = per_agent.get(assignment.agent_id, 0) + 1
+        for agent_id, count in per_agent.items():
+            DeliveryAgentProfile.apply_workload_change(agent_id, count)
+
+        # Same order status transitions as auto_assign_order
+        order_ids = [assignment.order_id for assignment in assignments]
+        Order.objects.filter(id__in=order_ids, status='shipping').update(status='out_for_delivery')
+        Order.objects.filter(id__in=order_ids, status='pending').update(status='confirmed')
+
+        # update() and bulk_create() skip the Order / DeliveryAssignment post_save hooks. The
+        # revenue rollup flags and the live tracking events are applied here; the customer risk
+        # counters need nothing, as neither transition cancels an order or fails a payment.
+        mark_days_dirty(assignment.order.created_at for assignment in assignments)
+        for assignment in assignments:
+            publish_assignment_status(DeliveryAssignment, assignment, created=True)
+
+        assigned = [(assignment.order_id, assignment.agent_id) for assignment in assignments]
+
+    return {'assigned': assigned, 'unassigned': unassigned}
@@ -0,0 +1,66 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import DeliveryAgentProfile, DeliveryAssignment
+from . import agent_index
+from .live_tracking import publish_order_event
+
+
+@receiver(post_save, sender=DeliveryAgentProfile)
+def index_agent_on_save(sender, instance, **kwargs):
+    # Profile edits, availability toggles and location updates all go through save()
+    transaction.on_commit(lambda: agent_index.update_agent(instance))
+
+
+@receiver(post_delete, sender=DeliveryAgentProfile)
+def remove_agent_from_index(sender, instance, **kwargs):
+    agent_id = instance.pk
+    transaction.on_commit(lambda: agent_index.remove_agent(agent_id))
+
+
+def is_active_assignment(status):
+    return status in DeliveryAssignment.ACTIVE_STATUSES
+
+
+@receiver(pre_save, sender=DeliveryAssignment)
+def remember_previous_workload(sender, instance, **kwargs):
+    # Needed to apply the difference on status changes and reassignments
+    instance._previous_workload = None
+    if instance.pk:
+        instance._previous_workload = DeliveryAssignment.objects.filter(pk=instance.pk).values_list('agent_id', 'status').first()
+
+
+@receiver(post_save, sender=DeliveryAssignment)
+def update_agent_workload(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_workload', None)
+    if previous and is_active_assignment(previous[1]):
+        if previous[0] == instance.agent_id and is_active_assignment(instance.status):
+            return
+        DeliveryAgentProfile.apply_workload_change(previous[0], -1)
+    if is_active_assignment(instance.status):
+        DeliveryAgentProfile.apply_workload_change(instance.agent_id, 1)
+
+
+@receiver(post_delete, sender=DeliveryAssignment)
+def remove_agent_workload(sender, instance, **kwargs):
+    if is_active_assignment(instance.status):
+        DeliveryAgentProfile.apply_workload_change(instance.agent_id, -1)
+
+
+@receiver(post_save, sender=DeliveryAssignment)
+def publish_assignment_status(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_workload', None)
+    if not created and previous and previous[1] == instance.status:
+        return
+
+    def payload():
+        # Evaluated after commit, so the order status synced in the same transaction is included
+        from user.models import Order
+        return {
+            'assignment_id': instance.pk,
+            'assignment_status': instance.status,
+            'assignment_type': instance.assignment_type,
+            'order_status': Order.objects.filter(pk=instance.order_id).values_list('status', flat=True).first(),
+        }
+
+    publish_order_event(instance.order_id, 'status', payload)
@@ -0,0 +1,431 @@
+"""
+deliveryAgent/tracking.py
+Batched GPS ingestion for DeliveryTracking.
+
+The agent app buffers location fixes and uploads them in batches:
+
+    {"assignments": [
+        {"assignment_id": 12, "points": [
+            {"latitude": 12.97, "longitude": 77.59, "recorded_at": "2024-05-01T10:15:02Z",
+             "speed": 21.5, "status": "In Transit", "address": "", "notes": ""},
+            ...
+        ]},
+    ]}
+
+Points of each assignment are sorted by device time and thinned: a point is
+only stored when it moved at least GPS_MIN_MOVE_METERS from the last kept
+point (initially the assignment's current_location) or its status changed.
+The kept rows are written with one bulk_create; assignments get their latest
+point as current_location and the agent profile only the newest point overall.
+
+Once a delivery is finished and older than DELIVERY_TRACKING_RETENTION_DAYS,
+`manage.py compact_delivery_tracking` keeps only its milestone rows (the
+first row of every status run and the final row) and folds the remaining
+breadcrumbs into an encoded polyline on the assignment
+(tracking_polyline + tracking_polyline_meta). tracking_entries() /
+tracking_history() merge both representations, so the history APIs and the
+admin tracking page do not change shape.
+"""
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import DeliveryAssignment, DeliveryTracking
+from .live_tracking import publish_order_event
+
+
+MAX_POINTS_PER_BATCH = 5000
+DEFAULT_STATUS = 'In Transit'
+POLYLINE_PRECISION = 6
+COMPACTABLE_STATUSES = ['delivered', 'failed']
+
+
+def distance_m(lat1, lon1, lat2, lon2):
+    """Haversine distance in metres between two points given in degrees."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371000 * math.asin(math.sqrt(a))
+
+
+def parse_timestamp(value):
+    """ISO-8601 string or epoch seconds/milliseconds -> datetime (None if missing)."""
+    if value in (None, ''):
+        return None
+    if isinstance(value, (int, float)):
+        seconds = value / 1000 if value > 1e12 else value
+        parsed = datetime.fromtimestamp(seconds, tz=dt_timezone.utc)
+    else:
+        parsed = parse_datetime(str(value))
+        if parsed is None:
+            raise ValueError(f"Invalid timestamp: {value}")
+    # Match the project's USE_TZ so values compare with stored datetimes
+    if settings.USE_TZ and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    elif not settings.USE_TZ and timezone.is_aware(parsed):
+        parsed = timezone.make_naive(parsed)
+    return parsed
+
+
+def parse_point(raw):
+    """Validate one uploaded point. Raises ValueError on bad input."""
+    try:
+        lat = float(raw['latitude'])
+        lon = float(raw['longitude'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("latitude and longitude are required numbers")
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("latitude/longitude out of range")
+
+    speed = raw.get('speed')
+    if speed not in (None, ''):
+        try:
+            speed = Decimal(str(speed)).quantize(Decimal('0.01'))
+        except InvalidOperation:
+            raise ValueError(f"Invalid speed: {speed}")
+    else:
+        speed = None
+
+    return {
+        'latitude': lat,
+        'longitude': lon,
+        'recorded_at': parse_timestamp(raw.get('recorded_at') or raw.get('timestamp')) or timezone.now(),
+        'speed': speed,
+        'address': raw.get('address') or '',
+        'status': (raw.get('status') or DEFAULT_STATUS)[:50],
+        'notes': raw.get('notes') or '',
+    }
+
+
+def thin_points(points, last=None, min_move_m=None):
+    """
+    Drop points that did not move `min_move_m` from the previously kept point
+    (starting from `last`, a {'latitude', 'longitude', 'status'} dict) unless
+    their status changed. `points` must be sorted by time.
+    """
+    if min_move_m is None:
+        min_move_m = getattr(settings, 'GPS_MIN_MOVE_METERS', 20)
+    kept = []
+    for point in points:
+        if last is not None and last.get('latitude') is not None and last.get('longitude') is not None:
+            moved = distance_m(float(last['latitude']), float(last['longitude']), point['latitude'], point['longitude'])
+            if moved < min_move_m and point['status'] == last.get('status', point['status']):
+                continue
+        kept.append(point)
+        last = point
+    return kept
+
+
+def ingest_locations(agent, batches):
+    """
+    Store batched GPS points for `agent`'s active assignments (points for
+    other assignments are reported in `errors`).
+    Returns {'received', 'stored', 'skipped', 'errors'}; raises ValueError for a malformed payload.
+    """
+    if not isinstance(batches, list):
+        raise ValueError("'assignments' must be a list")
+
+    received = 0
+    errors = []
+    parsed = {}
+    for batch in batches:
+        try:
+            assignment_id = int(batch['assignment_id'])
+            raw_points = batch['points']
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("each entry needs an integer 'assignment_id' and a 'points' list")
+        if not isinstance(raw_points, list):
+            raise ValueError("'points' must be a list")
+        received += len(raw_points)
+        if received > MAX_POINTS_PER_BATCH:
+            raise ValueError(f"At most {MAX_POINTS_PER_BATCH} points per upload")
+
+        for i, raw in enumerate(raw_points):
+            try:
+                parsed.setdefault(assignment_id, []).append(parse_point(raw))
+            except (ValueError, AttributeError) as e:
+                errors.append({'assignment_id': assignment_id, 'index': i, 'error': str(e)})
+
+    assignments = DeliveryAssignment.objects.filter(agent=agent, id__in=list(parsed)).only(
+        'id', 'agent_id', 'order_id', 'status', 'current_location'
+    ).in_bulk()
+    for assignment_id in parsed:
+        assignment = assignments.get(assignment_id)
+        if assignment is None:
+            errors.append({'assignment_id': assignment_id, 'error': 'Assignment not found'})
+        elif assignment.status not in DeliveryAssignment.ACTIVE_STATUSES:
+            # Delayed uploads for a delivered / cancelled / failed assignment must not move it
+            errors.append({'assignment_id': assignment_id, 'error': f"Assignment is {assignment.status}, not being tracked"})
+            del assignments[assignment_id]
+
+    rows = []
+    moved_assignments = []
+    latest = None
+    for assignment_id, points in parsed.items():
+        assignment = assignments.get(assignment_id)
+        if assignment is None:
+            continue
+        points.sort(key=lambda p: p['recorded_at'])
+        kept = thin_points(points, last=assignment.current_location or None)
+        rows.extend(
+            DeliveryTracking(
+                delivery_assignment_id=assignment_id,
+                latitude=round(Decimal(p['latitude']), 6),
+                longitude=round(Decimal(p['longitude']), 6),
+                address=p['address'],
+                status=p['status'],
+                speed=p['speed'],
+                tracked_at=p['recorded_at'],
+                notes=p['notes'],
+            )
+            for p in kept
+        )
+        if kept:
+            last = kept[-1]
+            assignment.current_location = {
+                'latitude': last['latitude'],
+                'longitude': last['longitude'],
+                'address': last['address'],
+                'status': last['status'],
+            }
+            moved_assignments.append(assignment)
+        if points and (latest is None or points[-1]['recorded_at'] > latest['recorded_at']):
+            latest = points[-1]
+
+    with transaction.atomic():
+        DeliveryTracking.objects.bulk_create(rows, batch_size=500)
+        if moved_assignments:
+            DeliveryAssignment.objects.bulk_update(moved_assignments, ['current_location'])
+            for assignment in moved_assignments:
+                publish_order_event(assignment.order_id, 'location', {
+                    **assignment.current_location,
+                    'tracked_at': parsed[assignment.id][-1]['recorded_at'],
+                })
+        if latest and (agent.last_location_update is None or latest['recorded_at'] > agent.last_location_update):
+            agent.latitude = round(Decimal(latest['latitude']), 6)
+            agent.longitude = round(Decimal(latest['longitude']), 6)
+            agent.last_location_update = latest['recorded_at']
+            # One profile write per upload; the save() keeps the agent index in sync
+            agent.save(update_fields=['latitude', 'longitude', 'last_location_update', 'updated_at'])
+
+    valid = sum(len(points) for assignment_id, points in parsed.items() if assignment_id in assignments)
+    return {
+        'received': received,
+        'stored': len(rows),
+        'skipped': valid - len(rows),
+        'errors': errors,
+    }
+
+
+# ===============================================
+#        COMPACTION
+# ===============================================
+
+def encode_polyline(points, precision=POLYLINE_PRECISION):
+    """Encode [(lat, lon), ...] with the Google polyline algorithm."""
+    factor = 10 ** precision
+    output = []
+    prev_lat = prev_lon = 0
+    for lat, lon in points:
+        lat, lon = int(round(float(lat) * factor)), int(round(float(lon) * factor))
+        for delta in (lat - prev_lat, lon - prev_lon):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                output.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            output.append(chr(value + 63))
+        prev_lat, prev_lon = lat, lon
+    return ''.join(output)
+
+
+def decode_polyline(encoded, precision=POLYLINE_PRECISION):
+    factor = 10 ** precision
+    points = []
+    index = lat = lon = 0
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        points.append((lat / factor, lon / factor))
+    return points
+
+
+def decode_compacted(assignment):
+    """Breadcrumb dicts stored in an assignment's polyline, oldest first."""
+    meta = assignment.tracking_polyline_meta or {}
+    if not assignment.tracking_polyline or not meta.get('start'):
+        return []
+    coordinates = decode_polyline(assignment.tracking_polyline, meta.get('precision', POLYLINE_PRECISION))
+    statuses = [status for status, count in meta.get('statuses', []) for _ in range(count)]
+
+    points = []
+    tracked_at = datetime.fromisoformat(meta['start'])
+    for i, ((lat, lon), offset) in enumerate(zip(coordinates, meta.get('offsets', []))):
+        tracked_at += timedelta(seconds=offset)
+        points.append({
+            'latitude': lat,
+            'longitude': lon,
+            'status': statuses[i] if i < len(statuses) else DEFAULT_STATUS,
+            'tracked_at': tracked_at,
+        })
+    return points
+
+
+def encode_compacted(points, precision=POLYLINE_PRECISION):
+    """(polyline, meta) for breadcrumb dicts sorted by tracked_at."""
+    meta = {'precision': precision, 'start': points[0]['tracked_at'].isoformat(), 'offsets': [], 'statuses': []}
+    previous = points[0]['tracked_at']
+    for point in points:
+        # Whole seconds are enough for a historical route
+        offset = int(round((point['tracked_at'] - previous).total_seconds()))
+        meta['offsets'].append(offset)
+        previous += timedelta(seconds=offset)
+        if meta['statuses'] and meta['statuses'][-1][0] == point['status']:
+            meta['statuses'][-1][1] += 1
+        else:
+            meta['statuses'].append([point['status'], 1])
+    return encode_polyline([(p['latitude'], p['longitude']) for p in points], precision), meta
+
+
+def split_milestones(rows):
+    """
+    Partition tracking rows (sorted by time) into (milestones, breadcrumbs).
+    Milestones are the first row of every status run and the final row.
+    """
+    milestones, breadcrumbs = [], []
+    previous_status = None
+    for i, row in enumerate(rows):
+        if row['status'] != previous_status or i == len(rows) - 1:
+            milestones.append(row)
+        else:
+            breadcrumbs.append(row)
+        previous_status = row['status']
+    return milestones, breadcrumbs
+
+
+def compact_assignment(assignment, chunk_size=1000):
+    """
+    Fold an assignment's breadcrumb rows into its polyline and delete them in
+    chunks. Returns the number of deleted rows.
+    """
+    rows = list(
+        DeliveryTracking.objects.filter(delivery_assignment=assignment)
+        .order_by('tracked_at', 'id')
+        .values('id', 'latitude', 'longitude', 'status', 'tracked_at')
+    )
+    through_id = max((row['id'] for row in rows), default=None)
+    _, breadcrumbs = split_milestones(rows)
+    if not breadcrumbs:
+        DeliveryAssignment.objects.filter(pk=assignment.pk).update(
+            tracking_compacted_at=timezone.now(),
+            tracking_compacted_through_id=through_id,
+        )
+        return 0
+
+    # Re-compaction (late uploads) merges with what is already encoded
+    points = decode_compacted(assignment) + breadcrumbs
+    points.sort(key=lambda p: p['tracked_at'])
+    polyline, meta = encode_compacted(points)
+
+    with transaction.atomic():
+        DeliveryAssignment.objects.filter(pk=assignment.pk).update(
+            tracking_polyline=polyline,
+            tracking_polyline_meta=meta,
+            tracking_compacted_at=timezone.now(),
+            tracking_compacted_through_id=through_id,
+        )
+        ids = [row['id'] for row in breadcrumbs]
+        for start in range(0, len(ids), chunk_size):
+            DeliveryTracking.objects.filter(id__in=ids[start:start + chunk_size]).delete()
+    return len(ids)
+
+
+def compactable_assignments(older_than_days=None):
+    """Finished assignments whose tracking history is older than the retention window."""
+    from django.db.models import F, Max
+    from django.db.models.functions import Coalesce
+
+    if older_than_days is None:
+        older_than_days = getattr(settings, 'DELIVERY_TRACKING_RETENTION_DAYS', 30)
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    return (
+        DeliveryAssignment.objects
+        .filter(status__in=COMPACTABLE_STATUSES)
+        .annotate(finished_at=Coalesce('completed_at', 'delivery_time', 'assigned_at'))
+        .filter(finished_at__lt=cutoff)
+        .annotate(last_tracking_id=Max('tracking_history__id'))
+        .filter(last_tracking_id__isnull=False)
+        # Skip assignments with no row inserted since their last compaction. Keyed on insertion
+        # order: late uploads carry device timestamps older than tracking_compacted_at
+        .exclude(tracking_compacted_through_id__gte=F('last_tracking_id'))
+        .only('id', 'tracking_polyline', 'tracking_polyline_meta')
+    )
+
+
+def tracking_entries(assignment):
+    """
+    The assignment's tracking history as DeliveryTracking instances, newest
+    first: the stored rows plus unsaved instances for the breadcrumbs decoded
+    from its polyline (id None, no address / speed / notes).
+    """
+    entries = list(DeliveryTracking.objects.filter(delivery_assignment=assignment).order_by('-tracked_at'))
+    if not assignment.tracking_polyline:
+        return entries
+
+    entries.extend(
+        DeliveryTracking(
+            delivery_assignment_id=assignment.pk,
+            latitude=round(Decimal(point['latitude']), 6),
+            longitude=round(Decimal(point['longitude']), 6),
+            address='',
+            status=point['status'],
+            tracked_at=point['tracked_at'],
+        )
+        for point in decode_compacted(assignment)
+    )
+    entries.sort(key=lambda entry: entry.tracked_at, reverse=True)
+    return entries
+
+
+def tracking_history(assignment):
+    """
+    Serialized tracking history, newest first, combining the stored rows with
+    breadcrumbs decoded from the assignment's polyline.
+    """
+    from .serializers import DeliveryTrackingSerializer
+
+    return list(DeliveryTrackingSerializer(tracking_entries(assignment), many=True).data)
+
+    tracked_at_field = DeliveryTrackingSerializer().fields['tracked_at']
+    for point in decode_compacted(assignment):
+        history.append({
+            'id': None,
+            'latitude': f"{point['latitude']:.6f}",
+            'longitude': f"{point['longitude']:.6f}",
+            'address': '',
+            'status': point['status'],
+            'speed': None,
+            'tracked_at': tracked_at_field.to_representation(point['tracked_at']),
+            'notes': None,
+            '_sort': point['tracked_at'],
+        })
+    for item, row in zip(history, rows):
+        item['_sort'] = row.tracked_at
+    history.sort(key=lambda item: item['_sort'], reverse=True)
+    for item in history:
+        del item['_sort']
+    return history
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import CategoryCommission, LedgerEntry, Payout, GlobalCommission
+from .models import CategoryCommission, LedgerEntry, Payout, GlobalCommission, VendorBalance
 
 @admin.register(CategoryCommission)
 class CategoryCommissionAdmin(admin.ModelAdmin):
@@ -17,5 +17,11 @@ class LedgerEntryAdmin(admin.ModelAdmin):
 
 @admin.register(Payout)
 class PayoutAdmin(admin.ModelAdmin):
-    list_display = ('vendor', 'amount', 'status', 'created_at', 'processed_at')
+    list_display = ('vendor', 'amount', 'status', 'batch_reference', 'created_at', 'processed_at')
     list_filter = ('status',)
+    search_fields = ('batch_reference',)
+
+@admin.register(VendorBalance)
+class VendorBalanceAdmin(admin.ModelAdmin):
+    list_display = ('vendor', 'settled_balance', 'uncleared_balance', 'lifetime_earnings', 'last_entry_id', 'updated_at')
+    readonly_fields = ('settled_balance', 'uncleared_balance', 'lifetime_earnings', 'last_entry_id', 'updated_at')
@@ -0,0 +1,105 @@
+"""
+finance/commission_rules.py
+In-process commission rule table used when orders are recorded.
+
+The CategoryCommission rows and the GlobalCommission fallback are loaded
+once into a {category: CommissionRule} table held by each worker process,
+so computing the commission of a cart costs no queries. The table is tagged
+with a version token kept in the COMMISSION_RULES_CACHE_ALIAS cache; saving
+or deleting a rule (CommissionSettingsViewSet, the Django admin - see
+finance/signals.py) bumps the token after commit and every process reloads
+its table on its next lookup.
+
+A bump is only seen by the other workers when that cache is shared between
+processes (redis, file, database). With a process-local cache (locmem, the
+default) no table is kept and the rules are read once per order instead.
+Tables are also reloaded after COMMISSION_RULES_MAX_AGE seconds whatever the
+token says, in case a rule was changed without signals (queryset.update()).
+"""
+import time
+from collections import namedtuple
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+
+VERSION_KEY = 'finance:commission-rules:version'
+
+CommissionRule = namedtuple('CommissionRule', ['commission_type', 'percentage', 'fixed_amount'])
+
+# (version, loaded at, category rules, global rule), swapped as a whole so readers never see a half-loaded table
+_table = None
+
+
+def _cache():
+    return caches[getattr(settings, 'COMMISSION_RULES_CACHE_ALIAS', 'default')]
+
+
+def is_shared_cache():
+    """Whether a version bump made in one process is visible to the others."""
+    return not isinstance(_cache(), (LocMemCache, DummyCache))
+
+
+def get_version():
+    if not is_shared_cache():
+        return None
+    try:
+        cache = _cache()
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            cache.add(VERSION_KEY, time.time_ns(), None)
+            version = cache.get(VERSION_KEY)
+        return version
+    except Exception as e:
+        print(f"DEBUG: Commission rule version read failed: {e}")
+        return None
+
+
+def _rule(obj):
+    return CommissionRule(obj.commission_type, obj.percentage, obj.fixed_amount)
+
+
+def load_rules():
+    """Read every category rule plus the global fallback (created with the 10% default if missing)."""
+    from .models import CategoryCommission, GlobalCommission
+
+    categories = {c.category: _rule(c) for c in CategoryCommission.objects.all()}
+    global_settings = GlobalCommission.objects.first()
+    if not global_settings:
+        global_settings = GlobalCommission.objects.create(percentage=Decimal('10.00'))
+    return categories, _rule(global_settings)
+
+
+def get_rules():
+    """The current (category rules, global rule) table, reloaded when the version moved or it got too old."""
+    global _table
+    version = get_version()
+    table = _table
+    max_age = getattr(settings, 'COMMISSION_RULES_MAX_AGE', 60)
+    if version is None or table is None or table[0] != version or time.monotonic() - table[1] > max_age:
+        table = (version, time.monotonic(), *load_rules())
+        # A process-local or unreachable cache means every lookup reads the database
+        if version is not None:
+            _table = table
+    return table[2], table[3]
+
+
+def rule_for(category, rules=None):
+    """The rule applying to `category`: its own rule, else the global one."""
+    categories, global_rule = rules or get_rules()
+    return categories.get(category, global_rule)
+
+
+def invalidate_commission_rules():
+    """Make every process reload its rule table once the current transaction commits."""
+    def bump():
+        try:
+            _cache().set(VERSION_KEY, time.time_ns(), None)
+        except Exception as e:
+            print(f"DEBUG: Failed to invalidate commission rules: {e}")
+
+    transaction.on_commit(bump)
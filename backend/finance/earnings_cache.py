@@ -0,0 +1,62 @@
+"""
+finance/earnings_cache.py
+Short-lived per-vendor cache for the earnings page aggregates.
+
+FinanceService caches the ledger aggregates of get_vendor_earnings_summary
+and the get_vendor_analytics series for VENDOR_EARNINGS_CACHE_TTL seconds,
+under keys embedding a per-vendor version token. Every ledger write or
+settlement move of a vendor bumps its token after commit (see
+FinanceService._apply_balance_changes), orphaning that vendor's entries at
+once. Balances, pending payouts and recent entries are cheap and always read
+live, so money figures are never stale.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+def _cache():
+    return caches[getattr(settings, 'VENDOR_EARNINGS_CACHE_ALIAS', 'default')]
+
+
+def _version_key(vendor_id):
+    return f"finance:earnings:{vendor_id}:version"
+
+
+def get_version(vendor_id):
+    cache = _cache()
+    version = cache.get(_version_key(vendor_id))
+    if version is None:
+        cache.add(_version_key(vendor_id), time.time_ns(), None)
+        version = cache.get(_version_key(vendor_id))
+    return version
+
+
+def cached(vendor_id, name, compute):
+    """Return the cached value `name` of a vendor, computing and storing it on a miss."""
+    try:
+        key = f"finance:earnings:{vendor_id}:{get_version(vendor_id)}:{name}"
+        value = _cache().get(key)
+    except Exception as e:
+        print(f"DEBUG: Earnings cache read failed: {e}")
+        return compute()
+    if value is None:
+        value = compute()
+        try:
+            _cache().set(key, value, getattr(settings, 'VENDOR_EARNINGS_CACHE_TTL', 60))
+        except Exception as e:
+            print(f"DEBUG: Earnings cache write failed: {e}")
+    return value
+
+
+def invalidate(vendor_ids):
+    """Orphan the cached aggregates of these vendors once the current transaction commits."""
+    def bump():
+        try:
+            _cache().set_many({_version_key(vendor_id): time.time_ns() for vendor_id in vendor_ids}, None)
+        except Exception as e:
+            print(f"DEBUG: Failed to invalidate earnings cache: {e}")
+
+    transaction.on_commit(bump)
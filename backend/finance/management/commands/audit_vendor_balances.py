@@ -0,0 +1,45 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Recompute vendor balances from the ledger and report (or --fix) drift in the VendorBalance snapshots'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendor', type=int, action='append', help='Only audit this vendor id (repeatable)')
+        parser.add_argument('--fix', action='store_true', help='Overwrite drifted snapshots with the recomputed values')
+
+    def handle(self, *args, **options):
+        from django.db import transaction
+        from finance.models import VendorBalance
+
+        fields = ['settled_balance', 'uncleared_balance', 'lifetime_earnings', 'last_entry_id']
+        empty = {field: 0 if field == 'last_entry_id' else Decimal('0.00') for field in fields}
+
+        expected = VendorBalance.ledger_totals(options['vendor'])
+        snapshots = VendorBalance.objects.all()
+        if options['vendor']:
+            snapshots = snapshots.filter(vendor_id__in=options['vendor'])
+        snapshots = {balance.vendor_id: balance for balance in snapshots}
+
+        vendor_ids = sorted(set(expected) | set(snapshots))
+        drifted = 0
+        for vendor_id in vendor_ids:
+            actual = expected.get(vendor_id, empty)
+            balance = snapshots.get(vendor_id)
+            differences = [
+                f"{field} {getattr(balance, field) if balance else 'missing'} != {actual[field]}"
+                for field in fields
+                if balance is None or getattr(balance, field) != actual[field]
+            ]
+            if not differences:
+                continue
+            drifted += 1
+            self.stdout.write(self.style.WARNING(f"Vendor {vendor_id}: {', '.join(differences)}"))
+            if options['fix']:
+                with transaction.atomic():
+                    VendorBalance.objects.update_or_create(vendor_id=vendor_id, defaults=actual)
+
+        verb = 'Fixed' if options['fix'] else 'Found'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {drifted} vendors with drifted balances out of {len(vendor_ids)} audited.'))
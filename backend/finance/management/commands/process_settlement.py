@@ -1,13 +1,25 @@
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-from django.db import transaction
-from finance.models import LedgerEntry
+
 
 class Command(BaseCommand):
     help = 'Process T+7 settlement for vendor ledger entries'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, help='Ledger ids per release transaction (default: SETTLEMENT_CHUNK_SIZE)')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the entries that would be released')
+        parser.add_argument('--quiet', action='store_true', help='Do not print per-chunk timings')
+
     def handle(self, *args, **options):
         from finance.services import FinanceService
-        
-        count = FinanceService.release_expired_funds()
+
+        if options['dry_run']:
+            count = FinanceService.release_expired_funds(dry_run=True)
+            self.stdout.write(f'{count} ledger entries are due for release.')
+            return
+
+        def report(first_id, last_id, released, seconds):
+            if not options['quiet']:
+                self.stdout.write(f'  ids {first_id}-{last_id}: released {released} in {seconds * 1000:.1f} ms')
+
+        count = FinanceService.release_expired_funds(chunk_size=options['chunk_size'], on_chunk=report)
         self.stdout.write(self.style.SUCCESS(f'Successfully processed and released funds for {count} orders.'))
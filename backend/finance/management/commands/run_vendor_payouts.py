@@ -0,0 +1,46 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Pay out the settled balance of every payable vendor in one batch and write its NEFT bank file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-amount', help='Smallest settled balance paid out (default: PAYOUT_MIN_AMOUNT)')
+        parser.add_argument('--batch-size', type=int, help='Vendors per payout transaction (default: PAYOUT_BATCH_SIZE)')
+        parser.add_argument('--reference', help='Batch reference (default: PAYRUN_<timestamp>_<suffix>)')
+        parser.add_argument('--bank-file', help='Write the NEFT bank file to this path ("-" for stdout)')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the vendors and amount that would be paid out')
+        parser.add_argument('--quiet', action='store_true', help='Do not print per-batch timings')
+
+    def handle(self, *args, **options):
+        from finance.bank_file import write_bank_file
+        from finance.services import FinanceService
+
+        if options['dry_run']:
+            _, count, total = FinanceService.run_payout_batch(min_amount=options['min_amount'], dry_run=True)
+            self.stdout.write(f'{count} vendors are due a payout, totalling {total}.')
+            return
+
+        # Keep stdout clean when the bank file is written to it
+        out = self.stderr if options['bank_file'] == '-' else self.stdout
+
+        def report(vendors, amount, seconds):
+            if not options['quiet']:
+                out.write(f'  paid {vendors} vendors ({amount}) in {seconds * 1000:.1f} ms')
+
+        reference, count, total = FinanceService.run_payout_batch(
+            min_amount=options['min_amount'],
+            batch_size=options['batch_size'],
+            reference=options['reference'],
+            on_batch=report,
+        )
+
+        if options['bank_file'] == '-':
+            write_bank_file(reference, sys.stdout)
+        elif options['bank_file']:
+            with open(options['bank_file'], 'w', newline='', encoding='utf-8') as fileobj:
+                write_bank_file(reference, fileobj)
+
+        out.write(self.style.SUCCESS(f'Successfully created {count} payouts totalling {total} in batch {reference}.'))
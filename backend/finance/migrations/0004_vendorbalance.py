@@ -0,0 +1,50 @@
+import django.db.models.deletion
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Max, Q, Sum
+
+
+def backfill_vendor_balances(apps, schema_editor):
+    LedgerEntry = apps.get_model('finance', 'LedgerEntry')
+    VendorBalance = apps.get_model('finance', 'VendorBalance')
+
+    rows = LedgerEntry.objects.values('vendor').annotate(
+        settled=Sum('amount', filter=Q(is_settled=True)),
+        uncleared=Sum('amount', filter=Q(is_settled=False)),
+        lifetime=Sum('amount', filter=Q(entry_type__in=['REVENUE', 'COMMISSION'])),
+        last=Max('id'),
+    ).order_by()
+    VendorBalance.objects.bulk_create([
+        VendorBalance(
+            vendor_id=row['vendor'],
+            settled_balance=row['settled'] or Decimal('0.00'),
+            uncleared_balance=row['uncleared'] or Decimal('0.00'),
+            lifetime_earnings=row['lifetime'] or Decimal('0.00'),
+            last_entry_id=row['last'],
+        )
+        for row in rows
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0003_ledgerentry_created_at_index'),
+        ('vendor', '0005_product_rating_total'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorBalance',
+            fields=[
+                ('vendor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='balance', serialize=False, to='vendor.vendorprofile')),
+                ('settled_balance', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('uncleared_balance', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('lifetime_earnings', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('last_entry_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_vendor_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0004_vendorbalance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payout',
+            name='batch_reference',
+            field=models.CharField(blank=True, db_index=True, max_length=50, null=True),
+        ),
+    ]
@@ -103,6 +103,7 @@ class LedgerEntry(models.Model):
             models.Index(fields=['vendor', 'is_settled']),
             models.Index(fields=['settlement_date']),
             models.Index(fields=['reference_id']),
+            models.Index(fields=['created_at']),
         ]
 
     def __str__(self):
@@ -126,9 +127,87 @@ class Payout(models.Model):
     
     bank_details_snapshot = models.JSONField(help_text="Snapshot of bank details at time of payout")
     transaction_id = models.CharField(max_length=100, blank=True, null=True)
+    # Set on payouts created by a batch run (FinanceService.run_payout_batch); keys its bank file
+    batch_reference = models.CharField(max_length=50, blank=True, null=True, db_index=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
     processed_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f"Payout {self.id} for {self.vendor.shop_name}"
+
+
+class VendorBalance(models.Model):
+    """
+    Running balances per vendor, maintained alongside every ledger write so
+    balance reads are O(1). The ledger stays the source of truth: the
+    audit_vendor_balances command recomputes these from it and reports drift.
+    """
+    LIFETIME_ENTRY_TYPES = ['REVENUE', 'COMMISSION']
+
+    vendor = models.OneToOneField('vendor.VendorProfile', on_delete=models.CASCADE, primary_key=True, related_name='balance')
+    settled_balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    uncleared_balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    lifetime_earnings = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    last_entry_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.vendor_id} - {self.settled_balance} (+{self.uncleared_balance} uncleared)"
+
+    @classmethod
+    def ledger_totals(cls, vendor_ids=None):
+        """{vendor_id: {field: value}} recomputed from the full ledger."""
+        entries = LedgerEntry.objects.all()
+        if vendor_ids is not None:
+            entries = entries.filter(vendor_id__in=vendor_ids)
+        rows = entries.order_by().values('vendor_id').annotate(
+            settled_balance=models.Sum('amount', filter=models.Q(is_settled=True)),
+            uncleared_balance=models.Sum('amount', filter=models.Q(is_settled=False)),
+            lifetime_earnings=models.Sum('amount', filter=models.Q(entry_type__in=cls.LIFETIME_ENTRY_TYPES)),
+            last_entry_id=models.Max('id'),
+        )
+        return {
+            row.pop('vendor_id'): {field: value or (0 if field == 'last_entry_id' else Decimal('0.00')) for field, value in row.items()}
+            for row in rows
+        }
+
+    @classmethod
+    def apply_changes(cls, changes):
+        """
+        Atomically add {vendor_id: {'settled': d, 'uncleared': d, 'lifetime': d, 'last_entry_id': id}}
+        to the balances, locking the rows in vendor id order. Vendors without a
+        balance row yet are seeded from the ledger, which already holds the change.
+        """
+        from django.db import IntegrityError, transaction
+        from django.db.models.functions import Greatest
+
+        with transaction.atomic():
+            locked = set(
+                cls.objects.select_for_update().filter(vendor_id__in=list(changes))
+                .order_by('vendor_id').values_list('vendor_id', flat=True)
+            )
+            for vendor_id in sorted(changes):
+                change = changes[vendor_id]
+                if vendor_id not in locked:
+                    try:
+                        with transaction.atomic():
+                            cls.objects.create(vendor_id=vendor_id, **cls.ledger_totals([vendor_id]).get(vendor_id, {}))
+                        continue
+                    except IntegrityError:
+                        pass  # Seeded concurrently; the seed did not see our entries, so apply the change
+                cls.objects.filter(vendor_id=vendor_id).update(
+                    settled_balance=models.F('settled_balance') + change.get('settled', 0),
+                    uncleared_balance=models.F('uncleared_balance') + change.get('uncleared', 0),
+                    lifetime_earnings=models.F('lifetime_earnings') + change.get('lifetime', 0),
+                    last_entry_id=Greatest(models.F('last_entry_id'), change.get('last_entry_id') or 0),
+                    updated_at=timezone.now(),
+                )
+
+    @classmethod
+    def for_vendor(cls, vendor):
+        """The vendor's balance row, seeded from the ledger the first time it is read."""
+        balance = cls.objects.filter(vendor=vendor).first()
+        if balance is None:
+            balance, _ = cls.objects.get_or_create(vendor=vendor, defaults=cls.ledger_totals([vendor.id]).get(vendor.id, {}))
+        return balance
@@ -1,9 +1,12 @@
 from decimal import Decimal, ROUND_HALF_UP
 from django.db import transaction, models
+from django.db.models import F, Value
+from django.db.models.functions import Concat, TruncDay, TruncHour, TruncMonth
 from django.utils import timezone
 from datetime import timedelta
 import uuid
-from .models import CategoryCommission, LedgerEntry, Payout
+from .models import LedgerEntry, Payout, VendorBalance
+from . import commission_rules, earnings_cache
 from user.models import OrderItem
 
 class FinanceService:
@@ -13,27 +16,19 @@ class FinanceService:
     """
 
     @staticmethod
-    def get_commission_settings(category):
-        """Fetch global commission settings for a category, fallback to GlobalCommission."""
-        from .models import GlobalCommission
-        try:
-            return CategoryCommission.objects.get(category=category)
-        except CategoryCommission.DoesNotExist:
-            # Fallback to global setting if category specific not found
-            global_settings = GlobalCommission.objects.first()
-            if not global_settings:
-                # Create default global setting if not exists
-                global_settings = GlobalCommission.objects.create(percentage=Decimal('10.00'))
-            return global_settings
+    def get_commission_settings(category, rules=None):
+        """Commission rule for a category, fallback to the global one (from the in-process rule table)."""
+        return commission_rules.rule_for(category, rules)
 
     @staticmethod
-    def calculate_commission(price, category):
+    def calculate_commission(price, category, rules=None):
         """
         Calculate commission based on price and category settings.
+        `rules` is a commission_rules.get_rules() table, to price many items against one snapshot.
         Returns: (amount, rate_snapshot)
         """
         price = Decimal(str(price))
-        settings = FinanceService.get_commission_settings(category)
+        settings = FinanceService.get_commission_settings(category, rules)
         
         if not settings:
             # Default to 10% if not configured as per common marketplace defaults
@@ -60,10 +55,15 @@ class FinanceService:
         """
         Consolidate financial entries: Creates ONE LedgerEntry per Vendor per Order.
         Calculates Gross, Commission, and Net in a single row.
+        Item commissions are computed in memory against one rule table snapshot and
+        written with a single bulk_update; the ledger rows with a single bulk_create.
         """
+        rules = commission_rules.get_rules()
+
         # 1. Group items by vendor
         vendor_data = {}
-        for item in order.items.all():
+        priced_items = []
+        for item in order.items.select_related('product', 'vendor'):
             if not item.product:
                 continue
             if not item.vendor:
@@ -81,25 +81,29 @@ class FinanceService:
             # Snapshot Commission for the item
             comm_amount, comm_desc = FinanceService.calculate_commission(
                 item.product_price * item.quantity, 
-                item.product.category
+                item.product.category,
+                rules
             )
             try:
                 item.commission_rate = Decimal(comm_desc.split('%')[0]) if '%' in comm_desc else Decimal('0.00')
             except Exception:
                 item.commission_rate = Decimal('0.00')
             item.commission_amount = comm_amount
-            item.save()
+            priced_items.append(item)
 
             vendor_data[vendor_id]['gross'] += item.subtotal
             vendor_data[vendor_id]['commission'] += item.commission_amount
             vendor_data[vendor_id]['items'].append(item.product_name)
 
+        OrderItem.objects.bulk_update(priced_items, ['commission_rate', 'commission_amount'])
+
         # 2. Create Unified Ledger Entries
+        settlement_date = timezone.now() + timedelta(days=7)
+        entries = []
         for v_id, data in vendor_data.items():
             net = data['gross'] - data['commission']
             description = f"Unified entry for Order {order.order_number}: Items: {', '.join(data['items'])}"
-            
-            FinanceService._create_ledger_entry(
+            entries.append(LedgerEntry(
                 vendor=data['vendor'],
                 amount=net, # Net credited to vendor balance
                 gross_amount=data['gross'],
@@ -108,8 +112,22 @@ class FinanceService:
                 entry_type='REVENUE',
                 description=description,
                 order=order,
-                reference_id=f"ORD_{order.order_number}_V_{v_id}"
-            )
+                reference_id=f"ORD_{order.order_number}_V_{v_id}",
+                settlement_date=settlement_date,
+                is_settled=False
+            ))
+        if not entries:
+            return
+        entries = LedgerEntry.objects.bulk_create(entries)
+
+        FinanceService._apply_balance_changes({
+            entry.vendor_id: {
+                'uncleared': entry.amount,
+                'lifetime': entry.amount,
+                'last_entry_id': entry.id,
+            }
+            for entry in entries
+        })
 
     @staticmethod
     @transaction.atomic
@@ -135,7 +153,11 @@ class FinanceService:
             )
         
         # Also mark original as settled if they weren't, to remove from uncleared balance
-        original_entries.filter(is_settled=False).update(is_settled=True, description=F('description') + " (CANCELLED)")
+        moved = list(original_entries.filter(is_settled=False).select_for_update().values_list('id', 'vendor_id', 'amount'))
+        LedgerEntry.objects.filter(id__in=[entry_id for entry_id, _, _ in moved]).update(
+            is_settled=True, description=Concat(F('description'), Value(" (CANCELLED)"))
+        )
+        FinanceService._apply_settlement_moves(moved, settled=True)
 
     @staticmethod
     @transaction.atomic
@@ -149,44 +171,100 @@ class FinanceService:
         # Funds stay uncleared for 3 days to allow for returns
         settlement_date = timezone.now() + timedelta(days=3)
         
-        updated_count = LedgerEntry.objects.filter(
+        entries = LedgerEntry.objects.filter(
             order=order,
             entry_type='REVENUE'
-        ).update(
+        )
+        # Entries already released move back to the uncleared balance
+        moved = list(entries.filter(is_settled=True).select_for_update().values_list('id', 'vendor_id', 'amount'))
+        updated_count = entries.update(
             is_settled=False,  # Force false to ensure 3-day hold
             settlement_date=settlement_date
         )
+        FinanceService._apply_settlement_moves(moved, settled=False)
         return updated_count
 
     @staticmethod
-    @transaction.atomic
-    def release_expired_funds():
+    def _apply_settlement_moves(entries, settled):
         """
-        Background task: Find all ledger entries where settlement_date has passed
-        and no return request exists, then mark them as settled (releasing funds to vendor).
+        Shift the amounts of (id, vendor_id, amount) entries whose is_settled flag
+        was just flipped between the uncleared and settled vendor balances.
+        """
+        changes = {}
+        for _, vendor_id, amount in entries:
+            change = changes.setdefault(vendor_id, {'settled': Decimal('0.00'), 'uncleared': Decimal('0.00')})
+            change['settled'] += amount if settled else -amount
+            change['uncleared'] -= amount if settled else -amount
+        if changes:
+            FinanceService._apply_balance_changes(changes)
+
+    @staticmethod
+    def _apply_balance_changes(changes):
+        """Move the vendor balance snapshots and drop the vendors' cached earnings aggregates."""
+        VendorBalance.apply_changes(changes)
+        earnings_cache.invalidate(list(changes))
+
+    @staticmethod
+    def releasable_entries(now=None):
+        """
+        REVENUE entries whose settlement date has passed and whose order has no
+        active (non-rejected) return request.
         """
+        from django.db.models import Exists, OuterRef
         from user.models import OrderReturn
-        
-        # 1. Identify entries that reached settlement date
-        pending_entries = LedgerEntry.objects.filter(
+
+        active_return = OrderReturn.objects.filter(order_id=OuterRef('order_id')).exclude(status='rejected')
+        return LedgerEntry.objects.filter(
             is_settled=False,
-            settlement_date__lte=timezone.now(),
-            entry_type='REVENUE'
-        )
+            settlement_date__lte=now or timezone.now(),
+            entry_type='REVENUE',
+            order__isnull=False,
+        ).filter(~Exists(active_return))
+
+    @staticmethod
+    def release_expired_funds(chunk_size=None, on_chunk=None, dry_run=False):
+        """
+        Background task: Find all ledger entries where settlement_date has passed
+        and no return request exists, then mark them as settled (releasing funds to vendor).
+
+        Set-based: the due id range is walked in chunks of `chunk_size` ids. Each
+        chunk runs in one short transaction: the eligible rows are claimed with
+        SELECT ... FOR UPDATE SKIP LOCKED, released by one UPDATE, and their
+        amounts moved to the settled vendor balances - so several
+        process_settlement workers can run side by side without waiting on each
+        other's rows. `on_chunk(first_id, last_id, released, seconds)` is called
+        after every chunk.
+        """
+        import time
+        from django.conf import settings as django_settings
+        from django.db.models import Max, Min
+
+        chunk_size = chunk_size or getattr(django_settings, 'SETTLEMENT_CHUNK_SIZE', 5000)
+        now = timezone.now()
+        due = FinanceService.releasable_entries(now)
+        if dry_run:
+            return due.count()
+
+        bounds = due.aggregate(first=Min('id'), last=Max('id'))
+        if bounds['first'] is None:
+            return 0
 
         released_count = 0
-        for entry in pending_entries:
-            # Check if there's an active return request for this order
-            if entry.order:
-                has_active_return = OrderReturn.objects.filter(
-                    order=entry.order
-                ).exclude(status='rejected').exists()
-                
-                if not has_active_return:
-                    entry.is_settled = True
-                    entry.save(update_fields=['is_settled'])
-                    released_count += 1
-        
+        for first_id in range(bounds['first'], bounds['last'] + 1, chunk_size):
+            last_id = min(first_id + chunk_size - 1, bounds['last'])
+            started = time.monotonic()
+            with transaction.atomic():
+                claimed = list(
+                    due.filter(id__gte=first_id, id__lte=last_id)
+                    .select_for_update(skip_locked=True)
+                    .values_list('id', 'vendor_id', 'amount')
+                )
+                released = LedgerEntry.objects.filter(id__in=[entry_id for entry_id, _, _ in claimed]).update(is_settled=True)
+                FinanceService._apply_settlement_moves(claimed, settled=True)
+            released_count += released
+            if on_chunk:
+                on_chunk(first_id, last_id, released, time.monotonic() - started)
+
         return released_count
 
     @staticmethod
@@ -196,8 +274,15 @@ class FinanceService:
         Execute a payout to a vendor.
         Requirement: Concurrent payout prevention (via transaction.atomic and balance check).
         """
-        amount = Decimal(str(amount))
-        available = FinanceService.get_vendor_balance(vendor)
+        try:
+            amount = Decimal(str(amount))
+        except ArithmeticError:
+            raise ValueError(f"Invalid payout amount: {amount}")
+        if not amount.is_finite() or amount <= 0:
+            raise ValueError("Payout amount must be greater than zero.")
+        # Lock the balance row: concurrent payouts of the same vendor (and batch runs) queue here instead of overdrawing
+        VendorBalance.for_vendor(vendor)
+        available = VendorBalance.objects.select_for_update().get(vendor=vendor).settled_balance
         
         if amount > available:
             raise ValueError(f"Insufficient funds. Available: {available}, Requested: {amount}")
@@ -229,6 +314,109 @@ class FinanceService:
         
         return payout
 
+    @staticmethod
+    def payable_balances(min_amount):
+        """Balances of approved, unblocked vendors with bank details whose settled balance reaches `min_amount`."""
+        from django.db.models import Q
+
+        missing_bank = (
+            Q(vendor__bank_account_number__isnull=True) | Q(vendor__bank_account_number='')
+            | Q(vendor__bank_ifsc_code__isnull=True) | Q(vendor__bank_ifsc_code='')
+        )
+        return VendorBalance.objects.filter(
+            settled_balance__gte=min_amount,
+            settled_balance__gt=0,
+            vendor__approval_status='approved',
+            vendor__is_blocked=False,
+        ).exclude(missing_bank)
+
+    @staticmethod
+    def run_payout_batch(min_amount=None, batch_size=None, reference=None, on_batch=None, dry_run=False):
+        """
+        Weekly payout run: pays out the whole settled balance of every payable
+        vendor (see payable_balances) in one batch tagged `reference`.
+
+        Vendors are walked in id order, `batch_size` at a time. Each batch runs
+        in one short transaction: the balance rows are claimed with
+        SELECT ... FOR UPDATE SKIP LOCKED (a vendor in the middle of a
+        process_payout request is left for the next run instead of waiting on
+        it), then the Payout and PAYOUT ledger rows are bulk-created and the
+        balances debited. `on_batch(vendors, amount, seconds)` is called after
+        every batch. The bank file of the run is streamed by
+        finance.bank_file.iter_bank_file(reference).
+        Returns (reference, payout count, total amount).
+        """
+        import time
+        from django.conf import settings as django_settings
+        from django.db.models import Sum
+
+        if min_amount is None:
+            min_amount = getattr(django_settings, 'PAYOUT_MIN_AMOUNT', 100)
+        min_amount = Decimal(str(min_amount))
+        batch_size = batch_size or getattr(django_settings, 'PAYOUT_BATCH_SIZE', 500)
+        payable = FinanceService.payable_balances(min_amount)
+        if dry_run:
+            totals = payable.aggregate(total=Sum('settled_balance'))
+            return reference, payable.count(), totals['total'] or Decimal('0.00')
+
+        reference = reference or f"PAYRUN_{timezone.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6].upper()}"
+        payout_count = 0
+        total = Decimal('0.00')
+        last_vendor_id = 0
+        while True:
+            started = time.monotonic()
+            with transaction.atomic():
+                claimed = list(
+                    payable.filter(vendor_id__gt=last_vendor_id)
+                    .select_related('vendor')
+                    .select_for_update(skip_locked=True, of=('self',))
+                    .order_by('vendor_id')[:batch_size]
+                )
+                if not claimed:
+                    break
+                last_vendor_id = claimed[-1].vendor_id
+
+                now = timezone.now()
+                payouts = Payout.objects.bulk_create([
+                    Payout(
+                        vendor=balance.vendor,
+                        amount=balance.settled_balance,
+                        # Snapshot bank details for audit safety
+                        bank_details_snapshot={
+                            "holder": balance.vendor.bank_holder_name,
+                            "account": balance.vendor.bank_account_number,
+                            "ifsc": balance.vendor.bank_ifsc_code
+                        },
+                        status='processing',
+                        batch_reference=reference
+                    )
+                    for balance in claimed
+                ])
+                entries = LedgerEntry.objects.bulk_create([
+                    LedgerEntry(
+                        vendor_id=payout.vendor_id,
+                        amount=-payout.amount,
+                        entry_type='PAYOUT',
+                        description=f"Payout Execution: ID {payout.id} (batch {reference})",
+                        reference_id=f"PAYOUT_{payout.id}",
+                        settlement_date=now,
+                        is_settled=True # Payouts are immediately settled entries
+                    )
+                    for payout in payouts
+                ])
+                FinanceService._apply_balance_changes({
+                    entry.vendor_id: {'settled': entry.amount, 'last_entry_id': entry.id}
+                    for entry in entries
+                })
+
+            batch_total = sum((payout.amount for payout in payouts), Decimal('0.00'))
+            payout_count += len(payouts)
+            total += batch_total
+            if on_batch:
+                on_batch(len(payouts), batch_total, time.monotonic() - started)
+
+        return reference, payout_count, total
+
     @staticmethod
     def _create_ledger_entry(vendor, amount, entry_type, description, order=None, order_item=None, reference_id=None, is_settled=False, gross_amount=0, commission_amount=0, net_amount=0):
         """Internal helper for creating immutable ledger entries."""
@@ -238,44 +426,42 @@ class FinanceService:
         # Settlement date is T+7 unless specified (like for payouts)
         settlement_date = timezone.now() + timedelta(days=7) if not is_settled else timezone.now()
 
-        return LedgerEntry.objects.create(
-            vendor=vendor,
-            amount=amount,
-            gross_amount=gross_amount,
-            commission_amount=commission_amount,
-            net_amount=net_amount,
-            entry_type=entry_type,
-            description=description,
-            order=order,
-            order_item=order_item,
-            reference_id=reference_id,
-            settlement_date=settlement_date,
-            is_settled=is_settled
-        )
+        with transaction.atomic():
+            entry = LedgerEntry.objects.create(
+                vendor=vendor,
+                amount=amount,
+                gross_amount=gross_amount,
+                commission_amount=commission_amount,
+                net_amount=net_amount,
+                entry_type=entry_type,
+                description=description,
+                order=order,
+                order_item=order_item,
+                reference_id=reference_id,
+                settlement_date=settlement_date,
+                is_settled=is_settled
+            )
+            amount = Decimal(str(amount))
+            FinanceService._apply_balance_changes({vendor.id: {
+                'settled' if is_settled else 'uncleared': amount,
+                'lifetime': amount if entry_type in VendorBalance.LIFETIME_ENTRY_TYPES else 0,
+                'last_entry_id': entry.id,
+            }})
+        return entry
 
     @staticmethod
     def get_vendor_balance(vendor):
         """
-        Calculate vendor balance from ledger entries.
-        Requirement: Never update vendor balance directly. All balances must be derived.
+        Settled vendor balance (sum of settled credits and debits).
+        Requirement: Never update vendor balance directly. All balances must be derived -
+        VendorBalance is only moved together with the ledger writes it mirrors.
         """
-        # Sum of settled credits and debits
-        balance = LedgerEntry.objects.filter(
-            vendor=vendor,
-            is_settled=True
-        ).aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
-        
-        return balance
+        return VendorBalance.for_vendor(vendor).settled_balance
 
     @staticmethod
     def get_uncleared_balance(vendor):
         """Sum of ledger entries that are not yet settled (T+7 period)."""
-        balance = LedgerEntry.objects.filter(
-            vendor=vendor,
-            is_settled=False
-        ).aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
-        
-        return balance
+        return VendorBalance.for_vendor(vendor).uncleared_balance
 
     @staticmethod
     @transaction.atomic
@@ -356,65 +542,89 @@ class FinanceService:
 
     @staticmethod
     def get_vendor_earnings_summary(vendor):
-        """Consolidated summary for vendor dashboard."""
-        from .models import Payout
-        available = FinanceService.get_vendor_balance(vendor)
-        uncleared = FinanceService.get_uncleared_balance(vendor)
-        total_orders = LedgerEntry.objects.filter(vendor=vendor, entry_type='REVENUE').count()
+        """
+        Consolidated summary for vendor dashboard.
+        Balances come from the VendorBalance snapshot; the REVENUE figures are one
+        conditional-aggregate pass over the ledger, cached per vendor.
+        """
+        balance = VendorBalance.for_vendor(vendor)
+
+        def revenue_stats():
+            # Gross / Commission / Net aggregates (from REVENUE entries)
+            revenue = models.Q(entry_type='REVENUE')
+            return LedgerEntry.objects.filter(vendor=vendor).aggregate(
+                total_orders=models.Count('id', filter=revenue),
+                gross=models.Sum('gross_amount', filter=revenue),
+                commission=models.Sum('commission_amount', filter=revenue),
+                net=models.Sum('net_amount', filter=revenue),
+            )
+
+        stats = earnings_cache.cached(vendor.id, 'summary', revenue_stats)
         pending_payouts = Payout.objects.filter(vendor=vendor, status='pending').aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
-        recent = LedgerEntry.objects.filter(vendor=vendor).order_by('-created_at')[:10]
-        
-        # Total Earnings = All REVENUE + All COMMISSION (net of all time)
-        lifetime_earnings = LedgerEntry.objects.filter(
-            vendor=vendor, 
-            entry_type__in=['REVENUE', 'COMMISSION']
-        ).aggregate(total=models.Sum('amount'))['total'] or Decimal('0.00')
-
-        # Gross / Commission / Net aggregates (from REVENUE entries)
-        revenue_agg = LedgerEntry.objects.filter(
-            vendor=vendor,
-            entry_type='REVENUE'
-        ).aggregate(
-            gross=models.Sum('gross_amount'),
-            commission=models.Sum('commission_amount'),
-            net=models.Sum('net_amount'),
-        )
+        recent = LedgerEntry.objects.filter(vendor=vendor).select_related('order').order_by('-created_at')[:10]
 
         return {
-            "available_balance": available,
-            "uncleared_balance": uncleared,
-            "lifetime_earnings": lifetime_earnings,
-            "total_orders": total_orders,
+            "available_balance": balance.settled_balance,
+            "uncleared_balance": balance.uncleared_balance,
+            # Total Earnings = All REVENUE + All COMMISSION (net of all time)
+            "lifetime_earnings": balance.lifetime_earnings,
+            "total_orders": stats['total_orders'],
             "pending_payouts": pending_payouts,
             "recent_activities": recent,
-            "total_gross": revenue_agg['gross'] or Decimal('0.00'),
-            "total_commission": revenue_agg['commission'] or Decimal('0.00'),
-            "total_net": revenue_agg['net'] or Decimal('0.00'),
+            "total_gross": stats['gross'] or Decimal('0.00'),
+            "total_commission": stats['commission'] or Decimal('0.00'),
+            "total_net": stats['net'] or Decimal('0.00'),
         }
 
+    # period -> (window, bucket function, step, label format)
+    ANALYTICS_PERIODS = {
+        'today': (None, TruncHour, 'hour', "%I%p"),  # e.g. 09AM
+        'weekly': (timedelta(days=7), TruncDay, 'day', "%Y-%m-%d"),
+        'monthly': (timedelta(days=30), TruncDay, 'day', "%Y-%m-%d"),
+        'yearly': (timedelta(days=365), TruncMonth, 'month', "%Y-%m"),
+    }
+
     @staticmethod
     def get_vendor_analytics(vendor, period='weekly'):
-        """Aggregate earnings for charts."""
-        if period == 'today':
-            start_date = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
-            entries = LedgerEntry.objects.filter(vendor=vendor, created_at__gte=start_date).order_by('created_at')
-            data = {}
-            for entry in entries:
-                hour_key = entry.created_at.strftime("%I%p") # e.g. 09AM
-                data[hour_key] = data.get(hour_key, Decimal('0.00')) + entry.amount
-            return [{"name": k, "earnings": v} for k, v in data.items()]
-
-        days = 7 if period == 'weekly' else 30 if period == 'monthly' else 365
-        start_date = timezone.now() - timedelta(days=days)
-        
-        entries = LedgerEntry.objects.filter(
-            vendor=vendor,
-            created_at__gte=start_date
-        ).order_by('created_at')
-
-        data = {}
-        for entry in entries:
-            date_key = entry.created_at.date().strftime("%Y-%m-%d")
-            data[date_key] = data.get(date_key, Decimal('0.00')) + entry.amount
-        
-        return [{"name": k, "earnings": v} for k, v in data.items()]
+        """
+        Aggregate earnings for charts: bucketed in SQL (hours for today, days for
+        the week/month, months for the year) and zero-filled, cached per vendor.
+        """
+        if period not in FinanceService.ANALYTICS_PERIODS:
+            period = 'yearly'
+        window, trunc, step, label = FinanceService.ANALYTICS_PERIODS[period]
+
+        def series():
+            now = timezone.now()
+            if window is None:
+                start_date = now.replace(hour=0, minute=0, second=0, microsecond=0)
+            else:
+                start_date = now - window
+
+            totals = {
+                row['bucket']: row['earnings']
+                for row in LedgerEntry.objects.filter(vendor=vendor, created_at__gte=start_date)
+                .annotate(bucket=trunc('created_at'))
+                .values('bucket')
+                .annotate(earnings=models.Sum('amount'))
+                .order_by('bucket')
+            }
+
+            # Zero-fill every bucket from the start of the window up to now
+            bucket = start_date.replace(minute=0, second=0, microsecond=0)
+            if step != 'hour':
+                bucket = bucket.replace(hour=0)
+            if step == 'month':
+                bucket = bucket.replace(day=1)
+            points = []
+            while bucket <= now:
+                points.append({"name": bucket.strftime(label), "earnings": totals.get(bucket, Decimal('0.00'))})
+                if step == 'hour':
+                    bucket += timedelta(hours=1)
+                elif step == 'day':
+                    bucket += timedelta(days=1)
+                else:
+                    bucket = (bucket + timedelta(days=32)).replace(day=1)
+            return points
+
+        return earnings_cache.cached(vendor.id, f"analytics:{period}", series)
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .commission_rules import invalidate_commission_rules
+from .models import CategoryCommission, GlobalCommission
+
+
+@receiver(post_save, sender=CategoryCommission)
+@receiver(post_delete, sender=CategoryCommission)
+@receiver(post_save, sender=GlobalCommission)
+@receiver(post_delete, sender=GlobalCommission)
+def commission_rule_changed(sender, **kwargs):
+    invalidate_commission_rules()
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import VendorApprovalLog, ProductApprovalLog
+from .models import VendorApprovalLog, ProductApprovalLog, PlatformMetrics
 
 @admin.register(VendorApprovalLog)
 class VendorApprovalLogAdmin(admin.ModelAdmin):
@@ -14,3 +14,8 @@ class ProductApprovalLogAdmin(admin.ModelAdmin):
     list_filter = ('action', 'timestamp')
     search_fields = ('product__name', 'reason')
     readonly_fields = ('timestamp',)
+
+@admin.register(PlatformMetrics)
+class PlatformMetricsAdmin(admin.ModelAdmin):
+    list_display = ('id', 'computed_at')
+    readonly_fields = ('metrics', 'computed_at')
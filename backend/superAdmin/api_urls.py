@@ -3,9 +3,10 @@ from rest_framework.routers import DefaultRouter
 from .api_views import (
     VendorRequestViewSet, VendorManagementViewSet, ProductManagementViewSet,
     DeliveryRequestViewSet, DeliveryAgentManagementViewSet, DashboardView,
-    CommissionSettingsViewSet, ReportsView,
+    CommissionSettingsViewSet, ReportsView, ExportView,
+    PayoutRunView, PayoutBankFileView,
     UserManagementView, UserBlockToggleView,
-    TriggerAssignmentView, UnassignedOrdersView,
+    TriggerAssignmentView, UnassignedOrdersView, BatchAssignmentView,
     AdminOrderTrackingViewSet, AdminOrderViewSet, DeletionRequestViewSet,
     AdminLoginView, WhoAmIView, ContactQueryViewSet, ReturnManagementViewSet,
 )
@@ -30,6 +31,13 @@ urlpatterns = [
     path('dashboard/', DashboardView.as_view(), name='admin_dashboard_api'),
     path('reports/', ReportsView.as_view(), name='admin_reports_api'),
 
+    # Streaming exports (CSV / Parquet / Arrow)
+    path('exports/<str:dataset>/', ExportView.as_view(), name='admin_export_api'),
+
+    # Batch vendor payouts and their NEFT bank files
+    path('payouts/runs/', PayoutRunView.as_view(), name='admin_payout_run'),
+    path('payouts/runs/<str:reference>/bank-file/', PayoutBankFileView.as_view(), name='admin_payout_bank_file'),
+
     # User management
     path('users/', UserManagementView.as_view(), name='admin_users_list'),
     path('users/<int:pk>/toggle-block/', UserBlockToggleView.as_view(), name='admin_user_toggle_block'),
@@ -37,6 +45,7 @@ urlpatterns = [
     # Delivery assignment management
     path('trigger-assignment/<int:order_id>/', TriggerAssignmentView.as_view(), name='trigger_assignment'),
     path('unassigned-orders/', UnassignedOrdersView.as_view(), name='unassigned_orders'),
+    path('batch-assignment/', BatchAssignmentView.as_view(), name='batch_assignment'),
 
     # Dedicated Admin Login (enforces is_staff/is_superuser)
     path('admin-login/', AdminLoginView.as_view(), name='admin_login_api'),
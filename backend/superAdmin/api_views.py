@@ -5,6 +5,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.permissions import BasePermission
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 
 class IsStaffOrSuperuser(BasePermission):
     """
@@ -21,7 +22,10 @@ class IsStaffOrSuperuser(BasePermission):
             (request.user.is_staff or request.user.is_superuser)
         )
 
+import json
+
 from django.contrib.auth import get_user_model
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
 
 from django.core.mail import send_mail
 from django.conf import settings
@@ -31,7 +35,9 @@ from django.shortcuts import get_object_or_404
 
 from django.db.models import Q
 from finance.models import GlobalCommission, CategoryCommission
-from vendor.models import VendorProfile, Product
+from vendor.models import VendorProfile, Product, lightweight_images_prefetch
+from vendor.catalog_cache import invalidate_catalog_cache
+from ShopSphere.pagination import OptionalCursorPagination
 from .models import VendorApprovalLog, ProductApprovalLog, DeliveryAgentApprovalLog, ContactQuery
 from deliveryAgent.models import DeliveryAgentProfile, DeliveryAssignment
 from deliveryAgent.serializers import DeliveryAssignmentDetailSerializer, DeliveryAssignmentListSerializer
@@ -218,6 +224,7 @@ class VendorManagementViewSet(AdminLoginRequiredMixin, viewsets.ModelViewSet):
         vendor.save()
         
         Product.objects.filter(vendor=vendor).update(is_blocked=True)
+        invalidate_catalog_cache()
         
         VendorApprovalLog.objects.create(
             vendor=vendor,
@@ -287,7 +294,7 @@ class VendorManagementViewSet(AdminLoginRequiredMixin, viewsets.ModelViewSet):
         })
 
 class ProductManagementViewSet(AdminLoginRequiredMixin, viewsets.ModelViewSet):
-    queryset = Product.objects.select_related('vendor').prefetch_related('images').all()
+    queryset = Product.objects.select_related('vendor').prefetch_related(lightweight_images_prefetch()).all()
     serializer_class = AdminProductListSerializer
     permission_classes = [IsAuthenticated, IsStaffOrSuperuser]
     pagination_class = None  # We handle pagination manually below
@@ -296,7 +303,7 @@ class ProductManagementViewSet(AdminLoginRequiredMixin, viewsets.ModelViewSet):
         from django.core.paginator import Paginator
         PAGE_SIZE = 50
 
-        queryset = Product.objects.select_related('vendor').prefetch_related('images').all()
+        queryset = Product.objects.select_related('vendor').prefetch_related(lightweight_images_prefetch()).all()
 
         # Status filter
         status_filter = request.query_params.get('status', None)
@@ -621,76 +628,20 @@ class DashboardView(AdminLoginRequiredMixin, generics.GenericAPIView):
     permission_classes = [IsAuthenticated, IsStaffOrSuperuser]
     
     def get(self, request):
-        from django.db.models import Sum
-        from user.models import Order
-        
-        total_vendors = VendorProfile.objects.count()
-        pending_vendors = VendorProfile.objects.filter(approval_status='pending').count()
-        approved_vendors = VendorProfile.objects.filter(approval_status='approved').count()
-        blocked_vendors = VendorProfile.objects.filter(is_blocked=True).count()
-        
-        total_products = Product.objects.count()
-        active_products = Product.objects.filter(status='active').count()
-        inactive_products = Product.objects.filter(status='inactive').count()
-        blocked_products = Product.objects.filter(is_blocked=True).count()
-        
-        total_agents = DeliveryAgentProfile.objects.count()
-        pending_agents = DeliveryAgentProfile.objects.filter(approval_status='pending').count()
-        approved_agents = DeliveryAgentProfile.objects.filter(approval_status='approved').count()
-        blocked_agents = DeliveryAgentProfile.objects.filter(is_blocked=True).count()
-
-        total_orders = Order.objects.count()
-        pending_orders = Order.objects.filter(status='pending').count()
-        delivered_orders = Order.objects.filter(status='delivered').count()
-        cancelled_orders = Order.objects.filter(status='cancelled').count()
-        
-        # User/Customer stats
-        User = get_user_model()
-        total_customers = User.objects.filter(role='customer').count()
-        active_customers = User.objects.filter(role='customer', is_blocked=False).count()
-        blocked_customers = User.objects.filter(role='customer', is_blocked=True).count()
+        from .metrics import get_platform_metrics
 
-        # Deletion requests count
-        deletion_requests = VendorProfile.objects.filter(is_deletion_requested=True).count() + \
-                           DeliveryAgentProfile.objects.filter(is_deletion_requested=True).count()
-        
-        # Basic revenue for dashboard quick-view
-        revenue_summary = Order.objects.filter(payment_status='completed').aggregate(
-            total=Sum('total_amount'),
-        )
-        
+        # Counters come from the materialised snapshot (at most PLATFORM_METRICS_MAX_AGE seconds old)
+        snapshot = get_platform_metrics()
+        metrics = snapshot.metrics
         return Response({
-            'vendors': {
-                'total': total_vendors,
-                'pending': pending_vendors,
-                'approved': approved_vendors,
-                'blocked': blocked_vendors
-            },
-            'products': {
-                'total': total_products,
-                'active': active_products,
-                'inactive': inactive_products,
-                'blocked': blocked_products
-            },
-            'agents': {
-                'total': total_agents,
-                'pending': pending_agents,
-                'approved': approved_agents,
-                'blocked': blocked_agents
-            },
-            'customers': {
-                'total': total_customers,
-                'active': active_customers,
-                'blocked': blocked_customers
-            },
-            'orders': {
-                'total': total_orders,
-                'pending': pending_orders,
-                'delivered': delivered_orders,
-                'cancelled': cancelled_orders
-            },
-            'deletion_requests': deletion_requests,
-            'total_revenue': float(revenue_summary['total'] or 0)
+            'vendors': {key: metrics['vendors'][key] for key in ('total', 'pending', 'approved', 'blocked')},
+            'products': metrics['products'],
+            'agents': {key: metrics['agents'][key] for key in ('total', 'pending', 'approved', 'blocked')},
+            'customers': metrics['customers'],
+            'orders': metrics['orders'],
+            'deletion_requests': metrics['deletion_requests'],
+            'total_revenue': metrics['total_revenue'],
+            'computed_at': snapshot.computed_at,
         })
 
 
@@ -710,83 +661,15 @@ class ReportsView(APIView):
     permission_classes = [IsAuthenticated, IsStaffOrSuperuser]
 
     def get(self, request):
-        from django.db.models import Count, Avg, Sum
-        from django.db.models.functions import TruncDate
+        from django.db.models import Sum
         from django.utils import timezone
-        from datetime import timedelta
-        from user.models import Order, OrderItem
         from deliveryAgent.models import DeliveryCommission, DeliveryAssignment, DeliveryAgentProfile
-        from finance.models import LedgerEntry
+        from .rollups import revenue_report
 
         today = timezone.now().date()
-        thirty_days_ago = today - timedelta(days=30)
-        seven_days_ago = today - timedelta(days=7)
-
-        # ── Orders ───────────────────────────────
-        order_qs = Order.objects.all()
-        completed_qs = order_qs.filter(payment_status='completed')
 
-        order_status_breakdown = list(
-            order_qs.values('status').annotate(count=Count('id')).order_by('-count')
-        )
-        payment_status_breakdown = list(
-            order_qs.values('payment_status').annotate(count=Count('id')).order_by('-count')
-        )
-
-        # ── Revenue ───────────────────────────────
-        total_revenue = float(completed_qs.aggregate(t=Sum('total_amount'))['t'] or 0)
-        avg_order_value = float(completed_qs.aggregate(a=Avg('total_amount'))['a'] or 0)
-        revenue_today = float(completed_qs.filter(created_at__date=today).aggregate(t=Sum('total_amount'))['t'] or 0)
-        revenue_week = float(completed_qs.filter(created_at__date__gte=seven_days_ago).aggregate(t=Sum('total_amount'))['t'] or 0)
-        revenue_month = float(completed_qs.filter(created_at__date__gte=thirty_days_ago).aggregate(t=Sum('total_amount'))['t'] or 0)
-
-        # ── Daily trend ───────────────────────────
-        daily_revenue = list(
-            completed_qs.filter(created_at__date__gte=thirty_days_ago)
-            .annotate(day=TruncDate('created_at'))
-            .values('day')
-            .annotate(revenue=Sum('total_amount'), orders=Count('id'))
-            .order_by('day')
-        )
-        for d in daily_revenue:
-            d['day'] = d['day'].strftime('%d %b')
-            d['revenue'] = float(d['revenue'])
-
-        # ── Finance ───────────────────────────────
-        finance_agg = LedgerEntry.objects.aggregate(
-            total_gross=Sum('gross_amount'),
-            total_commission=Sum('commission_amount'),
-            total_net=Sum('net_amount'),
-        )
-
-        # ── Top Vendors ───────────────────────────
-        top_vendors = list(
-            LedgerEntry.objects.filter(entry_type='REVENUE')
-            .values('vendor__shop_name')
-            .annotate(
-                total_gross=Sum('gross_amount'),
-                total_commission=Sum('commission_amount'),
-                total_net=Sum('net_amount'),
-                order_count=Count('order', distinct=True)
-            )
-            .order_by('-total_net')[:10]
-        )
-        for v in top_vendors:
-            for k in ['total_gross', 'total_commission', 'total_net']:
-                v[k] = float(v[k] or 0)
-
-        # ── Top Products ──────────────────────────
-        top_products = list(
-            OrderItem.objects.values('product_name')
-            .annotate(
-                total_qty=Sum('quantity'),
-                total_revenue=Sum('subtotal'),
-                order_count=Count('order', distinct=True),
-            )
-            .order_by('-total_qty')[:10]
-        )
-        for p in top_products:
-            p['total_revenue'] = float(p['total_revenue'] or 0)
+        # Orders, revenue, finance, top sellers and user growth: daily rollups + today's live facts
+        report = revenue_report(today)
 
         # ── Delivery ──────────────────────────────
         total_commissions_paid = float(DeliveryCommission.objects.filter(status='paid').aggregate(t=Sum('total_commission'))['t'] or 0)
@@ -805,42 +688,10 @@ class ReportsView(APIView):
         approved_agents = DeliveryAgentProfile.objects.filter(approval_status='approved').count()
 
         # ── User Growth ───────────────────────────
-        User = get_user_model()
-        total_users = User.objects.filter(role='customer').count()
-        new_users_today = User.objects.filter(role='customer', date_joined__date=today).count()
-        new_users_week = User.objects.filter(role='customer', date_joined__date__gte=seven_days_ago).count()
-        
-        user_growth = list(
-            User.objects.filter(role='customer', date_joined__date__gte=thirty_days_ago)
-            .annotate(day=TruncDate('date_joined'))
-            .values('day')
-            .annotate(count=Count('id'))
-            .order_by('day')
-        )
-        for u in user_growth:
-            u['day'] = u['day'].strftime('%d %b')
+        total_users = get_user_model().objects.filter(role='customer').count()
 
         return Response({
-            # Orders
-            'total_orders': order_qs.count(),
-            'orders_today': order_qs.filter(created_at__date=today).count(),
-            'orders_this_week': order_qs.filter(created_at__date__gte=seven_days_ago).count(),
-            'orders_this_month': order_qs.filter(created_at__date__gte=thirty_days_ago).count(),
-            'order_status_breakdown': order_status_breakdown,
-            'payment_status_breakdown': payment_status_breakdown,
-
-            # Revenue
-            'total_revenue': total_revenue,
-            'avg_order_value': avg_order_value,
-            'revenue_today': revenue_today,
-            'revenue_week': revenue_week,
-            'revenue_month': revenue_month,
-            'daily_revenue': daily_revenue,
-
-            # Finance
-            'total_gross': float(finance_agg['total_gross'] or 0),
-            'total_platform_commission': float(finance_agg['total_commission'] or 0),
-            'total_net': float(finance_agg['total_net'] or 0),
+            **report,
 
             # Vendors & Products
             'total_vendors': total_vendors,
@@ -849,10 +700,6 @@ class ReportsView(APIView):
             'total_products': total_products,
             'active_products': active_products,
             'blocked_products': blocked_products,
-            'top_vendors': top_vendors,
-
-            # Products
-            'top_products': top_products,
 
             # Delivery
             'total_delivery_commissions_paid': total_commissions_paid,
@@ -864,34 +711,166 @@ class ReportsView(APIView):
             
             # User Growth (New)
             'total_customers': total_users,
-            'new_users_today': new_users_today,
-            'new_users_week': new_users_week,
-            'user_growth': user_growth,
 
             # Meta
             'report_date': str(today),
         })
 
 
+class ExportRenderer(BaseRenderer):
+    """Lets DRF negotiate the export formats (?format=...); the file itself is streamed by ExportView."""
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only used for error responses on the export endpoint
+        return json.dumps(data).encode()
+
+
+class CSVExportRenderer(ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class ParquetExportRenderer(ExportRenderer):
+    media_type = 'application/vnd.apache.parquet'
+    format = 'parquet'
+
+
+class ArrowExportRenderer(ExportRenderer):
+    media_type = 'application/vnd.apache.arrow.file'
+    format = 'arrow'
+
+
+class ExportView(APIView):
+    """
+    GET /superAdmin/api/exports/<dataset>/?format=csv|parquet|arrow
+    Streams a full export of orders, ledger entries or payouts in constant memory
+    (see superAdmin/exports.py). Filters: since / until on created_at, plus
+    vendor & type (ledger), vendor & status (payouts), status & payment_status (orders).
+    """
+    permission_classes = [IsAuthenticated, IsStaffOrSuperuser]
+    renderer_classes = [CSVExportRenderer, ParquetExportRenderer, ArrowExportRenderer, JSONRenderer]
+
+    def get(self, request, dataset):
+        import tempfile
+        from . import exports
+
+        file_format = request.accepted_renderer.format
+        if file_format == 'json':
+            file_format = 'csv'
+        filename = exports.export_filename(dataset, file_format)
+
+        try:
+            # Validates the dataset and filters before the response starts
+            exports.export_queryset(dataset, request.query_params)
+            if file_format == 'csv':
+                response = StreamingHttpResponse(
+                    exports.iter_csv(dataset, request.query_params),
+                    content_type='text/csv'
+                )
+            else:
+                # Parquet / Arrow end with a footer: spool to disk, then stream the file
+                spool = tempfile.TemporaryFile()
+                exports.write_columnar(dataset, spool, file_format, request.query_params)
+                spool.seek(0)
+                response = FileResponse(spool, content_type=exports.CONTENT_TYPES[file_format])
+        except exports.ExportError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class PayoutRunView(APIView):
+    """
+    POST /superAdmin/api/payouts/runs/  {"min_amount": 500, "dry_run": false}
+    Pays out the settled balance of every payable vendor in one batch
+    (FinanceService.run_payout_batch); the NEFT bank file of the run is then
+    streamed by PayoutBankFileView. With dry_run only the vendor count and
+    total are returned.
+    """
+    permission_classes = [IsAuthenticated, IsStaffOrSuperuser]
+
+    def post(self, request):
+        from decimal import Decimal, InvalidOperation
+        from django.urls import reverse
+        from finance.services import FinanceService
+
+        min_amount = request.data.get('min_amount')
+        if min_amount not in (None, ''):
+            try:
+                min_amount = Decimal(str(min_amount))
+            except InvalidOperation:
+                return Response({'error': 'min_amount must be a number.'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            min_amount = None
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+
+        reference, count, total = FinanceService.run_payout_batch(min_amount=min_amount, dry_run=dry_run)
+        if dry_run:
+            return Response({'vendors': count, 'total_amount': float(total)})
+
+        print(f"DEBUG: Payout batch {reference} created {count} payouts totalling {total} by {request.user.email}")
+        return Response({
+            'batch_reference': reference,
+            'payouts': count,
+            'total_amount': float(total),
+            'bank_file_url': request.build_absolute_uri(reverse('admin_payout_bank_file', args=[reference])) if count else None,
+        }, status=status.HTTP_201_CREATED)
+
+
+class PayoutBankFileView(APIView):
+    """
+    GET /superAdmin/api/payouts/runs/<reference>/bank-file/
+    Streams the NEFT bulk-upload CSV of a payout batch (see finance/bank_file.py).
+    """
+    permission_classes = [IsAuthenticated, IsStaffOrSuperuser]
+    # The CSV is streamed directly; the text/csv renderer only lets clients send Accept: text/csv
+    renderer_classes = [JSONRenderer, CSVExportRenderer]
+
+    def get(self, request, reference):
+        from finance import bank_file
+        from finance.models import Payout
+
+        if not Payout.objects.filter(batch_reference=reference).exists():
+            # Not a Response: negotiation may have picked the CSV renderer
+            return JsonResponse({'error': 'Payout batch not found.'}, status=status.HTTP_404_NOT_FOUND)
+
+        response = StreamingHttpResponse(bank_file.iter_bank_file(reference), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="{bank_file.bank_file_filename(reference)}"'
+        return response
+
+
 class UserManagementView(APIView):
     """
-    GET /superAdmin/api/users/  — Customers only, with live risk scores.
-    Risk score 0-100 derived from:
+    GET /superAdmin/api/users/  — Customers only, with risk scores, paginated.
+    Risk score 0-100 (see user/risk.py) derived from:
       - Cancellation rate  → up to 40 pts
       - Return rate        → up to 30 pts
       - Failed payments    → up to 30 pts
+    Scores and their counters are stored on the user, so filtering
+    (search, status, min_risk, max_risk) and sorting (?ordering=risk|-risk|
+    joined|-joined|orders|-orders) run in SQL.
     """
     permission_classes = [IsAuthenticated, IsStaffOrSuperuser]
+    pagination_class = StandardResultsSetPagination
+
+    ORDERING_FIELDS = {
+        'risk': 'risk_score',
+        'joined': 'date_joined',
+        'orders': 'order_count',
+        'email': 'email',
+    }
 
     def get(self, request):
         from django.db.models import Count, Q
-        from user.models import Order, OrderReturn
         User = get_user_model()
 
         # Customers only
-        qs = User.objects.filter(
+        base_customers = User.objects.filter(
             is_superuser=False, is_staff=False, role='customer'
-        ).order_by('-date_joined')
+        )
+        qs = base_customers
 
         # Optional search
         search = request.query_params.get('search', '').strip()
@@ -907,75 +886,64 @@ class UserManagementView(APIView):
         elif status_filter == 'ACTIVE':
             qs = qs.filter(is_blocked=False)
 
-        # Aggregate stats bases on full customer set (before search/status filters)
-        base_customers = User.objects.filter(
-            is_superuser=False, is_staff=False, role='customer'
-        )
-        total = base_customers.count()
-        active_count = base_customers.filter(is_blocked=False).count()
-        blocked_count = base_customers.filter(is_blocked=True).count()
-
-        # Pre-fetch order stats per user for efficient risk scoring
-        order_stats = {
-            row['user_id']: row
-            for row in Order.objects.values('user_id').annotate(
-                total=Count('id'),
-                cancelled=Count('id', filter=Q(status='cancelled')),
-                failed_payments=Count('id', filter=Q(payment_status='failed')),
+        # Optional risk range
+        try:
+            if request.query_params.get('min_risk'):
+                qs = qs.filter(risk_score__gte=int(request.query_params['min_risk']))
+            if request.query_params.get('max_risk'):
+                qs = qs.filter(risk_score__lte=int(request.query_params['max_risk']))
+        except ValueError:
+            return Response({'error': 'min_risk and max_risk must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+        ordering = request.query_params.get('ordering', '-joined').strip()
+        field = self.ORDERING_FIELDS.get(ordering.lstrip('-'))
+        if field is None:
+            return Response(
+                {'error': f"ordering must be one of: {', '.join(self.ORDERING_FIELDS)} (prefix '-' for descending)"},
+                status=status.HTTP_400_BAD_REQUEST
             )
-        }
-        # Pre-fetch return counts per user
-        return_counts = {
-            row['user_id']: row['returns']
-            for row in OrderReturn.objects.values('user_id').annotate(returns=Count('id'))
-        }
-
-        users = []
-        for u in qs:
-            stats = order_stats.get(u.id, {})
-            total_orders = stats.get('total', 0)
-            cancelled = stats.get('cancelled', 0)
-            failed_pay = stats.get('failed_payments', 0)
-            returns = return_counts.get(u.id, 0)
-
-            # ── Risk score ────────────────────────────────────────────────
-            # 1. Cancellation rate → 0-40 pts
-            cancel_rate = (cancelled / total_orders) if total_orders else 0
-            cancel_score = round(cancel_rate * 40)
-
-            # 2. Return rate → 0-30 pts
-            return_rate = (returns / total_orders) if total_orders else 0
-            return_score = round(return_rate * 30)
-
-            # 3. Failed payments → 0-30 pts (10 pts each, capped at 30)
-            payment_score = min(failed_pay * 10, 30)
-
-            risk_score = min(cancel_score + return_score + payment_score, 100)
-            # ─────────────────────────────────────────────────────────────
-
-            users.append({
-                'id': u.id,
-                'name': u.username or u.email.split('@')[0],
-                'email': u.email,
-                'role': u.role,
-                'status': 'BLOCKED' if u.is_blocked else 'ACTIVE',
-                'blocked_reason': u.blocked_reason or '',
-                'joinDate': u.date_joined.strftime('%Y-%m-%d'),
-                'is_active': u.is_active,
-                # Order activity
-                'total_orders': total_orders,
-                'cancelled_orders': cancelled,
-                'return_requests': returns,
-                'failed_payments': failed_pay,
-                # Risk
-                'riskScore': risk_score,
-            })
+        direction = '-' if ordering.startswith('-') else ''
+        qs = qs.order_by(f'{direction}{field}', f'{direction}id').only(
+            'id', 'username', 'email', 'role', 'is_blocked', 'blocked_reason', 'date_joined', 'is_active',
+            'order_count', 'cancelled_order_count', 'failed_payment_count', 'return_request_count', 'risk_score',
+        )
+
+        # Aggregate stats based on full customer set (before search/status filters)
+        stats = base_customers.aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(is_blocked=False)),
+            blocked=Count('id', filter=Q(is_blocked=True)),
+        )
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(qs, request, view=self)
+
+        users = [{
+            'id': u.id,
+            'name': u.username or u.email.split('@')[0],
+            'email': u.email,
+            'role': u.role,
+            'status': 'BLOCKED' if u.is_blocked else 'ACTIVE',
+            'blocked_reason': u.blocked_reason or '',
+            'joinDate': u.date_joined.strftime('%Y-%m-%d'),
+            'is_active': u.is_active,
+            # Order activity
+            'total_orders': u.order_count,
+            'cancelled_orders': u.cancelled_order_count,
+            'return_requests': u.return_request_count,
+            'failed_payments': u.failed_payment_count,
+            # Risk
+            'riskScore': u.risk_score,
+        } for u in page]
 
         return Response({
             'users': users,
-            'total': total,
-            'active': active_count,
-            'blocked': blocked_count,
+            'count': paginator.page.paginator.count,
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+            'total': stats['total'],
+            'active': stats['active'],
+            'blocked': stats['blocked'],
         })
 
 
@@ -1101,13 +1069,58 @@ class UnassignedOrdersView(APIView):
         return Response({'orders': orders, 'count': len(orders)})
 
 
+class BatchAssignmentView(APIView):
+    """
+    POST /superAdmin/api/batch-assignment/
+    Auto-assign all unassigned orders in one run.
+    Optional body: {"max_active": 10, "limit": 500, "dry_run": false}
+    """
+    permission_classes = [IsAuthenticated, IsStaffOrSuperuser]
+
+    def post(self, request):
+        from deliveryAgent.services import batch_assign_orders
+
+        try:
+            max_active = request.data.get('max_active')
+            limit = request.data.get('limit')
+            max_active = int(max_active) if max_active not in (None, '') else None
+            limit = int(limit) if limit not in (None, '') else None
+        except (TypeError, ValueError):
+            return Response({'error': 'max_active and limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes')
+
+        try:
+            result = batch_assign_orders(max_active=max_active, limit=limit, dry_run=dry_run)
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            return Response({'error': f"Assignment Logic Error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        return Response({
+            'message': f"{'Planned' if dry_run else 'Assigned'} {len(result['assigned'])} orders.",
+            'dry_run': dry_run,
+            'assigned_count': len(result['assigned']),
+            'assigned': [{'order_id': order_id, 'agent_id': agent_id} for order_id, agent_id in result['assigned']],
+            'unassigned_count': len(result['unassigned']),
+            'unassigned': result['unassigned'],
+        })
+
+
+class AdminOrderPagination(OptionalCursorPagination):
+    cursor_ordering = '-created_at'
+
+
+class AdminAssignmentPagination(OptionalCursorPagination):
+    cursor_ordering = '-assigned_at'
+
+
 class AdminOrderViewSet(viewsets.ReadOnlyModelViewSet):
     """
     Admin-only viewset to manage all orders.
     """
     permission_classes = [IsAuthenticated, IsStaffOrSuperuser]
     queryset = Order.objects.all().select_related('user', 'delivery_address')
-    pagination_class = StandardResultsSetPagination
+    pagination_class = AdminOrderPagination
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -1137,7 +1150,7 @@ class AdminOrderTrackingViewSet(viewsets.ReadOnlyModelViewSet):
     
     queryset = DeliveryAssignment.objects.all().select_related('agent', 'agent__user', 'order', 'order__user')
     serializer_class = DeliveryAssignmentDetailSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = AdminAssignmentPagination
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -0,0 +1,238 @@
+"""
+superAdmin/exports.py
+Streaming exports of orders, ledger entries and payouts.
+
+Rows are read with values_list(...).iterator(chunk_size=EXPORT_CHUNK_SIZE),
+so no model instances or serialized lists are built and memory stays
+constant whatever the row count:
+
+    csv      streamed line by line (StreamingHttpResponse / file)
+    parquet  one row group per chunk via pyarrow.parquet.ParquetWriter
+    arrow    Arrow IPC file, one record batch per chunk
+
+Parquet and Arrow need pyarrow (optional, not in requirements.txt); they are
+written to a file - a temporary one for the HTTP endpoint - because both
+formats end with a footer. Used by ExportView
+(GET /superAdmin/api/exports/<dataset>/?format=csv|parquet|arrow), the
+"Export CSV" link of manage_ledgers and `manage.py export_records`.
+"""
+import csv
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.utils.dateparse import parse_date, parse_datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+
+class ExportError(Exception):
+    """Raised for unknown datasets/formats or when pyarrow is missing."""
+
+
+# (header, field path, column type) per dataset
+DATASETS = {
+    'orders': {
+        'model': ('user', 'Order'),
+        'columns': [
+            ('id', 'id', 'int'),
+            ('order_number', 'order_number', 'str'),
+            ('customer_email', 'user__email', 'str'),
+            ('status', 'status', 'str'),
+            ('payment_method', 'payment_method', 'str'),
+            ('payment_status', 'payment_status', 'str'),
+            ('transaction_id', 'transaction_id', 'str'),
+            ('subtotal', 'subtotal', 'decimal'),
+            ('tax_amount', 'tax_amount', 'decimal'),
+            ('shipping_cost', 'shipping_cost', 'decimal'),
+            ('total_amount', 'total_amount', 'decimal'),
+            ('created_at', 'created_at', 'datetime'),
+            ('delivered_at', 'delivered_at', 'datetime'),
+        ],
+        'filters': {'status': 'status', 'payment_status': 'payment_status'},
+    },
+    'ledger': {
+        'model': ('finance', 'LedgerEntry'),
+        'columns': [
+            ('id', 'id', 'int'),
+            ('created_at', 'created_at', 'datetime'),
+            ('vendor_id', 'vendor_id', 'int'),
+            ('shop_name', 'vendor__shop_name', 'str'),
+            ('order_number', 'order__order_number', 'str'),
+            ('entry_type', 'entry_type', 'str'),
+            ('amount', 'amount', 'decimal'),
+            ('gross_amount', 'gross_amount', 'decimal'),
+            ('commission_amount', 'commission_amount', 'decimal'),
+            ('net_amount', 'net_amount', 'decimal'),
+            ('is_settled', 'is_settled', 'bool'),
+            ('settlement_date', 'settlement_date', 'datetime'),
+            ('reference_id', 'reference_id', 'str'),
+            ('description', 'description', 'str'),
+        ],
+        # Same query parameters as manage_ledgers
+        'filters': {'vendor': 'vendor_id', 'type': 'entry_type'},
+    },
+    'payouts': {
+        'model': ('finance', 'Payout'),
+        'columns': [
+            ('id', 'id', 'int'),
+            ('vendor_id', 'vendor_id', 'int'),
+            ('shop_name', 'vendor__shop_name', 'str'),
+            ('amount', 'amount', 'decimal'),
+            ('status', 'status', 'str'),
+            ('transaction_id', 'transaction_id', 'str'),
+            ('created_at', 'created_at', 'datetime'),
+            ('processed_at', 'processed_at', 'datetime'),
+        ],
+        'filters': {'vendor': 'vendor_id', 'status': 'status'},
+    },
+}
+
+FORMATS = ('csv', 'parquet', 'arrow')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.file',
+}
+
+
+def chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+def _bound(value, end_of_day=False):
+    try:
+        # parse_* return None for a bad format but raise ValueError for e.g. month 13
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            if day is None:
+                raise ValueError
+            moment = datetime.combine(day, datetime.max.time() if end_of_day else datetime.min.time())
+    except ValueError:
+        raise ExportError(f"Invalid date '{value}'")
+    return moment
+
+
+def _filter_value(model, param, field, value):
+    """`value` converted to `field`'s type, so a bad id fails here and not mid-stream."""
+    try:
+        return model._meta.get_field(field).to_python(value)
+    except (ValidationError, TypeError, ValueError):
+        raise ExportError(f"Invalid {param} '{value}'")
+
+
+def export_queryset(dataset, params=None):
+    """
+    values_list() queryset for `dataset`, filtered by `params` (a dict or
+    QueryDict: the dataset's filters plus `since` / `until` on created_at).
+    """
+    from django.apps import apps
+
+    if dataset not in DATASETS:
+        raise ExportError(f"Unknown export '{dataset}'. Choose from: {', '.join(DATASETS)}")
+    spec = DATASETS[dataset]
+    params = params or {}
+
+    model = apps.get_model(*spec['model'])
+    queryset = model.objects.all()
+    for param, field in spec['filters'].items():
+        if params.get(param):
+            queryset = queryset.filter(**{field: _filter_value(model, param, field, params[param])})
+    if params.get('since'):
+        queryset = queryset.filter(created_at__gte=_bound(params['since']))
+    if params.get('until'):
+        queryset = queryset.filter(created_at__lte=_bound(params['until'], end_of_day=True))
+
+    # Primary key order streams straight off the index; the model's default ordering would sort the whole table
+    return queryset.order_by('id').values_list(*[field for _, field, _ in spec['columns']])
+
+
+def headers(dataset):
+    return [header for header, _, _ in DATASETS[dataset]['columns']]
+
+
+def iter_rows(dataset, params=None):
+    return export_queryset(dataset, params).iterator(chunk_size=chunk_size())
+
+
+class Echo:
+    """File-like object whose write() just returns the line, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(dataset, params=None):
+    """Yield the export as CSV lines (header first)."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(headers(dataset))
+    for row in iter_rows(dataset, params):
+        yield writer.writerow(row)
+
+
+def write_csv(dataset, fileobj, params=None):
+    count = -1
+    for count, line in enumerate(iter_csv(dataset, params)):
+        fileobj.write(line)
+    return count
+
+
+ARROW_TYPES = {
+    'int': lambda: pa.int64(),
+    'str': lambda: pa.string(),
+    'decimal': lambda: pa.decimal128(14, 2),
+    'datetime': lambda: pa.timestamp('us'),
+    'bool': lambda: pa.bool_(),
+}
+
+
+def arrow_schema(dataset):
+    return pa.schema([(header, ARROW_TYPES[kind]()) for header, _, kind in DATASETS[dataset]['columns']])
+
+
+def iter_record_batches(dataset, params=None):
+    """Yield one Arrow RecordBatch per chunk of rows."""
+    schema = arrow_schema(dataset)
+    size = chunk_size()
+    chunk = []
+    for row in iter_rows(dataset, params):
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield pa.RecordBatch.from_arrays([pa.array(col, type=f.type) for col, f in zip(zip(*chunk), schema)], schema=schema)
+            chunk = []
+    if chunk:
+        yield pa.RecordBatch.from_arrays([pa.array(col, type=f.type) for col, f in zip(zip(*chunk), schema)], schema=schema)
+
+
+def write_columnar(dataset, path_or_file, file_format, params=None):
+    """Write the export as Parquet or an Arrow IPC file. Returns the row count."""
+    if pa is None:
+        raise ExportError(f"The {file_format} export requires the pyarrow package.")
+    schema = arrow_schema(dataset)
+    if file_format == 'parquet':
+        writer = pq.ParquetWriter(path_or_file, schema, compression='snappy')
+        write = writer.write_batch
+    elif file_format == 'arrow':
+        writer = pa.ipc.new_file(path_or_file, schema)
+        write = writer.write_batch
+    else:
+        raise ExportError(f"Unknown export format '{file_format}'. Choose from: {', '.join(FORMATS)}")
+
+    count = 0
+    try:
+        for batch in iter_record_batches(dataset, params):
+            write(batch)
+            count += batch.num_rows
+    finally:
+        writer.close()
+    return count
+
+
+def export_filename(dataset, file_format):
+    return f"{dataset}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{file_format}"
@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Backfill / refresh the daily revenue rollups behind the admin reports'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Recompute the last N closed days even if they are not flagged dirty')
+        parser.add_argument('--rebuild', action='store_true', help='Recompute every day since the first order')
+        parser.add_argument('--dry-run', action='store_true', help='Only report which days would be rolled up')
+
+    def handle(self, *args, **options):
+        from superAdmin.rollups import first_activity_day, pending_days, rollup_day
+
+        today = timezone.now().date()
+        days = set(pending_days(today))
+        start = None
+        if options['rebuild']:
+            start = first_activity_day()
+        elif options['days']:
+            start = today - timedelta(days=options['days'])
+        if start is not None:
+            days.update(start + timedelta(days=n) for n in range((today - start).days))
+        days = sorted(days)
+
+        if options['dry_run']:
+            span = f" ({days[0]} .. {days[-1]})" if days else ''
+            self.stdout.write(f"Would roll up {len(days)} day(s){span}.")
+            return
+
+        for day in days:
+            rollup_day(day)
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully rolled up {len(days)} day(s) of revenue.'))
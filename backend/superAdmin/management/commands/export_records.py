@@ -0,0 +1,40 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Export orders, ledger entries or payouts as CSV, Parquet or Arrow in constant memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=['orders', 'ledger', 'payouts'])
+        parser.add_argument('--format', dest='file_format', choices=['csv', 'parquet', 'arrow'], default='csv')
+        parser.add_argument('--output', help='Output file (default: <dataset>_<timestamp>.<format>; "-" writes CSV to stdout)')
+        parser.add_argument('--since', help='Only rows created on/after this date (YYYY-MM-DD or ISO datetime)')
+        parser.add_argument('--until', help='Only rows created on/before this date')
+        parser.add_argument('--vendor', help='Vendor id (ledger, payouts)')
+        parser.add_argument('--type', help='Ledger entry type, e.g. REVENUE')
+        parser.add_argument('--status', help='Order / payout status')
+        parser.add_argument('--payment-status', dest='payment_status', help='Order payment status')
+
+    def handle(self, *args, **options):
+        from superAdmin import exports
+
+        dataset = options['dataset']
+        file_format = options['file_format']
+        params = {key: options[key] for key in ('since', 'until', 'vendor', 'type', 'status', 'payment_status') if options[key]}
+        output = options['output'] or exports.export_filename(dataset, file_format)
+
+        try:
+            if file_format == 'csv':
+                if output == '-':
+                    exports.write_csv(dataset, sys.stdout, params)
+                    return
+                with open(output, 'w', newline='', encoding='utf-8') as fileobj:
+                    count = exports.write_csv(dataset, fileobj, params)
+            else:
+                count = exports.write_columnar(dataset, output, file_format, params)
+        except exports.ExportError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully exported {count} {dataset} rows to {output}.'))
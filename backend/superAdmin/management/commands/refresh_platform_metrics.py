@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+
+class Command(BaseCommand):
+    help = 'Recompute the materialised admin dashboard metrics (once, or continuously with --loop)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep refreshing on an interval')
+        parser.add_argument('--interval', type=float, default=30.0, help='Seconds between refreshes with --loop')
+
+    def handle(self, *args, **options):
+        from superAdmin.metrics import refresh_platform_metrics
+
+        try:
+            while True:
+                row = refresh_platform_metrics()
+                if not options['loop']:
+                    break
+                close_old_connections()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            return
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully refreshed platform metrics at {row.computed_at}.'))
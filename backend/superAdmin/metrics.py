@@ -0,0 +1,126 @@
+"""
+superAdmin/metrics.py
+Materialised platform counters for the admin dashboards.
+
+compute_platform_metrics() gathers every dashboard counter with one
+conditional-aggregate query per table (vendors, products, agents, orders,
+customers, ledger, delivery commissions) and refresh_platform_metrics()
+stores the result in the single PlatformMetrics row. DashboardView and
+admin_dashboard only read that row; it is refreshed when older than
+PLATFORM_METRICS_MAX_AGE seconds, or on a schedule by
+`manage.py refresh_platform_metrics --loop`.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import PlatformMetrics
+
+
+METRICS_ROW_ID = 1
+
+
+def _count(condition=None):
+    return Count('id', filter=condition) if condition is not None else Count('id')
+
+
+def compute_platform_metrics():
+    from vendor.models import VendorProfile, Product
+    from deliveryAgent.models import DeliveryAgentProfile, DeliveryCommission
+    from user.models import Order
+    from finance.models import LedgerEntry
+
+    vendors = VendorProfile.objects.aggregate(
+        total=_count(),
+        pending=_count(Q(approval_status='pending')),
+        approved=_count(Q(approval_status='approved')),
+        rejected=_count(Q(approval_status='rejected')),
+        blocked=_count(Q(is_blocked=True)),
+        deletion_requests=_count(Q(is_deletion_requested=True)),
+    )
+    products = Product.objects.aggregate(
+        total=_count(),
+        active=_count(Q(status='active')),
+        inactive=_count(Q(status='inactive')),
+        blocked=_count(Q(is_blocked=True)),
+    )
+    agents = DeliveryAgentProfile.objects.aggregate(
+        total=_count(),
+        pending=_count(Q(approval_status='pending')),
+        approved=_count(Q(approval_status='approved')),
+        blocked=_count(Q(is_blocked=True)),
+        deletion_requests=_count(Q(is_deletion_requested=True)),
+    )
+    orders = Order.objects.aggregate(
+        total=_count(),
+        pending=_count(Q(status='pending')),
+        delivered=_count(Q(status='delivered')),
+        cancelled=_count(Q(status='cancelled')),
+        revenue=Sum('total_amount', filter=Q(payment_status='completed')),
+    )
+    customers = get_user_model().objects.filter(role='customer').aggregate(
+        total=_count(),
+        active=_count(Q(is_blocked=False)),
+        blocked=_count(Q(is_blocked=True)),
+    )
+    finance = LedgerEntry.objects.aggregate(
+        total_gross=Sum('gross_amount'),
+        total_commission=Sum('commission_amount'),
+        total_net=Sum('net_amount'),
+    )
+    delivery_paid = DeliveryCommission.objects.aggregate(total=Sum('total_commission'))['total']
+
+    revenue = orders.pop('revenue')
+    return {
+        'vendors': vendors,
+        'products': products,
+        'agents': agents,
+        'customers': customers,
+        'orders': orders,
+        'deletion_requests': vendors['deletion_requests'] + agents['deletion_requests'],
+        'total_revenue': float(revenue or 0),
+        'finance': {
+            'total_gross_sales': float(finance['total_gross'] or 0),
+            'total_platform_commission': float(finance['total_commission'] or 0),
+            'total_vendor_earnings': float(finance['total_net'] or 0),
+            'total_delivery_paid': float(delivery_paid or 0),
+        },
+    }
+
+
+def refresh_platform_metrics():
+    """Recompute and store the snapshot. Returns the PlatformMetrics row."""
+    row, _ = PlatformMetrics.objects.update_or_create(
+        pk=METRICS_ROW_ID,
+        defaults={'metrics': compute_platform_metrics(), 'computed_at': timezone.now()},
+    )
+    return row
+
+
+def get_platform_metrics(max_age=None):
+    """
+    Return the stored snapshot, refreshing it first when it is older than
+    `max_age` seconds. Only one request refreshes; concurrent readers get the
+    previous snapshot instead of queueing behind it.
+    """
+    if max_age is None:
+        max_age = getattr(settings, 'PLATFORM_METRICS_MAX_AGE', 60)
+
+    row = PlatformMetrics.objects.filter(pk=METRICS_ROW_ID).first()
+    if row is None:
+        return refresh_platform_metrics()
+    if row.computed_at and row.computed_at >= timezone.now() - timedelta(seconds=max_age):
+        return row
+
+    with transaction.atomic():
+        locked = PlatformMetrics.objects.select_for_update(skip_locked=True).filter(pk=METRICS_ROW_ID).first()
+        if locked is None:
+            return row
+        locked.metrics = compute_platform_metrics()
+        locked.computed_at = timezone.now()
+        locked.save(update_fields=['metrics', 'computed_at'])
+        return locked
@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('superAdmin', '0003_alter_contactquery_id_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformMetrics',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metrics', models.JSONField(default=dict)),
+                ('computed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Platform metrics',
+            },
+        ),
+    ]
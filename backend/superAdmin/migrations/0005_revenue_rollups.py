@@ -0,0 +1,66 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('superAdmin', '0004_platformmetrics'),
+        ('vendor', '0005_product_rating_total'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyProductRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('product_name', models.CharField(max_length=255)),
+                ('category', models.CharField(blank=True, max_length=50)),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('order_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='superAdmin__day_1a2561_idx'), models.Index(fields=['category', 'day'], name='superAdmin__categor_8af407_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyRevenueRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('orders', models.IntegerField(default=0)),
+                ('completed_orders', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('status_counts', models.JSONField(default=dict)),
+                ('payment_status_counts', models.JSONField(default=dict)),
+                ('ledger_gross', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('ledger_commission', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('ledger_net', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('new_customers', models.IntegerField(default=0)),
+                ('is_dirty', models.BooleanField(default=False)),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['day'],
+                'indexes': [models.Index(fields=['is_dirty'], name='superAdmin__is_dirt_6e7a43_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyVendorRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('gross', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('commission', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('net', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('order_count', models.IntegerField(default=0)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='vendor.vendorprofile')),
+            ],
+            options={
+                'unique_together': {('day', 'vendor')},
+            },
+        ),
+    ]
@@ -76,3 +76,78 @@ class ContactQuery(models.Model):
 
     def __str__(self):
         return f"{self.name} - {self.subject}"
+
+
+class PlatformMetrics(models.Model):
+    """Single-row snapshot of the admin dashboard counters (see superAdmin/metrics.py)"""
+    metrics = models.JSONField(default=dict)
+    computed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'Platform metrics'
+
+    def __str__(self):
+        return f"Platform metrics @ {self.computed_at}"
+
+
+class DailyRevenueRollup(models.Model):
+    """
+    Per-day order, revenue and ledger facts for ReportsView (see superAdmin/rollups.py).
+    A row exists for every closed day; is_dirty marks days changed since they were rolled up.
+    """
+    day = models.DateField(unique=True)
+    orders = models.IntegerField(default=0)
+    completed_orders = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    status_counts = models.JSONField(default=dict)
+    payment_status_counts = models.JSONField(default=dict)
+    ledger_gross = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    ledger_commission = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    ledger_net = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    new_customers = models.IntegerField(default=0)
+    is_dirty = models.BooleanField(default=False)
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['day']
+        indexes = [
+            models.Index(fields=['is_dirty']),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.revenue}"
+
+
+class DailyVendorRollup(models.Model):
+    """Per-day, per-vendor REVENUE ledger totals"""
+    day = models.DateField()
+    vendor = models.ForeignKey(VendorProfile, on_delete=models.CASCADE, related_name='daily_rollups')
+    gross = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    commission = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    net = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    order_count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['day', 'vendor']
+
+    def __str__(self):
+        return f"{self.day} - {self.vendor.shop_name} - {self.net}"
+
+
+class DailyProductRollup(models.Model):
+    """Per-day sales of each product name, with its category"""
+    day = models.DateField()
+    product_name = models.CharField(max_length=255)
+    category = models.CharField(max_length=50, blank=True)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    order_count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['day']),
+            models.Index(fields=['category', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.product_name} x {self.quantity}"
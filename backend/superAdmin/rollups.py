@@ -0,0 +1,389 @@
+"""
+superAdmin/rollups.py
+Daily revenue rollups backing ReportsView.
+
+Every closed day (before today) is summarised once into DailyRevenueRollup
+(order counts, completed revenue, status breakdowns, ledger totals, new
+customers), DailyVendorRollup (REVENUE ledger totals per vendor) and
+DailyProductRollup (units / revenue per product name and category).
+ReportsView sums those rows and adds the current partial day computed live
+from the raw tables, so its cost no longer grows with order history.
+
+Rollups are kept current incrementally: superAdmin/signals.py flags the
+day of any Order, OrderItem, LedgerEntry or customer change (cancellations,
+refunds, late payments) as dirty - bulk queryset.update() paths call
+mark_days_dirty() themselves - and refresh_rollups() recomputes only the
+dirty days plus the days closed since the last run.
+
+`manage.py build_revenue_rollups` (run by the render.yaml build step) does
+the backfill. ReportsView only refreshes REVENUE_ROLLUP_DAYS_PER_REQUEST of
+the oldest pending days per request and serves the remaining ones live
+from the raw tables, a few grouped queries per run of consecutive days, so
+a fresh deployment or a long gap never makes one request roll up the whole
+history.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyRevenueRollup, DailyVendorRollup, DailyProductRollup
+
+
+def day_range(day):
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+def _decimal(value):
+    return value if value is not None else Decimal('0.00')
+
+
+def _empty_summary():
+    return {
+        'orders': 0,
+        'completed_orders': 0,
+        'revenue': Decimal('0.00'),
+        'status_counts': {},
+        'payment_status_counts': {},
+        'ledger_gross': Decimal('0.00'),
+        'ledger_commission': Decimal('0.00'),
+        'ledger_net': Decimal('0.00'),
+        'new_customers': 0,
+    }
+
+
+def range_facts(first_day, last_day):
+    """
+    Compute the rollup facts of the days first_day..last_day (inclusive) from
+    the raw tables: a summary per day, plus vendor and product totals over
+    the whole range. The query count does not depend on the number of days.
+    """
+    from user.models import Order, OrderItem
+    from finance.models import LedgerEntry
+
+    start, _ = day_range(first_day)
+    _, end = day_range(last_day)
+    summaries = {
+        first_day + timedelta(days=n): _empty_summary()
+        for n in range((last_day - first_day).days + 1)
+    }
+
+    orders = (
+        Order.objects.filter(created_at__gte=start, created_at__lt=end)
+        .annotate(day=TruncDate('created_at'))
+        .order_by()
+        .values_list('day', 'status', 'payment_status')
+        .annotate(count=Count('id'), revenue=Sum('total_amount'))
+    )
+    for day, status, payment_status, count, revenue in orders:
+        summary = summaries[day]
+        summary['orders'] += count
+        summary['status_counts'][status] = summary['status_counts'].get(status, 0) + count
+        summary['payment_status_counts'][payment_status] = summary['payment_status_counts'].get(payment_status, 0) + count
+        if payment_status == 'completed':
+            summary['completed_orders'] += count
+            summary['revenue'] += _decimal(revenue)
+
+    ledger = LedgerEntry.objects.filter(created_at__gte=start, created_at__lt=end)
+    ledger_days = (
+        ledger.annotate(day=TruncDate('created_at'))
+        .order_by()
+        .values_list('day')
+        .annotate(gross=Sum('gross_amount'), commission=Sum('commission_amount'), net=Sum('net_amount'))
+    )
+    for day, gross, commission, net in ledger_days:
+        summary = summaries[day]
+        summary['ledger_gross'] = _decimal(gross)
+        summary['ledger_commission'] = _decimal(commission)
+        summary['ledger_net'] = _decimal(net)
+
+    customer_days = (
+        get_user_model().objects.filter(role='customer', date_joined__gte=start, date_joined__lt=end)
+        .annotate(day=TruncDate('date_joined'))
+        .order_by()
+        .values_list('day')
+        .annotate(count=Count('id'))
+    )
+    for day, count in customer_days:
+        summaries[day]['new_customers'] = count
+
+    vendors = list(
+        ledger.filter(entry_type='REVENUE')
+        .order_by()
+        .values('vendor_id', 'vendor__shop_name')
+        .annotate(
+            gross=Sum('gross_amount'),
+            commission=Sum('commission_amount'),
+            net=Sum('net_amount'),
+            order_count=Count('order', distinct=True),
+        )
+    )
+
+    products = list(
+        OrderItem.objects.filter(order__created_at__gte=start, order__created_at__lt=end)
+        .order_by()
+        .values('product_name', 'product__category')
+        .annotate(
+            quantity=Sum('quantity'),
+            revenue=Sum('subtotal'),
+            order_count=Count('order', distinct=True),
+        )
+    )
+
+    return {'days': summaries, 'vendors': vendors, 'products': products}
+
+
+def day_facts(day):
+    """Compute the rollup facts of one day from the raw tables."""
+    facts = range_facts(day, day)
+    return {'summary': facts['days'][day], 'vendors': facts['vendors'], 'products': facts['products']}
+
+
+def rollup_day(day):
+    """(Re)write the rollup rows of one closed day."""
+    with transaction.atomic():
+        DailyRevenueRollup.objects.get_or_create(day=day)
+        # Lock first: a change committed while we compute re-flags the day once we are done
+        row = DailyRevenueRollup.objects.select_for_update().get(day=day)
+        facts = day_facts(day)
+
+        for field, value in facts['summary'].items():
+            setattr(row, field, value)
+        row.is_dirty = False
+        row.computed_at = timezone.now()
+        row.save()
+
+        DailyVendorRollup.objects.filter(day=day).delete()
+        DailyVendorRollup.objects.bulk_create([
+            DailyVendorRollup(
+                day=day,
+                vendor_id=v['vendor_id'],
+                gross=_decimal(v['gross']),
+                commission=_decimal(v['commission']),
+                net=_decimal(v['net']),
+                order_count=v['order_count'],
+            )
+            for v in facts['vendors']
+        ])
+
+        DailyProductRollup.objects.filter(day=day).delete()
+        DailyProductRollup.objects.bulk_create([
+            DailyProductRollup(
+                day=day,
+                product_name=p['product_name'],
+                category=p['product__category'] or '',
+                quantity=p['quantity'] or 0,
+                revenue=_decimal(p['revenue']),
+                order_count=p['order_count'],
+            )
+            for p in facts['products']
+        ])
+    return row
+
+
+def mark_day_dirty(moment):
+    """Flag the rollup of the day containing `moment` for recomputation (the open day is computed live anyway)."""
+    if moment is None:
+        return
+    day = moment.date() if isinstance(moment, datetime) else moment
+    if day >= timezone.now().date():
+        return
+    DailyRevenueRollup.objects.filter(day=day, is_dirty=False).update(is_dirty=True)
+
+
+def mark_days_dirty(moments):
+    """mark_day_dirty() for many rows at once, for bulk updates that bypass the model signals."""
+    today = timezone.now().date()
+    days = {m.date() if isinstance(m, datetime) else m for m in moments if m is not None}
+    days = [day for day in days if day < today]
+    if days:
+        DailyRevenueRollup.objects.filter(day__in=days, is_dirty=False).update(is_dirty=True)
+
+
+def first_activity_day():
+    from user.models import Order
+    from finance.models import LedgerEntry
+
+    candidates = [
+        Order.objects.aggregate(first=Min('created_at'))['first'],
+        LedgerEntry.objects.aggregate(first=Min('created_at'))['first'],
+        get_user_model().objects.filter(role='customer').aggregate(first=Min('date_joined'))['first'],
+    ]
+    candidates = [c.date() for c in candidates if c is not None]
+    return min(candidates) if candidates else None
+
+
+def pending_days(today=None):
+    """Closed days that have no rollup yet or were changed since they were rolled up."""
+    today = today or timezone.now().date()
+    last_day = DailyRevenueRollup.objects.aggregate(last=Max('day'))['last']
+    start = last_day + timedelta(days=1) if last_day else first_activity_day()
+
+    days = list(DailyRevenueRollup.objects.filter(is_dirty=True, day__lt=today).values_list('day', flat=True))
+    if start is not None:
+        days.extend(start + timedelta(days=n) for n in range((today - start).days))
+    return sorted(set(days))
+
+
+def refresh_rollups(today=None, limit=None):
+    """
+    Roll up the pending days, oldest first, at most `limit` of them (all when
+    None). Oldest first keeps the rolled-up history contiguous, which
+    pending_days() relies on. Returns the days still pending afterwards.
+    """
+    days = pending_days(today)
+    todo = days if limit is None else days[:limit]
+    for day in todo:
+        rollup_day(day)
+    if len(todo) > 31:
+        print(f"DEBUG: Rolled up {len(todo)} days of revenue history")
+    return days[len(todo):]
+
+
+def _day_runs(days):
+    """Group sorted days into (first, last) runs of consecutive days."""
+    runs = []
+    for day in days:
+        if runs and day == runs[-1][1] + timedelta(days=1):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return runs
+
+
+def _status_breakdown(counts, key):
+    return [
+        {key: status, 'count': count}
+        for status, count in sorted(counts.items(), key=lambda item: -item[1])
+        if count
+    ]
+
+
+def revenue_report(today=None):
+    """
+    The order, revenue, finance, top vendor/product and user growth parts of
+    the ReportsView payload, from rollups plus the live partial day (and any
+    closed day not rolled up yet).
+    """
+    today = today or timezone.now().date()
+    seven_days_ago = today - timedelta(days=7)
+    thirty_days_ago = today - timedelta(days=30)
+
+    # Days not rolled up within this request's budget are computed live along with today
+    unbuilt = refresh_rollups(today, limit=getattr(settings, 'REVENUE_ROLLUP_DAYS_PER_REQUEST', 7))
+    live = {'days': {}, 'vendors': [], 'products': []}
+    for first_day, last_day in _day_runs(unbuilt + [today]):
+        facts = range_facts(first_day, last_day)
+        live['days'].update(facts['days'])
+        live['vendors'] += facts['vendors']
+        live['products'] += facts['products']
+    live_today = live['days'][today]
+
+    rolled = list(DailyRevenueRollup.objects.filter(day__lt=today).values(
+        'day', 'orders', 'completed_orders', 'revenue', 'status_counts', 'payment_status_counts',
+        'ledger_gross', 'ledger_commission', 'ledger_net', 'new_customers',
+    ))
+    # Dirty rows left for a later request are replaced by their live facts
+    days = [d for d in rolled if d['day'] not in live['days']]
+    stale_days = [d['day'] for d in rolled if d['day'] in live['days']]
+    days.extend(dict(summary, day=day) for day, summary in live['days'].items())
+    days.sort(key=lambda d: d['day'])
+
+    totals = defaultdict(Decimal)
+    status_counts = defaultdict(int)
+    payment_status_counts = defaultdict(int)
+    daily_revenue = []
+    user_growth = []
+    for d in days:
+        for field in ('orders', 'completed_orders', 'revenue', 'ledger_gross', 'ledger_commission', 'ledger_net'):
+            totals[field] += d[field]
+        if d['day'] >= seven_days_ago:
+            totals['orders_week'] += d['orders']
+            totals['revenue_week'] += d['revenue']
+            totals['new_users_week'] += d['new_customers']
+        if d['day'] >= thirty_days_ago:
+            totals['orders_month'] += d['orders']
+            totals['revenue_month'] += d['revenue']
+            if d['completed_orders']:
+                daily_revenue.append({'day': d['day'].strftime('%d %b'), 'revenue': float(d['revenue']), 'orders': d['completed_orders']})
+            if d['new_customers']:
+                user_growth.append({'day': d['day'].strftime('%d %b'), 'count': d['new_customers']})
+        for status, count in d['status_counts'].items():
+            status_counts[status] += count
+        for status, count in d['payment_status_counts'].items():
+            payment_status_counts[status] += count
+
+    # ── Top Vendors ───────────────────────────
+    vendors = {}
+    rolled_vendors = (
+        DailyVendorRollup.objects.filter(day__lt=today)
+        .exclude(day__in=stale_days)
+        .values('vendor__shop_name')
+        .annotate(gross=Sum('gross'), commission=Sum('commission'), net=Sum('net'), order_count=Sum('order_count'))
+    )
+    for v in list(rolled_vendors) + live['vendors']:
+        entry = vendors.setdefault(v['vendor__shop_name'], {
+            'vendor__shop_name': v['vendor__shop_name'],
+            'total_gross': 0.0, 'total_commission': 0.0, 'total_net': 0.0, 'order_count': 0,
+        })
+        entry['total_gross'] += float(v['gross'] or 0)
+        entry['total_commission'] += float(v['commission'] or 0)
+        entry['total_net'] += float(v['net'] or 0)
+        entry['order_count'] += v['order_count']
+    top_vendors = sorted(vendors.values(), key=lambda v: -v['total_net'])[:10]
+
+    # ── Top Products ──────────────────────────
+    products = {}
+    rolled_products = (
+        DailyProductRollup.objects.filter(day__lt=today)
+        .exclude(day__in=stale_days)
+        .values('product_name')
+        .annotate(quantity=Sum('quantity'), revenue=Sum('revenue'), order_count=Sum('order_count'))
+    )
+    for p in list(rolled_products) + live['products']:
+        entry = products.setdefault(p['product_name'], {
+            'product_name': p['product_name'], 'total_qty': 0, 'total_revenue': 0.0, 'order_count': 0,
+        })
+        entry['total_qty'] += p['quantity'] or 0
+        entry['total_revenue'] += float(p['revenue'] or 0)
+        entry['order_count'] += p['order_count']
+    top_products = sorted(products.values(), key=lambda p: -p['total_qty'])[:10]
+
+    completed_orders = totals['completed_orders']
+    return {
+        # Orders
+        'total_orders': int(totals['orders']),
+        'orders_today': live_today['orders'],
+        'orders_this_week': int(totals['orders_week']),
+        'orders_this_month': int(totals['orders_month']),
+        'order_status_breakdown': _status_breakdown(status_counts, 'status'),
+        'payment_status_breakdown': _status_breakdown(payment_status_counts, 'payment_status'),
+
+        # Revenue
+        'total_revenue': float(totals['revenue']),
+        'avg_order_value': float(totals['revenue'] / completed_orders) if completed_orders else 0.0,
+        'revenue_today': float(live_today['revenue']),
+        'revenue_week': float(totals['revenue_week']),
+        'revenue_month': float(totals['revenue_month']),
+        'daily_revenue': daily_revenue,
+
+        # Finance
+        'total_gross': float(totals['ledger_gross']),
+        'total_platform_commission': float(totals['ledger_commission']),
+        'total_net': float(totals['ledger_net']),
+
+        'top_vendors': top_vendors,
+        'top_products': top_products,
+
+        # User Growth
+        'new_users_today': live_today['new_customers'],
+        'new_users_week': int(totals['new_users_week']),
+        'user_growth': user_growth,
+    }
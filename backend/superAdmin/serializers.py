@@ -136,7 +136,7 @@ class AdminProductDetailSerializer(serializers.ModelSerializer):
 
     def get_image(self, obj):
         request = self.context.get('request')
-        first_image = obj.images.first()
+        first_image = next(iter(obj.images.all()), None)
         if first_image:
             path = reverse('serve_product_image', kwargs={'image_id': first_image.id})
             if request:
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from user.models import Order, OrderItem
+from finance.models import LedgerEntry
+from .rollups import mark_day_dirty
+
+
+# Fields whose changes alter the rolled-up facts; saves limited to other fields are ignored
+ORDER_ROLLUP_FIELDS = {'status', 'payment_status', 'total_amount', 'created_at'}
+ORDER_ITEM_ROLLUP_FIELDS = {'order', 'product', 'product_name', 'quantity', 'subtotal'}
+
+
+def touches(update_fields, fields):
+    return update_fields is None or bool(fields.intersection(update_fields))
+
+
+@receiver(post_save, sender=Order)
+def flag_order_day(sender, instance, update_fields=None, **kwargs):
+    # Cancellations, refunds and late payment confirmations change a closed day's revenue
+    if touches(update_fields, ORDER_ROLLUP_FIELDS):
+        mark_day_dirty(instance.created_at)
+
+
+@receiver(post_delete, sender=Order)
+def flag_deleted_order_day(sender, instance, **kwargs):
+    mark_day_dirty(instance.created_at)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def flag_order_item_day(sender, instance, update_fields=None, **kwargs):
+    if not touches(update_fields, ORDER_ITEM_ROLLUP_FIELDS):
+        return
+    try:
+        mark_day_dirty(instance.order.created_at)
+    except Order.DoesNotExist:
+        pass  # Cascade delete of the order, which flags the day itself
+
+
+@receiver(post_save, sender=LedgerEntry)
+@receiver(post_delete, sender=LedgerEntry)
+def flag_ledger_day(sender, instance, **kwargs):
+    mark_day_dirty(instance.created_at)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def flag_customer_day(sender, instance, update_fields=None, **kwargs):
+    # last_login updates on every sign-in and never affects the rollups
+    if touches(update_fields, {'role', 'date_joined'}):
+        mark_day_dirty(instance.date_joined)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def flag_deleted_customer_day(sender, instance, **kwargs):
+    if instance.role == 'customer':
+        mark_day_dirty(instance.date_joined)
@@ -33,6 +33,7 @@ urlpatterns = [
 
     # Financial Management
     path('ledgers/', views.manage_ledgers, name='manage_ledgers'),
+    path('ledgers/export/', views.export_ledgers, name='export_ledgers'),
 
     # Reports
     path('reports/', views.admin_reports, name='admin_reports'),
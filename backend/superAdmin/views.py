@@ -9,6 +9,8 @@ from django.core.mail import send_mail
 from django.conf import settings
 from django.utils import timezone
 from vendor.models import VendorProfile, Product
+from vendor.catalog_cache import invalidate_catalog_cache
+from ShopSphere.pagination import cached_count, keyset_paginate
 from .models import VendorApprovalLog, ProductApprovalLog, DeliveryAgentApprovalLog
 from deliveryAgent.models import DeliveryAgentProfile
 from finance.models import LedgerEntry
@@ -69,52 +71,30 @@ def admin_logout_view(request):
 
 @admin_required
 def admin_dashboard(request):    
-    total_vendors = VendorProfile.objects.count()
-    pending_vendors = VendorProfile.objects.filter(approval_status='pending').count()
-    approved_vendors = VendorProfile.objects.filter(approval_status='approved').count()
-    rejected_vendors = VendorProfile.objects.filter(approval_status='rejected').count()
-    blocked_vendors = VendorProfile.objects.filter(is_blocked=True).count()
-    
-    total_products = Product.objects.count()
-    blocked_products = Product.objects.filter(is_blocked=True).count()
+    from .metrics import get_platform_metrics
 
-    total_agents = DeliveryAgentProfile.objects.count()
-    pending_agents = DeliveryAgentProfile.objects.filter(approval_status='pending').count()
-    approved_agents = DeliveryAgentProfile.objects.filter(approval_status='approved').count()
-    blocked_agents = DeliveryAgentProfile.objects.filter(is_blocked=True).count()
-
-    # Financial Metrics
-    from django.db.models import Sum
-    from deliveryAgent.models import DeliveryCommission
-    
-    finance_stats = LedgerEntry.objects.aggregate(
-        total_gross=Sum('gross_amount'),
-        total_comm=Sum('commission_amount'),
-        total_net=Sum('net_amount')
-    )
-    
-    total_delivery_paid = DeliveryCommission.objects.aggregate(
-        total=Sum('total_commission')
-    )['total'] or 0
+    snapshot = get_platform_metrics()
+    metrics = snapshot.metrics
 
     context = {
-        'total_vendors': total_vendors,
-        'pending_vendors': pending_vendors,
-        'approved_vendors': approved_vendors,
-        'rejected_vendors': rejected_vendors,
-        'blocked_vendors': blocked_vendors,
-        'total_products': total_products,
-        'blocked_products': blocked_products,
-        'total_agents': total_agents,
-        'pending_agents': pending_agents,
-        'approved_agents': approved_agents,
-        'blocked_agents': blocked_agents,
+        'total_vendors': metrics['vendors']['total'],
+        'pending_vendors': metrics['vendors']['pending'],
+        'approved_vendors': metrics['vendors']['approved'],
+        'rejected_vendors': metrics['vendors']['rejected'],
+        'blocked_vendors': metrics['vendors']['blocked'],
+        'total_products': metrics['products']['total'],
+        'blocked_products': metrics['products']['blocked'],
+        'total_agents': metrics['agents']['total'],
+        'pending_agents': metrics['agents']['pending'],
+        'approved_agents': metrics['agents']['approved'],
+        'blocked_agents': metrics['agents']['blocked'],
         
         # New Financial Metrics
-        'total_platform_commission': finance_stats['total_comm'] or 0,
-        'total_vendor_earnings': finance_stats['total_net'] or 0,
-        'total_gross_sales': finance_stats['total_gross'] or 0,
-        'total_delivery_paid': total_delivery_paid,
+        'total_platform_commission': metrics['finance']['total_platform_commission'],
+        'total_vendor_earnings': metrics['finance']['total_vendor_earnings'],
+        'total_gross_sales': metrics['finance']['total_gross_sales'],
+        'total_delivery_paid': metrics['finance']['total_delivery_paid'],
+        'metrics_computed_at': snapshot.computed_at,
     }
 
     return render(request, 'mainApp/admin_dashboard.html', context)
@@ -301,6 +281,7 @@ def block_vendor(request, vendor_id):
             pass
 
         vendor.products.update(is_blocked=True, blocked_reason=f"Vendor blocked: {reason}")
+        invalidate_catalog_cache()
 
         return redirect('vendor_detail', vendor_id=vendor.id)
 
@@ -457,6 +438,8 @@ def unblock_product(request, product_id):
         'product': product
     })
 
+LEDGER_PAGE_SIZE = 100
+
 @admin_required
 def manage_ledgers(request):
     vendor_id = request.GET.get('vendor')
@@ -469,8 +452,6 @@ def manage_ledgers(request):
     if entry_type:
         ledgers = ledgers.filter(entry_type=entry_type)
         
-    ledgers = ledgers.order_by('-created_at')
-    
     # Aggregates
     totals = ledgers.aggregate(
         gross=Sum('gross_amount'),
@@ -478,10 +459,17 @@ def manage_ledgers(request):
         net=Sum('net_amount')
     )
     
+    # Keyset pagination: newest first, LEDGER_PAGE_SIZE rows per page
+    cursor = request.GET.get('cursor')
+    page, next_cursor = keyset_paginate(ledgers, cursor, LEDGER_PAGE_SIZE, 'created_at')
+    
     vendors = VendorProfile.objects.filter(approval_status='approved')
     
     context = {
-        'ledgers': ledgers,
+        'ledgers': page,
+        'total_entries': cached_count(ledgers),
+        'next_cursor': next_cursor,
+        'is_first_page': not cursor,
         'vendors': vendors,
         'total_gross': totals['gross'] or 0,
         'total_comm': totals['comm'] or 0,
@@ -492,6 +480,22 @@ def manage_ledgers(request):
     
     return render(request, 'mainApp/manage_ledgers.html', context)
 
+@admin_required
+def export_ledgers(request):
+    """Stream the ledger entries matching the manage_ledgers filters as CSV."""
+    from django.http import HttpResponseBadRequest, StreamingHttpResponse
+    from .exports import ExportError, export_queryset, iter_csv, export_filename
+
+    try:
+        # Validates the filters before the response starts
+        export_queryset('ledger', request.GET)
+    except ExportError as e:
+        return HttpResponseBadRequest(str(e))
+
+    response = StreamingHttpResponse(iter_csv('ledger', request.GET), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{export_filename("ledger", "csv")}"'
+    return response
+
 @admin_required
 def manage_delivery_requests(request):
     status_filter = request.GET.get('status', 'pending')
@@ -857,10 +861,12 @@ def manage_tracking(request):
 
 @admin_required
 def tracking_detail(request, assignment_id):
-    from deliveryAgent.models import DeliveryAssignment, DeliveryTracking
+    from deliveryAgent.models import DeliveryAssignment
+    from deliveryAgent.tracking import tracking_entries
     
     assignment = get_object_or_404(DeliveryAssignment.objects.select_related('agent', 'agent__user', 'order', 'order__user'), id=assignment_id)
-    tracking_history = DeliveryTracking.objects.filter(delivery_assignment=assignment).order_by('-tracked_at')
+    # Includes the breadcrumbs folded into the polyline by compact_delivery_tracking
+    tracking_history = tracking_entries(assignment)
     
     context = {
         'assignment': assignment,
@@ -1,9 +1,10 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import AuthUser, Cart, CartItem, Order, OrderItem
+from .models import AuthUser, Cart, CartItem, Order, OrderItem, OutboundEmail
 
 admin.site.register(AuthUser, UserAdmin)
 admin.site.register(Cart)
 admin.site.register(CartItem)
 admin.site.register(Order)
-admin.site.register(OrderItem)
\ No newline at end of file
+admin.site.register(OrderItem)
+admin.site.register(OutboundEmail)
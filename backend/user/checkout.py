@@ -0,0 +1,99 @@
+"""
+user/checkout.py
+Checkout engine: turns checkout lines into OrderItems and decrements stock.
+
+All products of an order are locked with one SELECT ... FOR UPDATE in id
+order (a fixed lock order, so concurrent checkouts cannot deadlock), stock
+is validated in memory, items are written with a single bulk_create, and
+stock is decremented by a single conditional UPDATE that only matches rows
+still holding enough quantity. If that UPDATE touches fewer rows than
+expected the whole transaction is rolled back, so inventory can never be
+oversold. Must be called inside transaction.atomic().
+"""
+from collections import OrderedDict
+
+from django.db import transaction
+from django.db.models import Case, F, Q, When
+
+from vendor.models import Product
+from .models import OrderItem
+
+
+class OutOfStockError(Exception):
+    """Raised when a checkout line asks for more units than are in stock."""
+
+
+def lock_products(product_ids):
+    """Lock and return {id: Product} for the given ids, locking rows in id order."""
+    products = (
+        Product.objects.select_for_update(of=('self',))
+        .select_related('vendor')
+        .filter(id__in=product_ids)
+        .order_by('id')
+    )
+    return {p.id: p for p in products}
+
+
+def decrement_stock(quantities):
+    """
+    Subtract {product_id: quantity} from stock in one statement.
+    Raises OutOfStockError (and leaves stock untouched) if any product would go negative.
+    """
+    if not quantities:
+        return
+    enough_stock = Q()
+    for product_id, quantity in quantities.items():
+        enough_stock |= Q(id=product_id, quantity__gte=quantity)
+
+    # Savepoint: a partial match is rolled back together with the raised error
+    with transaction.atomic():
+        updated = Product.objects.filter(enough_stock).update(
+            quantity=Case(
+                *[When(id=product_id, then=F('quantity') - quantity) for product_id, quantity in quantities.items()],
+                default=F('quantity')
+            )
+        )
+        if updated != len(quantities):
+            raise OutOfStockError("Insufficient stock for one or more items in your order")
+
+
+def place_order_items(order, lines):
+    """
+    Create the OrderItems for `order` and reserve their stock.
+
+    `lines` is a list of dicts with keys product_id (may be None for items
+    that are not linked to a catalog product), quantity, and optionally
+    price / name (default to the locked product's current values).
+    """
+    # Several lines may refer to the same product - validate against the combined quantity
+    quantities = OrderedDict()
+    for line in lines:
+        if line.get('product_id'):
+            quantities[line['product_id']] = quantities.get(line['product_id'], 0) + line['quantity']
+
+    products = lock_products(list(quantities))
+    for product_id, quantity in quantities.items():
+        product = products.get(product_id)
+        if product and product.quantity < quantity:
+            raise OutOfStockError(f"Insufficient stock for {product.name}")
+
+    items = []
+    for line in lines:
+        product = products.get(line.get('product_id'))
+        price = line.get('price')
+        if price is None:
+            price = product.price
+        items.append(OrderItem(
+            order=order,
+            product=product,
+            vendor=product.vendor if product else None,
+            product_name=line.get('name') or (product.name if product else ''),
+            quantity=line['quantity'],
+            product_price=price,
+            subtotal=price * line['quantity']
+        ))
+    OrderItem.objects.bulk_create(items)
+
+    # Unknown product ids were never linked to an item, so they hold no stock to decrement
+    decrement_stock({pid: qty for pid, qty in quantities.items() if pid in products})
+    return items
@@ -0,0 +1,180 @@
+"""
+user/email_outbox.py
+Persistent outbox for outgoing email.
+
+With OutboxEmailBackend installed as EMAIL_BACKEND, every send_mail() in
+the project (order confirmations, password resets, approval mails, OTPs)
+only inserts an OutboundEmail row (attachments included) and returns
+immediately - inside an atomic block the mail is even rolled back with the
+rest of the request. Only install it where the worker below runs; SMTP is
+the default.
+
+The `process_email_outbox` worker delivers queued rows in batches over one
+reused connection of EMAIL_OUTBOX_DELIVERY_BACKEND (SMTP in production, the
+locmem/console backend or a local SMTP stand-in such as aiosmtpd in
+development), retrying failures with exponential backoff. A batch is
+claimed (status 'sending', leased for CLAIM_LEASE) in a short transaction
+and sent after commit, so no row lock is held across SMTP round trips; rows
+of a worker that died mid-batch are picked up again once the lease expires.
+"""
+import base64
+from datetime import timedelta
+from email.mime.base import MIMEBase
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 6 * 60 * 60
+# How long a claimed row may stay in 'sending' before another worker retries it
+CLAIM_LEASE = timedelta(minutes=10)
+
+
+def serialize_attachments(message):
+    """(filename, content, mimetype) attachments as JSON; raw MIME parts cannot be queued."""
+    attachments = []
+    for attachment in message.attachments:
+        if isinstance(attachment, MIMEBase):
+            raise ValueError("OutboxEmailBackend cannot queue MIMEBase attachments; attach (filename, content, mimetype) instead.")
+        filename, content, mimetype = attachment
+        if isinstance(content, str):
+            content = content.encode()
+        attachments.append({
+            'filename': filename,
+            'mimetype': mimetype,
+            'content': base64.b64encode(content).decode(),
+        })
+    return attachments
+
+
+class OutboxEmailBackend(BaseEmailBackend):
+    """Email backend that queues messages in the OutboundEmail table instead of sending them."""
+
+    def send_messages(self, email_messages):
+        rows = []
+        try:
+            for message in email_messages:
+                html_body = None
+                for content, mimetype in getattr(message, 'alternatives', []):
+                    if mimetype == 'text/html':
+                        html_body = content
+                rows.append(OutboundEmail(
+                    subject=message.subject,
+                    body=message.body,
+                    html_body=html_body,
+                    from_email=message.from_email,
+                    to=list(message.to),
+                    cc=list(message.cc),
+                    bcc=list(message.bcc),
+                    reply_to=list(message.reply_to),
+                    headers=dict(message.extra_headers),
+                    attachments=serialize_attachments(message),
+                ))
+            OutboundEmail.objects.bulk_create(rows)
+        except Exception:
+            if not self.fail_silently:
+                raise
+            return 0
+        return len(rows)
+
+
+def build_message(outbound, connection=None):
+    message = EmailMultiAlternatives(
+        subject=outbound.subject,
+        body=outbound.body,
+        from_email=outbound.from_email or settings.DEFAULT_FROM_EMAIL,
+        to=outbound.to,
+        cc=outbound.cc,
+        bcc=outbound.bcc,
+        reply_to=outbound.reply_to,
+        headers=outbound.headers,
+        connection=connection,
+    )
+    if outbound.html_body:
+        message.attach_alternative(outbound.html_body, 'text/html')
+    for attachment in outbound.attachments:
+        message.attach(attachment['filename'], base64.b64decode(attachment['content']), attachment['mimetype'])
+    return message
+
+
+def backoff_delay(attempts):
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * (2 ** (attempts - 1)), BACKOFF_MAX_SECONDS))
+
+
+class OutboxWorker:
+    """Delivers due OutboundEmail rows, keeping one delivery connection open across batches."""
+
+    def __init__(self, batch_size=None, max_attempts=None):
+        self.batch_size = batch_size or getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 50)
+        self.max_attempts = max_attempts or getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 8)
+        self.connection = None
+
+    def _connection(self):
+        if self.connection is None:
+            self.connection = get_connection(settings.EMAIL_OUTBOX_DELIVERY_BACKEND, fail_silently=False)
+            self.connection.open()
+        return self.connection
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self.connection = None
+
+    def claim_batch(self):
+        """
+        Claim up to batch_size due rows: pending ones whose next attempt is due,
+        and 'sending' ones whose lease expired (their worker died mid-batch).
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            # skip_locked lets several workers drain the outbox without claiming a row twice
+            batch = list(
+                OutboundEmail.objects.select_for_update(skip_locked=True)
+                .filter(status__in=['pending', 'sending'], next_attempt_at__lte=now)
+                .order_by('next_attempt_at', 'id')[:self.batch_size]
+            )
+            for outbound in batch:
+                outbound.status = 'sending'
+                outbound.attempts += 1
+                outbound.next_attempt_at = now + CLAIM_LEASE
+            OutboundEmail.objects.bulk_update(batch, ['status', 'attempts', 'next_attempt_at'])
+        return batch
+
+    def process_batch(self):
+        """Send one batch of due messages. Returns (sent, failed) counts."""
+        sent = failed = 0
+        for outbound in self.claim_batch():
+            try:
+                self._connection().send_messages([build_message(outbound)])
+                outbound.status = 'sent'
+                outbound.sent_at = timezone.now()
+                outbound.last_error = None
+                sent += 1
+            except Exception as e:
+                print(f"DEBUG: Outbox delivery of email #{outbound.id} failed (attempt {outbound.attempts}): {e}")
+                # The connection may be broken - open a fresh one for the next message
+                self.close()
+                outbound.last_error = str(e)
+                if outbound.attempts >= self.max_attempts:
+                    outbound.status = 'failed'
+                else:
+                    outbound.status = 'pending'
+                    outbound.next_attempt_at = timezone.now() + backoff_delay(outbound.attempts)
+                failed += 1
+            # Recorded per message so a crash later in the batch cannot resend it
+            OutboundEmail.objects.filter(pk=outbound.pk).update(
+                status=outbound.status,
+                last_error=outbound.last_error,
+                next_attempt_at=outbound.next_attempt_at,
+                sent_at=outbound.sent_at,
+            )
+        return sent, failed
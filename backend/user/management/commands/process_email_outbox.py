@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbound emails (one batch, or continuously with --loop)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when the outbox is empty')
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        from user.email_outbox import OutboxWorker
+
+        worker = OutboxWorker(batch_size=options['batch_size'])
+        total_sent = total_failed = 0
+        try:
+            while True:
+                sent, failed = worker.process_batch()
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    self.stdout.write(f'Sent {sent}, failed {failed}')
+                    continue  # more may be due - keep the connection warm
+                if not options['loop']:
+                    break
+                # Idle: release the SMTP connection and DB connection while waiting
+                worker.close()
+                close_old_connections()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            worker.close()
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully delivered {total_sent} emails ({total_failed} failed attempts).'))
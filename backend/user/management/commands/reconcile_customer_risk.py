@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Recount the customer risk counters from orders and returns and re-score every user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Users scored per vectorised batch')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without fixing it')
+
+    def handle(self, *args, **options):
+        from user.models import AuthUser
+        from user.risk import RISK_FIELDS, recount_customer_risk
+
+        drifted = recount_customer_risk(batch_size=options['batch_size'])
+        if drifted and not options['dry_run']:
+            AuthUser.objects.bulk_update(drifted, RISK_FIELDS, batch_size=500)
+
+        verb = 'Found' if options['dry_run'] else 'Reconciled'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(drifted)} users with drifted risk counters.'))
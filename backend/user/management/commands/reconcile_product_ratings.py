@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
+
+
+class Command(BaseCommand):
+    help = 'Recompute Product rating aggregates (rating_total, total_reviews, average_rating) from reviews'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without fixing it')
+
+    def handle(self, *args, **options):
+        from vendor.models import Product
+        from user.models import Review
+
+        actual = {
+            row['Product']: (row['total'], row['count'])
+            for row in Review.objects.values('Product').annotate(total=Sum('rating'), count=Count('id')).order_by()
+        }
+
+        drifted = []
+        for product in Product.objects.only('id', 'rating_total', 'total_reviews', 'average_rating').iterator(chunk_size=2000):
+            total, count = actual.get(product.id, (0, 0))
+            average = round(total / count, 1) if count else 0
+            if (product.rating_total, product.total_reviews) != (total, count) or float(product.average_rating) != average:
+                product.rating_total = total
+                product.total_reviews = count
+                product.average_rating = average
+                drifted.append(product)
+
+        if drifted and not options['dry_run']:
+            Product.objects.bulk_update(drifted, ['rating_total', 'total_reviews', 'average_rating'], batch_size=500)
+            from vendor.catalog_cache import invalidate_catalog_cache
+            invalidate_catalog_cache()
+
+        verb = 'Found' if options['dry_run'] else 'Reconciled'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(drifted)} products with drifted rating aggregates.'))
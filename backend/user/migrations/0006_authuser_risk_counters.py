@@ -0,0 +1,73 @@
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_risk_counters(apps, schema_editor):
+    from user.risk import risk_scores
+
+    AuthUser = apps.get_model('user', 'AuthUser')
+    Order = apps.get_model('user', 'Order')
+    OrderReturn = apps.get_model('user', 'OrderReturn')
+
+    counters = {
+        row['user']: [row['total'], row['cancelled'], 0, row['failed']]
+        for row in Order.objects.values('user').annotate(
+            total=Count('id'),
+            cancelled=Count('id', filter=Q(status='cancelled')),
+            failed=Count('id', filter=Q(payment_status='failed')),
+        ).order_by()
+    }
+    for row in OrderReturn.objects.values('user').annotate(returns=Count('id')).order_by():
+        counters.setdefault(row['user'], [0, 0, 0, 0])[2] = row['returns']
+
+    user_ids = list(counters)
+    orders, cancelled, returns, failed = zip(*counters.values()) if counters else ([], [], [], [])
+    for user_id, total, cancel, ret, fail, score in zip(user_ids, orders, cancelled, returns, failed, risk_scores(orders, cancelled, returns, failed)):
+        AuthUser.objects.filter(pk=user_id).update(
+            order_count=total, cancelled_order_count=cancel, return_request_count=ret,
+            failed_payment_count=fail, risk_score=score,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0005_order_created_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authuser',
+            name='cancelled_order_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='authuser',
+            name='failed_payment_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='authuser',
+            name='order_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='authuser',
+            name='return_request_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='authuser',
+            name='risk_score',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='authuser',
+            index=models.Index(fields=['role', 'risk_score'], name='user_authus_role_f72ac7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='authuser',
+            index=models.Index(fields=['role', 'date_joined'], name='user_authus_role_cbe038_idx'),
+        ),
+        migrations.RunPython(backfill_risk_counters, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,9 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
 from decimal import Decimal
 from django.conf import settings
+from django.utils import timezone
 
 class AuthUser(AbstractUser):
     """Extended user model with role-based access"""
@@ -24,15 +25,53 @@ class AuthUser(AbstractUser):
     blocked_reason = models.TextField(blank=True, null=True)
     suspended_until = models.DateTimeField(blank=True, null=True)
 
+    # Denormalised risk counters, maintained by user/signals.py (see user/risk.py)
+    order_count = models.IntegerField(default=0)
+    cancelled_order_count = models.IntegerField(default=0)
+    failed_payment_count = models.IntegerField(default=0)
+    return_request_count = models.IntegerField(default=0)
+    risk_score = models.IntegerField(default=0)
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
 
     class Meta:
         ordering = ['-date_joined']
+        indexes = [
+            models.Index(fields=['role', 'risk_score']),
+            models.Index(fields=['role', 'date_joined']),
+        ]
 
     def __str__(self):
         return f"{self.email} - {self.role}"
 
+    @classmethod
+    def apply_risk_change(cls, user_id, orders=0, cancelled=0, failed_payments=0, returns=0):
+        """
+        Incrementally update the risk counters of one user and re-score it.
+        The row is locked so concurrent order events cannot lose updates.
+        """
+        from .risk import risk_scores
+
+        with transaction.atomic():
+            user = cls.objects.select_for_update().only(
+                'id', 'order_count', 'cancelled_order_count', 'failed_payment_count', 'return_request_count'
+            ).filter(pk=user_id).first()
+            if user is None:
+                return
+            order_count = max(user.order_count + orders, 0)
+            cancelled_order_count = max(user.cancelled_order_count + cancelled, 0)
+            failed_payment_count = max(user.failed_payment_count + failed_payments, 0)
+            return_request_count = max(user.return_request_count + returns, 0)
+            # update() rather than save(): no signals and no full-row write for a counter change
+            cls.objects.filter(pk=user_id).update(
+                order_count=order_count,
+                cancelled_order_count=cancelled_order_count,
+                failed_payment_count=failed_payment_count,
+                return_request_count=return_request_count,
+                risk_score=risk_scores([order_count], [cancelled_order_count], [return_request_count], [failed_payment_count])[0],
+            )
+
     def is_account_active(self):
         """Check if account is truly active (not blocked/suspended)"""
         from django.utils import timezone
@@ -186,6 +225,7 @@ class Order(models.Model):
         indexes = [
             models.Index(fields=['user', 'status']),
             models.Index(fields=['order_number']),
+            models.Index(fields=['created_at']),
         ]
 
     def __str__(self):
@@ -572,6 +612,45 @@ class Notification(models.Model):
         return f"{self.title} - {self.user.email}"
 
 
+class OutboundEmail(models.Model):
+    """Queued outgoing email, delivered by the process_email_outbox worker (user/email_outbox.py)"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    subject = models.TextField(blank=True)
+    body = models.TextField(blank=True)
+    html_body = models.TextField(blank=True, null=True)
+    from_email = models.CharField(max_length=254, blank=True, null=True)
+    to = models.JSONField(default=list)
+    cc = models.JSONField(default=list, blank=True)
+    bcc = models.JSONField(default=list, blank=True)
+    reply_to = models.JSONField(default=list, blank=True)
+    headers = models.JSONField(default=dict, blank=True)
+    # [{'filename', 'mimetype', 'content' (base64)}] or [{'mime': base64 of a MIME part}]
+    attachments = models.JSONField(default=list, blank=True)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, null=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
+
+
 # ===============================================
 #          DISPUTE/COMPLAINT MODELS
 # ===============================================
@@ -0,0 +1,106 @@
+"""
+user/risk.py
+Customer risk scoring for UserManagementView.
+
+Risk score 0-100 derived from:
+  - Cancellation rate  → up to 40 pts
+  - Return rate        → up to 30 pts
+  - Failed payments    → up to 30 pts (10 pts each)
+
+The inputs are counters stored on AuthUser (order_count,
+cancelled_order_count, failed_payment_count, return_request_count), kept
+current by user/signals.py on Order and OrderReturn events, together with
+the resulting risk_score. UserManagementView therefore filters, sorts and
+paginates customers by risk in SQL. risk_scores() scores whole columns at
+once - vectorised with numpy when it is installed - and is used both for
+single events and for the batch recount of `manage.py reconcile_customer_risk`.
+"""
+from django.db.models import Count, Q
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+CANCEL_WEIGHT = 40
+RETURN_WEIGHT = 30
+FAILED_PAYMENT_POINTS = 10
+FAILED_PAYMENT_CAP = 30
+MAX_SCORE = 100
+
+RISK_FIELDS = ['order_count', 'cancelled_order_count', 'failed_payment_count', 'return_request_count', 'risk_score']
+
+
+def risk_scores(orders, cancelled, returns, failed_payments):
+    """Risk scores for parallel sequences of per-customer counters."""
+    if np is not None:
+        orders = np.asarray(orders, dtype=float)
+        has_orders = orders > 0
+        safe_orders = np.where(has_orders, orders, 1)
+        cancel_score = np.where(has_orders, np.round(np.asarray(cancelled) / safe_orders * CANCEL_WEIGHT), 0)
+        return_score = np.where(has_orders, np.round(np.asarray(returns) / safe_orders * RETURN_WEIGHT), 0)
+        payment_score = np.minimum(np.asarray(failed_payments) * FAILED_PAYMENT_POINTS, FAILED_PAYMENT_CAP)
+        return np.minimum(cancel_score + return_score + payment_score, MAX_SCORE).astype(int).tolist()
+
+    scores = []
+    for total, cancel, ret, failed in zip(orders, cancelled, returns, failed_payments):
+        cancel_score = round(cancel / total * CANCEL_WEIGHT) if total else 0
+        return_score = round(ret / total * RETURN_WEIGHT) if total else 0
+        payment_score = min(failed * FAILED_PAYMENT_POINTS, FAILED_PAYMENT_CAP)
+        scores.append(min(cancel_score + return_score + payment_score, MAX_SCORE))
+    return scores
+
+
+def order_risk_flags(status, payment_status):
+    """(cancelled, failed_payment) contribution of one order to its customer's counters."""
+    return int(status == 'cancelled'), int(payment_status == 'failed')
+
+
+def recount_customer_risk(batch_size=2000):
+    """
+    Recount every customer's risk counters from the Order and OrderReturn
+    tables and re-score them batch by batch. Returns the users whose stored
+    values drifted (not yet saved).
+    """
+    from .models import AuthUser, Order, OrderReturn
+
+    order_stats = {
+        row['user_id']: row
+        for row in Order.objects.order_by().values('user_id').annotate(
+            total=Count('id'),
+            cancelled=Count('id', filter=Q(status='cancelled')),
+            failed_payments=Count('id', filter=Q(payment_status='failed')),
+        )
+    }
+    return_counts = dict(OrderReturn.objects.order_by().values_list('user_id').annotate(returns=Count('id')))
+
+    drifted = []
+    batch = []
+
+    def score_batch():
+        stats = [order_stats.get(user.id, {}) for user in batch]
+        counters = {
+            'order_count': [s.get('total', 0) for s in stats],
+            'cancelled_order_count': [s.get('cancelled', 0) for s in stats],
+            'failed_payment_count': [s.get('failed_payments', 0) for s in stats],
+            'return_request_count': [return_counts.get(user.id, 0) for user in batch],
+        }
+        counters['risk_score'] = risk_scores(
+            counters['order_count'], counters['cancelled_order_count'],
+            counters['return_request_count'], counters['failed_payment_count'],
+        )
+        for i, user in enumerate(batch):
+            if any(getattr(user, field) != counters[field][i] for field in RISK_FIELDS):
+                for field in RISK_FIELDS:
+                    setattr(user, field, counters[field][i])
+                drifted.append(user)
+        batch.clear()
+
+    for user in AuthUser.objects.only('id', *RISK_FIELDS).order_by('id').iterator(chunk_size=batch_size):
+        batch.append(user)
+        if len(batch) >= batch_size:
+            score_batch()
+    if batch:
+        score_batch()
+    return drifted
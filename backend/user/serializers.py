@@ -41,6 +41,7 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 from django.urls import reverse
+from vendor.image_variants import PrimaryImageVariantsMixin
 
 class ProductImageSerializer(serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
@@ -57,39 +58,31 @@ class ProductImageSerializer(serializers.ModelSerializer):
         return path
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(PrimaryImageVariantsMixin, serializers.ModelSerializer):
     images = ProductImageSerializer(many=True, read_only=True)
     vendor_name = serializers.CharField(source='vendor.shop_name', read_only=True)
     image = serializers.SerializerMethodField()
     image_urls = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
+    image_variants = serializers.SerializerMethodField()
     average_rating = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
         fields = [
             'id', 'name', 'brand', 'description', 'category', 'price', 
-            'quantity', 'images', 'image', 'image_urls', 'status', 
+            'quantity', 'images', 'image', 'image_urls', 'image_srcset', 'image_variants', 'status', 
             'is_blocked', 'created_at', 'vendor_name', 'average_rating', 'total_reviews'
         ]
 
     def get_average_rating(self, obj):
-        # Use annotated values if available to avoid N+1 queries
-        rating = getattr(obj, 'average_rating', None)
-        if rating is None:
-            rating = getattr(obj, 'avg_rating', None)
-            
-        if rating is not None:
-            return round(float(rating), 1)
-            
-        # Fallback to calculation if not annotated (rare)
-        from django.db.models import Avg
-        avg = obj.reviews.aggregate(Avg('rating'))['rating__avg']
-        return round(float(avg or 0.0), 1)
+        # Maintained incrementally by the Review signals (user/signals.py)
+        return round(float(obj.average_rating or 0.0), 1)
 
 
     def get_image(self, obj):
         request = self.context.get('request')
-        first_image = obj.images.first()
+        first_image = next(iter(obj.images.all()), None)
         if first_image:
             path = reverse('serve_product_image', kwargs={'image_id': first_image.id})
             if request:
@@ -1,23 +1,78 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from django.db import models
-from .models import Review
+from .models import AuthUser, Order, OrderReturn, Review
+from .risk import order_risk_flags
 from vendor.models import Product
+from vendor.catalog_cache import invalidate_catalog_cache
+
+
+@receiver(pre_save, sender=Review)
+def remember_previous_rating(sender, instance, **kwargs):
+    # Needed to apply the difference when an existing review is edited
+    instance._previous_rating = None
+    if instance.pk:
+        instance._previous_rating = Review.objects.filter(pk=instance.pk).values_list('rating', flat=True).first()
+
 
 @receiver(post_save, sender=Review)
+def update_product_rating(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_rating', None)
+    if created or previous is None:
+        Product.apply_rating_change(instance.Product_id, int(instance.rating), 1)
+    elif int(instance.rating) != previous:
+        Product.apply_rating_change(instance.Product_id, int(instance.rating) - previous, 0)
+    invalidate_catalog_cache()
+
+
 @receiver(post_delete, sender=Review)
-def update_product_rating(sender, instance, **kwargs):
-    product = instance.Product
-    reviews = product.reviews.all()
-
-# Calculate new average rating and total reviews
-    if reviews.exists():
-        average = reviews.aggregate(models.Avg('rating'))['rating__avg']
-        count = reviews.count()
-        product.average_rating = round(average, 1)
-        product.total_reviews = count
-    else:
-        product.average_rating = 0
-        product.total_reviews = 0
-
-    product.save()
\ No newline at end of file
+def remove_product_rating(sender, instance, **kwargs):
+    if Product.objects.filter(pk=instance.Product_id).exists():
+        Product.apply_rating_change(instance.Product_id, -int(instance.rating), -1)
+    invalidate_catalog_cache()
+
+
+# Order fields feeding the customer risk counters
+ORDER_RISK_FIELDS = {'user', 'status', 'payment_status'}
+
+
+@receiver(pre_save, sender=Order)
+def remember_previous_risk_flags(sender, instance, update_fields=None, **kwargs):
+    # Needed to apply the difference on cancellations and payment failures
+    instance._previous_risk = None
+    if instance.pk and (update_fields is None or ORDER_RISK_FIELDS.intersection(update_fields)):
+        instance._previous_risk = Order.objects.filter(pk=instance.pk).values_list('user_id', 'status', 'payment_status').first()
+
+
+@receiver(post_save, sender=Order)
+def update_customer_risk(sender, instance, created, **kwargs):
+    cancelled, failed = order_risk_flags(instance.status, instance.payment_status)
+    previous = getattr(instance, '_previous_risk', None)
+    if created or previous is None:
+        if created:
+            AuthUser.apply_risk_change(instance.user_id, orders=1, cancelled=cancelled, failed_payments=failed)
+        return
+
+    previous_user, previous_status, previous_payment_status = previous
+    previous_cancelled, previous_failed = order_risk_flags(previous_status, previous_payment_status)
+    if previous_user != instance.user_id:
+        AuthUser.apply_risk_change(previous_user, orders=-1, cancelled=-previous_cancelled, failed_payments=-previous_failed)
+        AuthUser.apply_risk_change(instance.user_id, orders=1, cancelled=cancelled, failed_payments=failed)
+    elif (cancelled, failed) != (previous_cancelled, previous_failed):
+        AuthUser.apply_risk_change(instance.user_id, cancelled=cancelled - previous_cancelled, failed_payments=failed - previous_failed)
+
+
+@receiver(post_delete, sender=Order)
+def remove_customer_risk(sender, instance, **kwargs):
+    cancelled, failed = order_risk_flags(instance.status, instance.payment_status)
+    AuthUser.apply_risk_change(instance.user_id, orders=-1, cancelled=-cancelled, failed_payments=-failed)
+
+
+@receiver(post_save, sender=OrderReturn)
+def count_return_request(sender, instance, created, **kwargs):
+    if created:
+        AuthUser.apply_risk_change(instance.user_id, returns=1)
+
+
+@receiver(post_delete, sender=OrderReturn)
+def uncount_return_request(sender, instance, **kwargs):
+    AuthUser.apply_risk_change(instance.user_id, returns=-1)
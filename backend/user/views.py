@@ -1,4 +1,5 @@
-from rest_framework.decorators import api_view, permission_classes, authentication_classes
+from rest_framework.decorators import api_view, permission_classes, authentication_classes, renderer_classes
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework import serializers
 import requests
@@ -13,15 +14,23 @@ from django.core.paginator import Paginator
 from .models import AuthUser, Cart, CartItem, Order, OrderItem, Address, Review, Payment
 from .serializers import RegisterSerializer, ProductSerializer, CartSerializer, OrderSerializer, AddressSerializer, ReviewSerializer, OrderTrackingSerializer, UserSerializer
 from .forms import AddressForm
+from .checkout import place_order_items, OutOfStockError
+import json
 import uuid
 from django.db import transaction
 from django.db.models import F, Q
-from vendor.models import Product, ProductImage
+from vendor.models import Product, ProductImage, lightweight_images_prefetch
+from vendor.search import search_products
+from vendor.hit_counter import record_search_hits
+from vendor import catalog_cache
+from ShopSphere.pagination import CachedCountPaginator, cached_count, keyset_paginate, wants_cursor
 from django.utils import timezone
 from django.core.mail import send_mail
 from django.conf import settings
 from django.core.paginator import Paginator
+from django.http import StreamingHttpResponse
 from finance.services import FinanceService
+from deliveryAgent.live_tracking import stream_token, stream_token_user_id, tracking_stream
 
 
 @api_view(['GET', 'POST'])
@@ -254,16 +263,11 @@ def update_profile(request):
 def home_api(request):
     PAGE_SIZE = 50
 
-    from django.db.models import Avg
-    # Base query with annotation to avoid N+1 queries for ratings
-    from django.db.models import Avg, Count
+    # Ratings come from the denormalised Product.average_rating / total_reviews - no review join needed
     products_qs = Product.objects.filter(
         status__in=['active', 'approved'],
         is_blocked=False
-    ).select_related('vendor').prefetch_related('images').annotate(
-        avg_rating=Avg('reviews__rating'),
-        count_reviews=Count('reviews')
-    ).order_by('-id')
+    ).select_related('vendor').prefetch_related(lightweight_images_prefetch()).order_by('-id')
 
     # Optional category filtering  (frontend may send display names like 'Home & Kitchen')
     CATEGORY_MAP = {
@@ -287,32 +291,51 @@ def home_api(request):
             # Exact product-ID lookup
             products_qs = products_qs.filter(id=int(search))
         else:
-            # Name / category / description contains
-            products_qs = products_qs.filter(
-                Q(name__icontains=search) |
-                Q(category__icontains=search) |
-                Q(description__icontains=search)
-            )
-        
-        # Increment search_count for found items (cap to prevent mass updates)
-        try:
-            products_qs.update(search_count=F('search_count') + 1)
-        except Exception:
-            pass
+            # Ranked full-text search with prefix matching (see vendor/search.py)
+            products_qs = search_products(products_qs, search)
 
     if request.accepted_renderer.format == 'json':
         # Server-side pagination: 50 per page
         page_number = int(request.GET.get('page', 1))
-        paginator = Paginator(products_qs, PAGE_SIZE)
-        page_obj = paginator.get_page(page_number)
+        # Opt-in keyset pagination for infinite scroll (relevance-ranked text search keeps page numbers)
+        use_cursor = wants_cursor(request) and not (search and not search.isdigit())
+        cursor = request.GET.get('cursor', '') if use_cursor else None
+
+        # Serialized pages are identical for every visitor - serve them from the versioned catalog cache
+        cache_key = catalog_cache.page_key(request, category, page_number, search, cursor=cursor)
+        cached = catalog_cache.get_page(cache_key)
+        if cached is not None:
+            if search:
+                record_search_hits(cached['ids'])
+            return Response(cached['payload'])
+
+        if use_cursor:
+            products, next_cursor = keyset_paginate(products_qs, cursor, PAGE_SIZE)
+            payload = {
+                'count': cached_count(products_qs),
+                'next_cursor': next_cursor,
+            }
+        else:
+            paginator = CachedCountPaginator(products_qs, PAGE_SIZE)
+            page_obj = paginator.get_page(page_number)
+            products = page_obj.object_list
+            payload = {
+                'count': paginator.count,
+                'num_pages': paginator.num_pages,
+                'current_page': page_obj.number,
+            }
+
+        serializer = ProductSerializer(products, many=True, context={'request': request})
+        product_ids = [p.id for p in products]
+        if search:
+            # Buffered search_count increment for the products actually served
+            record_search_hits(product_ids)
+        payload['results'] = serializer.data
+        catalog_cache.set_page(cache_key, payload, product_ids)
+        return Response(payload)
 
-        serializer = ProductSerializer(page_obj.object_list, many=True, context={'request': request})
-        return Response({
-            'count': paginator.count,
-            'num_pages': paginator.num_pages,
-            'current_page': page_obj.number,
-            'results': serializer.data,
-        })
+    if search:
+        record_search_hits(list(products_qs.values_list('id', flat=True)[:PAGE_SIZE]))
 
     # HTML fallback
     cart_count = 0
@@ -330,7 +353,7 @@ def home_api(request):
     })
 
 def get_product(request):
-    products_qs = Product.objects.all().select_related('vendor').prefetch_related('images')
+    products_qs = Product.objects.all().select_related('vendor').prefetch_related(lightweight_images_prefetch())
     page_number = request.GET.get('page', 1)
     paginator = Paginator(products_qs, 20)
     page_obj = paginator.get_page(page_number)
@@ -494,40 +517,18 @@ def process_payment(request):
                     completed_at=timezone.now().replace(second=0, microsecond=0)
                 )
                 
+                lines = []
                 for item_data in items_from_request:
-                    price = Decimal(str(item_data.get('price', 0)))
-                    quantity = int(item_data.get('quantity', 1))
-                    
-                    # Try to link product and vendor
-                    product = None
-                    vendor = None
                     product_id = item_data.get('id') or item_data.get('product_id')
-                    
-                    if product_id:
-                        from vendor.models import Product
-                        try:
-                            product = Product.objects.get(id=product_id)
-                            # Check stock
-                            if product.quantity < quantity:
-                                raise serializers.ValidationError(f"Insufficient stock for {product.name}")
-                            
-                            vendor = product.vendor
-                        except Product.DoesNotExist:
-                            pass
-                    
-                    OrderItem.objects.create(
-                        order=order,
-                        product=product,
-                        vendor=vendor,
-                        product_name=item_data.get('name'),
-                        quantity=quantity,
-                        product_price=price,
-                        subtotal=price * quantity
-                    )
-                    
-                    # Decrease inventory atomically
-                    if product:
-                        Product.objects.filter(pk=product.pk).update(quantity=F('quantity') - quantity)
+                    lines.append({
+                        'product_id': int(product_id) if product_id and str(product_id).isdigit() else None,
+                        'quantity': int(item_data.get('quantity', 1)),
+                        'price': Decimal(str(item_data.get('price', 0))),
+                        'name': item_data.get('name'),
+                    })
+
+                # Lock products, validate stock, bulk-create items and decrement stock in one go
+                place_order_items(order, lines)
                 
                 # Record financial entries in ledger
                 FinanceService.record_order_financials(order)
@@ -537,7 +538,7 @@ def process_payment(request):
             # CASE 2: Use items from the database cart
             else:
                 cart = Cart.objects.get(user=request.user)
-                cart_items = cart.items.all()
+                cart_items = cart.items.select_related('product')
                 if not cart_items:
                     return Response({"error": "Cart is empty"}, status=400)
 
@@ -586,23 +587,11 @@ def process_payment(request):
                     completed_at=timezone.now().replace(second=0, microsecond=0)
                 )
 
-                for item in cart_items:
-                    # Check stock
-                    if item.product.quantity < item.quantity:
-                        raise serializers.ValidationError(f"Insufficient stock for {item.product.name}")
-
-                    OrderItem.objects.create(
-                        order=order,
-                        product=item.product,
-                        vendor=item.product.vendor,
-                        product_name=item.product.name,
-                        quantity=item.quantity,
-                        product_price=item.product.price,
-                        subtotal=item.get_total()
-                    )
-                    
-                    # Decrease inventory atomically
-                    Product.objects.filter(pk=item.product.pk).update(quantity=F('quantity') - item.quantity)
+                # Lock products, validate stock, bulk-create items and decrement stock in one go
+                place_order_items(order, [
+                    {'product_id': item.product_id, 'quantity': item.quantity}
+                    for item in cart_items
+                ])
                 
                 # Record financial entries in ledger
                 FinanceService.record_order_financials(order)
@@ -611,6 +600,8 @@ def process_payment(request):
 
     except Cart.DoesNotExist:
         return Response({"error": "Cart not found"}, status=404)
+    except OutOfStockError as e:
+        return Response({"error": str(e)}, status=409)
     except Exception as e:
         import traceback
         traceback.print_exc()   # prints full stack trace to Django console
@@ -720,25 +711,14 @@ def cancel_order(request, order_id):
         "status": order.status,
     })
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def order_tracking(request, order_number):
-    try:
-        order = Order.objects.prefetch_related('items', 'tracking_history').select_related(
-            'delivery_address'
-        ).get(order_number=order_number, user=request.user)
-    except Order.DoesNotExist:
-        return Response({"error": "Order not found"}, status=404)
-
+def _order_tracking_payload(order):
     # -------------------------------------------------------------------
     # Build synthetic tracking steps from order + delivery assignment
     # -------------------------------------------------------------------
     # Check delivery assignment status for more granularity if order is in 'shipping'
-    assignment = None
-    try:
-        assignment = order.delivery_assignment
-    except Exception:
-        pass
+    assignment = order.delivery_assignments.select_related('agent__user').filter(
+        assignment_type='delivery'
+    ).order_by('-assigned_at').first()
 
     # Basic stages
     # 0: Placed
@@ -799,7 +779,7 @@ def order_tracking(request, order_number):
     if addr:
         delivery_address = f"{addr.address_line1}, {addr.city}, {addr.state} {addr.pincode}"
 
-    return Response({
+    return {
         'order_number': order.order_number,
         'status': order.status,
         'created_at': order.created_at.isoformat(),
@@ -810,7 +790,65 @@ def order_tracking(request, order_number):
         'agent_info': agent_info,
         'estimated_delivery': estimated_delivery,
         'delivery_address': delivery_address,
-    })
+        'current_location': assignment.current_location if assignment else None,
+    }
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def order_tracking(request, order_number):
+    try:
+        order = Order.objects.select_related('delivery_address').get(order_number=order_number, user=request.user)
+    except Order.DoesNotExist:
+        return Response({"error": "Order not found"}, status=404)
+
+    payload = _order_tracking_payload(order)
+    # For EventSource clients of order_tracking_stream
+    payload['stream_token'] = stream_token(request.user.id, order.order_number)
+    return Response(payload)
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets DRF negotiate `Accept: text/event-stream`; the body itself is streamed."""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only used for error responses (e.g. 404) on the stream endpoint
+        return f"event: error\ndata: {json.dumps(data)}\n\n"
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+@renderer_classes([EventStreamRenderer, JSONRenderer])
+def order_tracking_stream(request, order_number):
+    """
+    Server-Sent Events version of order_tracking: a 'snapshot' event with the
+    same payload, then - in LIVE_TRACKING_MODE='push' - 'status' and 'location'
+    events pushed as they happen (see deliveryAgent/live_tracking.py).
+    Authenticated by JWT, or by the ?token= returned by order_tracking for
+    EventSource clients, which cannot send an Authorization header.
+    """
+    if request.user.is_authenticated:
+        user_id = request.user.id
+    else:
+        user_id = stream_token_user_id(request.query_params.get('token', ''), order_number)
+        if user_id is None:
+            return Response({"error": "Authentication credentials were not provided."}, status=401)
+
+    try:
+        order = Order.objects.select_related('delivery_address').get(order_number=order_number, user_id=user_id)
+    except Order.DoesNotExist:
+        return Response({"error": "Order not found"}, status=404)
+
+    response = StreamingHttpResponse(
+        tracking_stream(order.id, lambda: _order_tracking_payload(order)),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
@@ -942,7 +980,9 @@ def submit_review_api(request, product_id):
         serializer = ReviewSerializer(data=request.data)
     
     if serializer.is_valid():
-        serializer.save(user=request.user, Product=product)
+        # Review and the product's rating aggregates (user/signals.py) commit together
+        with transaction.atomic():
+            serializer.save(user=request.user, Product=product)
         return Response(serializer.data, status=201 if not user_review else 200)
     return Response(serializer.errors, status=400)
 
@@ -1046,7 +1086,7 @@ def get_trending_products(request):
         status__in=['active', 'approved'],
         is_blocked=False,
         average_rating__gt=3
-    ).select_related('vendor').prefetch_related('images').order_by('-search_count', '-total_reviews', '-average_rating')[:12]
+    ).select_related('vendor').prefetch_related(lightweight_images_prefetch()).order_by('-search_count', '-total_reviews', '-average_rating')[:12]
     
     serializer = ProductSerializer(trending, many=True, context={'request': request})
     data = serializer.data